@@ -0,0 +1,133 @@
+"""
+Compare guidance throughput of the sync (WSGI-style) and async (ASGI) views
+against a deliberately slow stand-in for the FastAPI service.
+
+    python benchmarks/asgi_vs_wsgi.py --latency 0.2 --requests 200
+
+The sync run drives get_guidance_view from a pool of --threads threads, the
+way a threaded WSGI server would. The async run drives aget_guidance_view
+with --concurrency requests in flight on one event loop. The guidance
+cache is disabled and every request belongs to a different student, so every
+request reaches the stub.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--latency', type=float, default=0.2, help="Stub response time in seconds.")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per run.")
+    parser.add_argument('--threads', type=int, default=8, help="Threads for the sync run.")
+    parser.add_argument('--concurrency', type=int, default=100, help="In-flight requests for the async run.")
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    # A RAM-backed database keeps fsync cost out of the comparison
+    db = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False,
+                                     dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    settings.DATABASES['default']['NAME'] = db.name
+    settings.DATABASES['default'].setdefault('OPTIONS', {})['timeout'] = 30
+    settings.CACHES['guidance'] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    settings.FASTAPI_POOL_MAXSIZE = max(args.threads, 16)
+    settings.FASTAPI_READ_TIMEOUT = args.latency * 20 + 5
+    settings.REQUEST_DEADLINE = None
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['testserver']
+    django.setup()
+
+    from polls import stub_service
+    _, settings.FASTAPI_BASE_URL = stub_service.start(latency=stub_service.Latency('fixed', args.latency))
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.test import AsyncClient, Client
+
+    from polls import views
+    from polls.models import Student, SubjectEntry
+
+    call_command('migrate', verbosity=0)
+    # One student per request keeps the sidebar (rendered on every response)
+    # the same size in every run, and no two requests share a guidance key.
+    owners = []
+    for i in range(args.requests):
+        user = User.objects.create_user(f'bench{i}')
+        student = Student.objects.create(user=user)
+        course = SubjectEntry.objects.create(student=student, subject_name=f'Course {i}', predicted_score=i % 100)
+        owners.append((user, course.id))
+
+    # Point the guidance URL at each implementation in turn
+    from django.urls import clear_url_caches
+    from polls import urls as polls_urls
+
+    def route(view):
+        for pattern in polls_urls.urlpatterns:
+            if pattern.name == 'get_guidance':
+                pattern.callback = view
+        clear_url_caches()
+
+    def sync_run():
+        route(views.get_guidance_view)
+        clients = []
+        for user, course_id in owners:
+            client = Client()
+            client.force_login(user)
+            clients.append((client, course_id))
+
+        def one(item):
+            client, course_id = item
+            return client.post(f'/guidance/{course_id}/').status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            codes = list(pool.map(one, clients))
+        return time.perf_counter() - started, codes
+
+    async def async_run():
+        route(views.aget_guidance_view)
+        clients = []
+        for user, course_id in owners:
+            client = AsyncClient()
+            await client.aforce_login(user)
+            clients.append((client, course_id))
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one(item):
+            client, course_id = item
+            async with semaphore:
+                response = await client.post(f'/guidance/{course_id}/')
+                return response.status_code
+
+        started = time.perf_counter()
+        codes = await asyncio.gather(*(one(item) for item in clients))
+        return time.perf_counter() - started, codes
+
+    print(f"Stub latency {args.latency * 1000:.0f} ms, {args.requests} guidance requests per run\n")
+    for label, run in (
+        (f"sync view, {args.threads} threads (WSGI)", sync_run),
+        (f"async view, {args.concurrency} in flight (ASGI)", lambda: asyncio.run(async_run())),
+    ):
+        # The views print debug output; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed, codes = run()
+        ok = sum(1 for code in codes if code == 200)
+        print(f"{label:<45} {elapsed:6.2f}s  {len(codes) / elapsed:7.1f} req/s  ({ok}/{len(codes)} OK)")
+
+    os.unlink(db.name)
+
+
+if __name__ == '__main__':
+    main()
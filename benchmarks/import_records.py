@@ -0,0 +1,84 @@
+"""
+Throughput and memory of `manage.py import_records` on synthetic history.
+
+    python benchmarks/import_records.py --rows 1000000 --students 20000
+
+Writes a CSV of past predictions (a few courses per student, dated over the
+last three years, one row in a thousand invalid), imports it into a fresh
+on-disk database and reports rows/s and peak memory. Run it at two sizes to
+see memory stay flat as the row count grows.
+"""
+import argparse
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+COURSES = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'History', 'Geography']
+STYLES = ['visual', 'auditory', 'kinesthetic', 'reading_writing', 'social']
+COLUMNS = [
+    'username', 'subject_name', 'previous_scores', 'hours_studied', 'extracurricular', 'sleep_hours',
+    'question_papers', 'motivation', 'preferred_learning_style', 'created_at', 'predicted_score',
+]
+
+
+def write_csv(path, rows, students):
+    start = datetime.now() - timedelta(days=3 * 365)
+    step = timedelta(days=3 * 365) / rows
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            writer.writerow([
+                f'student{random.randrange(students)}', random.choice(COURSES[:4]),
+                round(random.uniform(20, 100), 1), random.randint(0, 30), random.choice(['Yes', 'No']),
+                99 if i % 1000 == 999 else random.randint(4, 10), random.randint(0, 20),
+                random.choice(['high', 'medium', 'low']), ';'.join(random.sample(STYLES, random.randint(1, 3))),
+                (start + step * i).isoformat(timespec='seconds'), round(random.uniform(30, 95), 1),
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=200000, help="Rows to import.")
+    parser.add_argument('--students', type=int, default=5000, help="Distinct students in the file.")
+    parser.add_argument('--batch-size', type=int, default=2000, help="Rows per transaction.")
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    directory = tempfile.mkdtemp(prefix='import-records-')
+    settings.DATABASES['default']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+    settings.DEBUG = False
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    source = os.path.join(directory, 'records.csv')
+    print(f"Writing {args.rows} rows for {args.students} students...")
+    write_csv(source, args.rows, args.students)
+
+    started = time.monotonic()
+    call_command('import_records', source, '--batch-size', str(args.batch_size),
+                 '--progress-every', str(max(args.rows // 5, 1)))
+    elapsed = time.monotonic() - started
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\n{args.rows / elapsed:.0f} rows/s, peak RSS {peak_mb:.0f} MB")
+
+    for name in os.listdir(directory):
+        os.unlink(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Measure the duplicate-name check and the course-history queries before and
+after the subject_name_normalized / (subject, created_at) indexes.
+
+    python benchmarks/query_indexes.py --rows 1000000
+
+Builds a throwaway SQLite database with --rows CourseSpecificEntry rows spread
+over --students students with --courses courses each (about 100 entries per
+course with the defaults), then runs each query
+against the old schema (case-sensitive unique index on subject_name, plain
+index on subject_id) and the new one, printing SQLite's query plan and the
+mean time per query.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+# SQLite builds the new unique constraint into the table itself, so it stays
+# in place for the "old" run; the iexact lookup cannot use it either way.
+OLD_SCHEMA = [
+    'DROP INDEX entry_subject_created_idx',
+    'CREATE UNIQUE INDEX old_subject_name_unique ON polls_subjectentry (student_id, subject_name)',
+    'CREATE INDEX old_entry_subject_idx ON polls_coursespecificentry (subject_id)',
+]
+NEW_SCHEMA = [
+    'DROP INDEX old_subject_name_unique',
+    'DROP INDEX old_entry_subject_idx',
+    'CREATE INDEX entry_subject_created_idx ON polls_coursespecificentry (subject_id, created_at)',
+]
+
+
+def populate(connection, students, courses, rows):
+    started = datetime(2024, 1, 1)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO auth_user (id, password, is_superuser, username, first_name, last_name, '
+            'email, is_staff, is_active, date_joined) VALUES (%s, "", 0, %s, "", "", "", 0, 1, %s)',
+            [(i, f'bench{i}', started) for i in range(1, students + 1)],
+        )
+        cursor.executemany(
+            'INSERT INTO polls_student (id, user_id, created_at) VALUES (%s, %s, %s)',
+            [(i, i, started) for i in range(1, students + 1)],
+        )
+        subjects = []
+        for student in range(1, students + 1):
+            for n in range(courses):
+                name = f'Course {n} Of Student {student}'
+                subjects.append((len(subjects) + 1, student, name, name.lower(), started, started))
+        cursor.executemany(
+            'INSERT INTO polls_subjectentry (id, student_id, subject_name, subject_name_normalized, '
+            'hours_studied, previous_scores, extracurricular, sleep_hours, question_papers, motivation, '
+            'learning_styles, created_at, updated_at) '
+            'VALUES (%s, %s, %s, %s, 10, 60, 0, 8, 2, 1, 1, %s, %s)',
+            subjects,
+        )
+        batch = []
+        for i in range(rows):
+            # Entries arrive interleaved across courses, as they would in production
+            batch.append((random.randint(1, len(subjects)), random.random() * 100,
+                          started + timedelta(seconds=i * 30)))
+            if len(batch) == 50000 or i == rows - 1:
+                cursor.executemany(
+                    'INSERT INTO polls_coursespecificentry (subject_id, hours_studied, previous_scores, '
+                    'extracurricular, sleep_hours, question_papers, motivation, learning_styles, '
+                    'predicted_score, created_at) '
+                    'VALUES (%s, 10, 60, 0, 8, 2, 1, 1, %s, %s)',
+                    batch,
+                )
+                batch = []
+    return len(subjects)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help="CourseSpecificEntry rows.")
+    parser.add_argument('--students', type=int, default=2_000)
+    parser.add_argument('--courses', type=int, default=5, help="Courses per student.")
+    parser.add_argument('--repeat', type=int, default=2000, help="Queries timed per measurement.")
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    db = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False,
+                                     dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    settings.DATABASES['default']['NAME'] = db.name
+    settings.DEBUG = False
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connection, transaction
+
+    from polls.models import CourseSpecificEntry, SubjectEntry
+
+    call_command('migrate', verbosity=0)
+    print(f"Populating {args.rows:,} entries over {args.students * args.courses:,} courses...")
+    with transaction.atomic():
+        subject_count = populate(connection, args.students, args.courses, args.rows)
+
+    def duplicate_check_old(student_id, name):
+        return SubjectEntry.objects.filter(student_id=student_id, subject_name__iexact=name)
+
+    def duplicate_check_new(student_id, name):
+        return SubjectEntry.objects.filter(student_id=student_id,
+                                           subject_name_normalized=SubjectEntry.normalize_name(name))
+
+    def history(subject_id, _):
+        return CourseSpecificEntry.objects.filter(subject_id=subject_id).order_by('-created_at')[:20]
+
+    def latest(subject_id, _):
+        return CourseSpecificEntry.objects.filter(subject_id=subject_id).order_by('-created_at')[:1]
+
+    def measure(label, build):
+        samples = []
+        for _ in range(args.repeat):
+            student = random.randint(1, args.students)
+            subject = random.randint(1, subject_count)
+            samples.append((subject if build in (history, latest) else student,
+                            f'COURSE {random.randrange(args.courses)} of student {student}'))
+        print(f"\n{label}\n  plan: " + build(*samples[0]).explain().replace('\n', '\n        '))
+        # Time the SQL alone; ORM overhead is the same for both schemas
+        queries = [build(key, name).query.sql_with_params() for key, name in samples]
+        with connection.cursor() as cursor:
+            started = time.perf_counter()
+            for sql, params in queries:
+                cursor.execute(sql, params)
+                cursor.fetchall()
+            mean = (time.perf_counter() - started) / args.repeat
+        print(f"  mean: {mean * 1e6:,.0f} us/query")
+        return mean
+
+    results = {}
+    for schema, statements in (('old', OLD_SCHEMA), ('new', NEW_SCHEMA)):
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute('ANALYZE')
+        print(f"\n=== {schema} schema ===")
+        results[schema, 'duplicate'] = measure(
+            "Duplicate-name check", duplicate_check_old if schema == 'old' else duplicate_check_new)
+        results[schema, 'history'] = measure("Course history, newest 20", history)
+        results[schema, 'latest'] = measure("Latest entry", latest)
+
+    print("\n=== summary (old -> new) ===")
+    for query in ('duplicate', 'history', 'latest'):
+        old, new = results['old', query], results['new', query]
+        print(f"  {query:<10} {old * 1e6:>10,.0f} us -> {new * 1e6:>8,.0f} us  ({old / new:,.1f}x)")
+
+    os.unlink(db.name)
+
+
+if __name__ == '__main__':
+    main()
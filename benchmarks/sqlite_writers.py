@@ -0,0 +1,175 @@
+"""
+Concurrent writers against SQLite with the default settings and with the
+SQLITE_TUNING profile.
+
+    python benchmarks/sqlite_writers.py --writers 8 --readers 4 --seconds 10
+
+Each writer process records a prediction the way the app does: read the
+course, insert a CourseSpecificEntry and update the SubjectEntry, all in one
+transaction. Reader processes page through course histories at the same
+time. Both profiles use the same on-disk database file (fsync cost
+included). The report shows committed writes/s, "database is locked"
+failures and the time writers spent on attempts that failed that way.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+COURSES = 200
+
+
+def configure(db_name, tuned):
+    from django.conf import settings
+    from django.db import connections
+
+    database = settings.DATABASES['default']
+    database['NAME'] = db_name
+    database['CONN_MAX_AGE'] = None if tuned else 0
+    database['OPTIONS'] = {'transaction_mode': 'IMMEDIATE', 'timeout': 10} if tuned else {}
+    settings.SQLITE_TUNING = tuned
+    connections.close_all()
+
+
+def writer(db_name, tuned, deadline, results):
+    configure(db_name, tuned)
+    from django.db import OperationalError, transaction
+    from django.utils import timezone
+
+    from polls.models import CourseSpecificEntry, SubjectEntry
+
+    committed = locked = 0
+    lock_wait = 0.0
+    latencies = []
+    while time.time() < deadline:
+        subject_id = random.randint(1, COURSES)
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                # Read before writing, like prediction_records.record_score does
+                previous = SubjectEntry.objects.filter(id=subject_id).values_list('predicted_score', flat=True).get()
+                score = (previous or 50) * 0.9 + random.random() * 10
+                CourseSpecificEntry.objects.create(subject_id=subject_id, hours_studied=5, predicted_score=score)
+                SubjectEntry.objects.filter(id=subject_id).update(predicted_score=score, updated_at=timezone.now())
+            committed += 1
+            latencies.append(time.perf_counter() - started)
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+            lock_wait += time.perf_counter() - started
+    results.put(('writer', committed, locked, lock_wait, latencies))
+
+
+def reader(db_name, tuned, deadline, results):
+    configure(db_name, tuned)
+    from django.db import OperationalError
+
+    from polls.models import CourseSpecificEntry
+
+    done = locked = 0
+    while time.time() < deadline:
+        try:
+            list(
+                CourseSpecificEntry.objects
+                .filter(subject_id=random.randint(1, COURSES))
+                .order_by('-created_at', '-id')
+                .values_list('created_at', 'predicted_score')[:20]
+            )
+            done += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+    results.put(('reader', done, locked, 0.0, []))
+
+
+def run(db_name, tuned, args):
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    deadline = time.time() + args.seconds
+    processes = (
+        [context.Process(target=writer, args=(db_name, tuned, deadline, results)) for _ in range(args.writers)]
+        + [context.Process(target=reader, args=(db_name, tuned, deadline, results)) for _ in range(args.readers)]
+    )
+    for process in processes:
+        process.start()
+    rows = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    writes = sum(r[1] for r in rows if r[0] == 'writer')
+    write_locks = sum(r[2] for r in rows if r[0] == 'writer')
+    lock_wait = sum(r[3] for r in rows if r[0] == 'writer')
+    reads = sum(r[1] for r in rows if r[0] == 'reader')
+    read_locks = sum(r[2] for r in rows if r[0] == 'reader')
+    latencies = sorted(x for r in rows for x in r[4])
+    p50 = latencies[len(latencies) // 2] if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+    return {
+        'writes/s': writes / args.seconds,
+        'reads/s': reads / args.seconds,
+        'locked errors': write_locks + read_locks,
+        'failed-write wait s': lock_wait,
+        'commit p50 ms': p50 * 1000,
+        'commit p99 ms': p99 * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--writers', type=int, default=8, help="Writer processes.")
+    parser.add_argument('--readers', type=int, default=4, help="Reader processes.")
+    parser.add_argument('--seconds', type=float, default=10, help="Length of each run.")
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    directory = tempfile.mkdtemp(prefix='sqlite-writers-')
+    db_name = os.path.join(directory, 'bench.sqlite3')
+    settings.DATABASES['default']['NAME'] = db_name
+    settings.DEBUG = False
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection, connections
+
+    from polls.models import Student, SubjectEntry
+
+    call_command('migrate', verbosity=0)
+    student = Student.objects.create(user=User.objects.create_user('bench'))
+    SubjectEntry.objects.bulk_create(
+        SubjectEntry(student=student, subject_name=f'Course {i}', subject_name_normalized=f'course {i}')
+        for i in range(COURSES)
+    )
+
+    results = {}
+    for profile, tuned in (('default', False), ('tuned', True)):
+        configure(db_name, tuned)
+        if not tuned:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode = DELETE')
+        connections.close_all()
+        print(f"Running {profile} profile: {args.writers} writers, {args.readers} readers, {args.seconds:.0f}s...")
+        results[profile] = run(db_name, tuned, args)
+
+    print(f"\n{'':<22}{'default':>12}{'tuned':>12}")
+    for metric in results['default']:
+        print(f"{metric:<22}{results['default'][metric]:>12.1f}{results['tuned'][metric]:>12.1f}")
+
+    for name in os.listdir(directory):
+        os.unlink(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
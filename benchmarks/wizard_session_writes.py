@@ -0,0 +1,139 @@
+"""
+Database statements per SubjectWizard completion for each session and
+wizard-storage mode.
+
+    python benchmarks/wizard_session_writes.py --completions 100
+
+Walks the five-step wizard with the Django test client against a fresh
+on-disk database: alternately a new course (via new_course) and a new
+prediction for the course just created (via new_prediction). It counts the
+statements that touch django_session and the other writes, per completion.
+Predictions are queued (PREDICTION_MODE=async), so no model service is
+needed, and each completion also costs its entry, course, stats and job
+writes.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+# (SESSION_STORE, WIZARD_STORAGE)
+MODES = [
+    ('db', 'session'),
+    ('cached_db', 'session'),
+    ('cache', 'session'),
+    ('db', 'cookie'),
+    ('cache', 'cookie'),
+]
+WRITES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class StatementCounter:
+    """connection.execute_wrapper that sorts statements into session reads/writes and other writes."""
+
+    def __init__(self):
+        self.session_reads = self.session_writes = self.other_writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        statement = sql.lstrip().upper()
+        write = statement.startswith(WRITES)
+        if 'DJANGO_SESSION' in statement:
+            if write:
+                self.session_writes += 1
+            else:
+                self.session_reads += 1
+        elif write:
+            self.other_writes += 1
+        return execute(sql, params, many, context)
+
+
+def complete_wizard(client, subject_name):
+    steps = [
+        {'0-subject_name': subject_name, '0-previous_scores': 65},
+        {'1-hours_studied': 10},
+        {'2-extracurricular': 1},
+        {'3-sleep_hours': 7},
+        {'4-question_papers': 3, '4-motivation': 2, '4-preferred_learning_style': [1, 4]},
+    ]
+    client.get('/create-subject/')
+    for number, step in enumerate(steps):
+        response = client.post('/create-subject/', dict(step, **{'subject_wizard-current_step': str(number)}))
+    assert response.status_code == 302, f"wizard did not finish: {response.status_code}"
+
+
+def run_mode(user, session_store, wizard_storage, completions):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    from polls.models import SubjectEntry
+
+    engine = f'django.contrib.sessions.backends.{session_store}'
+    with override_settings(SESSION_ENGINE=engine, WIZARD_STORAGE=wizard_storage):
+        client = Client()
+        client.force_login(user)
+        counter = StatementCounter()
+        started = time.monotonic()
+        # The wizard views print debug lines; keep them out of the report
+        with connection.execute_wrapper(counter), contextlib.redirect_stdout(io.StringIO()):
+            for i in range(completions):
+                if i % 2 == 0:
+                    name = f'{session_store}-{wizard_storage}-{i}'
+                    client.get('/new-course/')
+                    complete_wizard(client, name)
+                else:
+                    course = SubjectEntry.objects.get(student__user=user, subject_name=name)
+                    client.get(f'/course/new-prediction/{course.id}/')
+                    complete_wizard(client, name)
+        elapsed = time.monotonic() - started
+    return counter, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--completions', type=int, default=50, help="Wizard completions per mode.")
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    directory = tempfile.mkdtemp(prefix='wizard-sessions-')
+    settings.DATABASES['default']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+    settings.DEBUG = False
+    settings.PREDICTION_MODE = 'async'
+    settings.ALLOWED_HOSTS = ['testserver']
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    from polls.models import Student
+
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user('bench', password='bench')
+    Student.objects.create(user=user)
+
+    n = args.completions
+    print(f"{n} completions per mode (half new courses, half new predictions)\n")
+    print(f"{'session':>10} {'wizard':>8} {'session writes':>15} {'session reads':>14} "
+          f"{'other writes':>13} {'ms':>7}   (per completion)")
+    for session_store, wizard_storage in MODES:
+        counter, elapsed = run_mode(user, session_store, wizard_storage, n)
+        print(f"{session_store:>10} {wizard_storage:>8} {counter.session_writes / n:>15.1f} "
+              f"{counter.session_reads / n:>14.1f} {counter.other_writes / n:>13.1f} "
+              f"{elapsed / n * 1000:>7.1f}")
+
+    for name in os.listdir(directory):
+        os.unlink(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
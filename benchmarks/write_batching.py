@@ -0,0 +1,119 @@
+"""
+Prediction writes per second from many request threads, with and without the
+single-writer batching queue (SQLITE_WRITE_BATCHING).
+
+    python benchmarks/write_batching.py --threads 32 --seconds 10
+
+Every thread repeatedly records a prediction the way SubjectWizard.done()
+does: save the course, insert a CourseSpecificEntry and update the course's
+CourseStats row. Both runs use the SQLITE_TUNING profile on an on-disk
+database; --no-tuning compares them with SQLite's defaults instead.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+COURSES = 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--threads', type=int, default=32, help="Concurrent request threads.")
+    parser.add_argument('--seconds', type=float, default=10, help="Length of each run.")
+    parser.add_argument('--no-tuning', action='store_true', help="Use SQLite's default pragmas.")
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    directory = tempfile.mkdtemp(prefix='write-batching-')
+    database = settings.DATABASES['default']
+    database['NAME'] = os.path.join(directory, 'bench.sqlite3')
+    settings.SQLITE_TUNING = not args.no_tuning
+    database['OPTIONS'] = {'transaction_mode': 'IMMEDIATE', 'timeout': 30} if settings.SQLITE_TUNING else {'timeout': 30}
+    settings.DEBUG = False
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection, OperationalError
+
+    from polls import course_stats, write_queue
+    from polls.models import CourseSpecificEntry, Student, SubjectEntry
+
+    call_command('migrate', verbosity=0)
+    student = Student.objects.create(user=User.objects.create_user('bench'))
+    SubjectEntry.objects.bulk_create(
+        SubjectEntry(student=student, subject_name=f'Course {i}', subject_name_normalized=f'course {i}')
+        for i in range(COURSES)
+    )
+    subjects = list(SubjectEntry.objects.all())
+    connection.close()
+
+    def one_run(batching):
+        settings.SQLITE_WRITE_BATCHING = batching
+        deadline = time.monotonic() + args.seconds
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def worker():
+            mine, failed = [], 0
+            while time.monotonic() < deadline:
+                original = random.choice(subjects)
+                subject = SubjectEntry(**{
+                    f.attname: getattr(original, f.attname) for f in SubjectEntry._meta.concrete_fields
+                })
+                subject.hours_studied = random.randint(1, 20)
+
+                def record():
+                    subject.save()
+                    entry = CourseSpecificEntry.objects.create(subject=subject, hours_studied=subject.hours_studied)
+                    course_stats.record_entry(entry)
+
+                started = time.perf_counter()
+                try:
+                    write_queue.run(record)
+                    mine.append(time.perf_counter() - started)
+                except OperationalError:
+                    failed += 1
+            connection.close()
+            with lock:
+                latencies.extend(mine)
+                errors.append(failed)
+
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        latencies.sort()
+        return {
+            'writes/s': len(latencies) / args.seconds,
+            'errors': sum(errors),
+            'p50 ms': latencies[len(latencies) // 2] * 1000 if latencies else 0,
+            'p99 ms': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+        }
+
+    profile = 'default pragmas' if args.no_tuning else 'SQLITE_TUNING'
+    print(f"{args.threads} threads, {args.seconds:.0f}s per run, {profile}")
+    unbatched = one_run(False)
+    batched = one_run(True)
+    print(f"\n{'':<12}{'direct':>12}{'batched':>12}")
+    for metric in unbatched:
+        print(f"{metric:<12}{unbatched[metric]:>12.1f}{batched[metric]:>12.1f}")
+
+    for name in os.listdir(directory):
+        os.unlink(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
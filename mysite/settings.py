@@ -53,6 +53,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "polls.middleware.RequestDeadlineMiddleware",
 ]
 
 ROOT_URLCONF = "mysite.urls"
@@ -85,9 +86,31 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Seconds to keep a connection open between requests (0 = close after each)
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "0")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Opt-in SQLite profile for running several workers against db.sqlite3
+# (polls/sqlite_tuning.py): the pragmas below are applied to every new
+# connection, write transactions take the write lock up front (BEGIN
+# IMMEDIATE) so they queue on busy_timeout instead of failing with
+# "database is locked", and connections are reused across requests.
+# Run `python manage.py sqlite_maintenance` periodically to checkpoint the WAL.
+SQLITE_TUNING = os.environ.get("SQLITE_TUNING", "") == "1"
+SQLITE_PRAGMAS = {
+    "busy_timeout": 10000,        # ms to wait for a lock before giving up
+    "journal_mode": "WAL",        # readers no longer block the writer (and vice versa)
+    "synchronous": "NORMAL",      # fsync at checkpoints, not on every commit; safe with WAL
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64000,         # negative = KiB, so about 64 MB of page cache
+    "temp_store": "MEMORY",
+}
+if SQLITE_TUNING:
+    DATABASES["default"]["OPTIONS"] = {"transaction_mode": "IMMEDIATE", "timeout": 10}
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("DB_CONN_MAX_AGE", "600"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -159,4 +182,133 @@ else:
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 LOGIN_REDIRECT_URL = 'hero'
-LOGOUT_REDIRECT_URL = 'login' 
+LOGOUT_REDIRECT_URL = 'login'
+
+
+# FastAPI prediction / guidance service
+# All outbound calls go through polls/fastapi_client.py, which keeps one pooled
+# keep-alive session per worker process.
+FASTAPI_BASE_URL = os.environ.get('FASTAPI_BASE_URL', 'http://127.0.0.1:8000')
+FASTAPI_CONNECT_TIMEOUT = 3.05   # seconds to establish a connection
+FASTAPI_READ_TIMEOUT = 20        # seconds to wait for a response
+FASTAPI_POOL_CONNECTIONS = 4     # number of host pools to cache
+FASTAPI_POOL_MAXSIZE = 16        # keep-alive connections kept per host
+FASTAPI_MAX_RETRIES = 2          # retries on connection errors / 502-504
+FASTAPI_BACKOFF_FACTOR = 0.2     # base of the jittered exponential backoff
+FASTAPI_BACKOFF_MAX = 2.0        # longest single backoff sleep
+FASTAPI_BREAKER_FAILURE_THRESHOLD = 5   # consecutive failures that open the circuit
+FASTAPI_BREAKER_RESET_TIMEOUT = 30      # seconds before a half-open probe is allowed
+
+# Total seconds a request may spend on outbound calls (polls/middleware.py).
+# Keep it below the WSGI worker timeout.
+REQUEST_DEADLINE = 25
+
+
+# Caches
+# "predictions" holds /predict results keyed on the canonicalised feature
+# payload (polls/prediction_cache.py). LocMemCache evicts least-recently-used
+# entries once MAX_ENTRIES is reached; point it at Redis/Memcached to share it
+# between worker processes.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "default",
+    },
+    "predictions": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "predictions",
+        "TIMEOUT": 60 * 60 * 24,
+        "OPTIONS": {
+            "MAX_ENTRIES": 10000,
+            "CULL_FREQUENCY": 10,
+        },
+    },
+    # Study guides from /chatbot-advice (polls/guidance_cache.py)
+    "guidance": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "guidance",
+        "OPTIONS": {
+            "MAX_ENTRIES": 2000,
+        },
+    },
+    # Sessions when SESSION_STORE is "cache" or "cached_db" (see below). An
+    # evicted entry logs its user out, so keep this one large, and shared
+    # (Redis/Memcached) when there is more than one worker process.
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "sessions",
+        "TIMEOUT": None,
+        "OPTIONS": {
+            "MAX_ENTRIES": 50000,
+        },
+    },
+}
+
+# Bump whenever the FastAPI model is retrained; cached scores from older
+# versions are then ignored.
+PREDICTION_MODEL_VERSION = os.environ.get('PREDICTION_MODEL_VERSION', '1')
+PREDICTION_CACHE_TTL = 60 * 60 * 24  # seconds
+
+# "sync" scores the wizard submission inside the request; "async" queues a
+# PredictionJob that `python manage.py run_prediction_worker` picks up.
+PREDICTION_MODE = os.environ.get('PREDICTION_MODE', 'sync')
+PREDICTION_JOB_MAX_ATTEMPTS = 5
+
+# Where predicted scores come from: "remote" (FastAPI), "local" (in-process
+# ridge model only) or "fallback" (FastAPI, local model while it is down).
+# Train the local model with `python manage.py train_local_predictor`.
+PREDICTION_BACKEND = os.environ.get('PREDICTION_BACKEND', 'remote')
+LOCAL_PREDICTOR_PATH = BASE_DIR / 'local_predictor.npz'
+
+# Guidance is cached per (subject, score bucket, hours, motivation, style)
+GUIDANCE_CACHE_TTL = 60 * 60 * 6  # seconds
+GUIDANCE_SCORE_BUCKET = 5         # predicted scores are grouped in 5-point bands
+
+# Serve the model-bound views (wizard final step, guidance) as native async
+# views. Only worth enabling when running under ASGI (mysite/asgi.py), e.g.
+# `uvicorn mysite.asgi:application`. Requires httpx.
+ASYNC_MODEL_VIEWS = os.environ.get('ASYNC_MODEL_VIEWS', '') == '1'
+FASTAPI_ASYNC_MAX_CONNECTIONS = 200  # in-flight model calls per ASGI process
+
+# Course history page: table rows per page and the most points drawn on the chart
+HISTORY_PAGE_SIZE = 20
+HISTORY_CHART_POINTS = 200
+
+# Rendered sidebar fragments (polls/sidebar_cache.py) live in the "default"
+# cache and are invalidated by a per-student version bump
+SIDEBAR_CACHE_TTL = 60 * 60  # seconds
+
+# Route entry inserts and score updates through one writer thread per
+# process, which commits everything queued within the window as a single
+# transaction (polls/write_queue.py). Worth it on SQLite under heavy write load.
+SQLITE_WRITE_BATCHING = os.environ.get("SQLITE_WRITE_BATCHING", "") == "1"
+SQLITE_WRITE_BATCH_WINDOW = 0.002  # seconds to wait for more writes to join a batch
+SQLITE_WRITE_BATCH_MAX = 200       # writes per transaction at most
+SQLITE_WRITE_TIMEOUT = 30          # seconds a caller waits for its batch to commit
+
+# `manage.py archive_history` moves prediction entries older than this into
+# the compressed per-course monthly archive (polls/history_archive.py)
+HISTORY_ARCHIVE_AFTER_DAYS = 365
+
+# Column-oriented training-data snapshots written by `manage.py snapshot_features`
+FEATURE_SNAPSHOT_DIR = BASE_DIR / 'feature_snapshots'
+
+# Where sessions live: "db" (a django_session row, so every session change
+# is an SQLite write), "cache" (only the "sessions" cache, no database
+# traffic) or "cached_db" (read through the cache, still written to the table).
+SESSION_STORE = os.environ.get('SESSION_STORE', 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+}[SESSION_STORE]
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Where SubjectWizard keeps the answers of the steps already done: "session",
+# or "cookie" (a signed cookie, so walking the wizard never writes the session)
+WIZARD_STORAGE = os.environ.get('WIZARD_STORAGE', 'session')
+
+# Show all five SubjectWizard steps on one page: the browser steps through
+# them (polls/static/js/form-validation.js) and submits once, instead of a
+# GET and a POST per step
+WIZARD_SINGLE_PAGE = os.environ.get('WIZARD_SINGLE_PAGE', '') == '1'
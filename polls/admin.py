@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Student, SubjectEntry
+from .models import Student, SubjectEntry, PredictionJob, CourseStats, EntryArchive
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
@@ -11,3 +11,19 @@ class SubjectEntryAdmin(admin.ModelAdmin):
     list_filter = ['student', 'subject_name']
     search_fields = ['subject_name']
 
+
+@admin.register(PredictionJob)
+class PredictionJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'entry', 'status', 'attempts', 'run_after', 'updated_at']
+    list_filter = ['status']
+
+
+@admin.register(CourseStats)
+class CourseStatsAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'entry_count', 'scored_count', 'last_score', 'last_created_at']
+
+
+@admin.register(EntryArchive)
+class EntryArchiveAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'month', 'entry_count', 'scored_count', 'archived_at']
+    exclude = ['rows']
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class PollsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "polls"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from . import sqlite_tuning
+
+        connection_created.connect(sqlite_tuning.apply_pragmas, dispatch_uid='polls.sqlite_tuning')
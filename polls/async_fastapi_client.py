@@ -0,0 +1,142 @@
+"""
+Async counterpart of fastapi_client for the ASGI views.
+
+Uses one pooled ``httpx.AsyncClient`` per event loop, with the same
+``FASTAPI_*`` timeout, pool and retry settings as the sync client. It shares
+the sync client's circuit breakers and request deadline. httpx errors are
+re-raised as the matching ``requests`` exceptions, so callers and the shared
+cache and breaker code handle both clients the same way.
+"""
+import asyncio
+import logging
+import weakref
+
+import requests
+
+from . import fastapi_client
+from .circuit_breaker import get_breaker
+from .deadline import DeadlineExceeded, bound_timeout, remaining
+
+logger = logging.getLogger(__name__)
+
+# httpx clients are bound to the loop they were created on
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        maxsize = fastapi_client._setting('FASTAPI_POOL_MAXSIZE', 16)
+        client = httpx.AsyncClient(
+            base_url=fastapi_client.base_url(),
+            limits=httpx.Limits(
+                max_connections=fastapi_client._setting('FASTAPI_ASYNC_MAX_CONNECTIONS', 200),
+                max_keepalive_connections=maxsize,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose():
+    """Close this loop's client (e.g. on ASGI lifespan shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _httpx_timeout(timeout):
+    import httpx
+
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    return httpx.Timeout(connect=connect, read=read, write=read, pool=connect)
+
+
+def _as_requests_error(e):
+    """Translate an httpx exception into the equivalent requests exception."""
+    import httpx
+
+    if isinstance(e, httpx.ConnectTimeout):
+        return requests.exceptions.ConnectTimeout(str(e))
+    if isinstance(e, (httpx.ConnectError, httpx.RemoteProtocolError, httpx.PoolTimeout)):
+        return requests.exceptions.ConnectionError(str(e))
+    if isinstance(e, httpx.TimeoutException):
+        return requests.exceptions.ReadTimeout(str(e))
+    if isinstance(e, httpx.HTTPStatusError):
+        return requests.exceptions.HTTPError(str(e), response=e.response)
+    return requests.exceptions.RequestException(str(e))
+
+
+async def post_json(path, payload, timeout=None, idempotent=False):
+    """Async version of ``fastapi_client.post_json`` with the same semantics."""
+    if timeout is None:
+        timeout = fastapi_client.default_timeout()
+    bound_timeout(timeout)
+
+    breaker = get_breaker(path)
+    breaker.allow()
+    try:
+        result = await _post_with_retries(path, payload, timeout, idempotent)
+    except DeadlineExceeded:
+        breaker.release()
+        raise
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code < 500:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        raise
+    except requests.exceptions.RequestException:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
+
+
+async def _post_with_retries(path, payload, timeout, idempotent):
+    import httpx
+
+    max_retries = fastapi_client._setting('FASTAPI_MAX_RETRIES', 2)
+    client = get_client()
+
+    attempt = 0
+    while True:
+        try:
+            response = await client.post(path, json=payload, timeout=_httpx_timeout(bound_timeout(timeout)))
+            if idempotent and response.status_code in fastapi_client.RETRY_STATUSES and attempt < max_retries:
+                logger.warning("FastAPI %s returned %s, retrying", path, response.status_code)
+            else:
+                response.raise_for_status()
+                try:
+                    return response.json()
+                except ValueError as e:
+                    raise requests.exceptions.JSONDecodeError(str(e), response.text, 0)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            if attempt >= max_retries:
+                raise _as_requests_error(e) from e
+            logger.warning("FastAPI %s connection failed (%s), retrying", path, e)
+        except httpx.TimeoutException as e:
+            if not idempotent or attempt >= max_retries:
+                raise _as_requests_error(e) from e
+            logger.warning("FastAPI %s read timed out, retrying", path)
+        except httpx.HTTPError as e:
+            raise _as_requests_error(e) from e
+
+        delay = fastapi_client._backoff(attempt)
+        left = remaining()
+        if left is not None and left <= delay:
+            raise DeadlineExceeded(f"No time left to retry {path}")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def predict(payload, **kwargs):
+    kwargs.setdefault('idempotent', True)
+    return await post_json(fastapi_client.PREDICT_PATH, payload, **kwargs)
+
+
+async def chatbot_advice(payload, **kwargs):
+    return await post_json(fastapi_client.CHATBOT_ADVICE_PATH, payload, **kwargs)
@@ -0,0 +1,123 @@
+"""
+Thread-safe circuit breaker for outbound calls to the FastAPI service.
+
+One breaker exists per endpoint path and is shared by every thread in the
+worker process. After ``FASTAPI_BREAKER_FAILURE_THRESHOLD`` consecutive
+failures the breaker opens and calls fail immediately with
+:class:`CircuitOpenError`. Once ``FASTAPI_BREAKER_RESET_TIMEOUT`` seconds
+have passed it goes half-open and lets a single probe through: success closes
+it again, failure re-opens it.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Raised instead of calling a service whose breaker is open. It subclasses
+    RequestException so existing ``except RequestException`` blocks handle it.
+    """
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.transitions = Counter()
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        # Caller holds the lock
+        if state == self.state:
+            return
+        log = logger.warning if state == OPEN else logger.info
+        log("Circuit breaker %s: %s -> %s", self.name, self.state, state)
+        self.transitions[f"{self.state}->{state}"] += 1
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go ahead now."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"Circuit for {self.name} is open; not calling the service")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.probe_in_flight = False
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def release(self):
+        """Give back a half-open probe slot without judging the service."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    @property
+    def is_open(self):
+        return self.state == OPEN
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'rejected': self.rejected,
+                'transitions': dict(self.transitions),
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """Return the process-wide breaker for ``name``, creating it on first use."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    name,
+                    failure_threshold=getattr(settings, 'FASTAPI_BREAKER_FAILURE_THRESHOLD', 5),
+                    reset_timeout=getattr(settings, 'FASTAPI_BREAKER_RESET_TIMEOUT', 30.0),
+                )
+                _breakers[name] = breaker
+    return breaker
+
+
+def all_stats():
+    return {name: breaker.stats() for name, breaker in list(_breakers.items())}
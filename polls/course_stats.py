@@ -0,0 +1,178 @@
+"""
+Per-course running aggregates (CourseStats).
+
+Every write that creates a CourseSpecificEntry or changes its predicted_score
+calls into this module inside the same transaction, so the history page, the
+hero page and the sidebar read count, mean, min, max, last score and trend
+from one row instead of scanning the course's entries. ``manage.py
+rebuild_course_stats`` recomputes the rows from scratch. Entries moved to
+the archive (history_archive.py) stay counted.
+"""
+from django.db import transaction
+from django.db.models import Max, Min, Value
+from django.db.models.functions import Coalesce
+
+from . import history_archive, sidebar_cache
+from .models import CourseSpecificEntry, CourseStats, SubjectEntry
+
+
+def _days(stats, when):
+    return (when - stats.origin).total_seconds() / 86400
+
+
+def _locked(subject_id, origin):
+    """
+    The course's stats row, locked for update; created if missing.
+
+    SQLite ignores SELECT ... FOR UPDATE, and a transaction that reads before
+    it writes fails with "database is locked" if another connection commits
+    in between. So the row is written first (an UPDATE that fills in a
+    missing ``origin``), which takes the write lock before anything is read.
+    """
+    rows = CourseStats.objects.filter(subject_id=subject_id)
+    if rows.update(origin=Coalesce('origin', Value(origin))):
+        return rows.select_for_update().get()
+    stats, _ = rows.select_for_update().get_or_create(subject_id=subject_id, defaults={'origin': origin})
+    return stats
+
+
+def _add_score(stats, x, score):
+    stats.scored_count += 1
+    stats.score_sum += score
+    stats.sum_x += x
+    stats.sum_xx += x * x
+    stats.sum_xy += x * score
+    stats.score_min = score if stats.score_min is None else min(stats.score_min, score)
+    stats.score_max = score if stats.score_max is None else max(stats.score_max, score)
+
+
+def record_entry(entry):
+    """Count a newly created entry (and its score, if it already has one)."""
+    with transaction.atomic():
+        stats = _locked(entry.subject_id, entry.created_at)
+        stats.entry_count += 1
+        if stats.last_created_at is None or entry.created_at >= stats.last_created_at:
+            stats.last_created_at = entry.created_at
+            stats.last_score = entry.predicted_score
+        if entry.predicted_score is not None:
+            _add_score(stats, _days(stats, entry.created_at), entry.predicted_score)
+        stats.save()
+
+
+def record_score(entry, old_score, new_score):
+    """
+    Apply a change of ``entry.predicted_score`` from ``old_score`` to
+    ``new_score``. Call it after the entry row itself has been written.
+    """
+    record_scores([(entry, old_score, new_score)])
+
+
+def record_scores(changes):
+    """
+    Apply many (entry, old_score, new_score) changes, locking each course's
+    row once. Sums are adjusted in place; min/max are re-read from the
+    entries only when a replaced score was the course's current extreme.
+    """
+    by_subject = {}
+    for entry, old_score, new_score in changes:
+        if new_score is not None and old_score != new_score:
+            by_subject.setdefault(entry.subject_id, []).append((entry, old_score, new_score))
+
+    with transaction.atomic():
+        for subject_id, course_changes in by_subject.items():
+            stats = _locked(subject_id, course_changes[0][0].created_at)
+            stale_extremes = False
+            for entry, old_score, new_score in course_changes:
+                x = _days(stats, entry.created_at)
+                if old_score is None:
+                    _add_score(stats, x, new_score)
+                else:
+                    stats.score_sum += new_score - old_score
+                    stats.sum_xy += x * (new_score - old_score)
+                    if old_score in (stats.score_min, stats.score_max):
+                        stale_extremes = True
+                    else:
+                        stats.score_min = min(stats.score_min, new_score)
+                        stats.score_max = max(stats.score_max, new_score)
+                if stats.last_created_at is None or entry.created_at >= stats.last_created_at:
+                    stats.last_created_at = entry.created_at
+                    stats.last_score = new_score
+            if stale_extremes:
+                extremes = CourseSpecificEntry.objects.filter(subject_id=subject_id).aggregate(
+                    low=Min('predicted_score'), high=Max('predicted_score'),
+                )
+                low, high = history_archive.score_extremes(subject_id)
+                stats.score_min = min((v for v in (extremes['low'], low) if v is not None), default=None)
+                stats.score_max = max((v for v in (extremes['high'], high) if v is not None), default=None)
+            stats.save()
+
+
+def summarize(subject_id, rows):
+    """Build an unsaved CourseStats from (created_at, predicted_score) rows in date order."""
+    stats = CourseStats(subject_id=subject_id)
+    for created_at, score in rows:
+        if stats.origin is None:
+            stats.origin = created_at
+        stats.entry_count += 1
+        stats.last_created_at = created_at
+        stats.last_score = score
+        if score is not None:
+            _add_score(stats, _days(stats, created_at), score)
+    return stats
+
+
+def rebuild(subject_ids=None, chunk_size=2000):
+    """
+    Recompute stats for the given courses (all courses by default) from their
+    entries, archived ones included, in one transaction. Returns the number
+    of courses rebuilt.
+    """
+    subjects = SubjectEntry.objects.all()
+    entries = CourseSpecificEntry.objects.all()
+    existing = CourseStats.objects.all()
+    if subject_ids is not None:
+        subjects = subjects.filter(id__in=subject_ids)
+        entries = entries.filter(subject_id__in=subject_ids)
+        existing = existing.filter(subject_id__in=subject_ids)
+    rows = (
+        entries
+        .order_by('subject_id', 'created_at', 'id')
+        .values_list('subject_id', 'created_at', 'predicted_score')
+    )
+
+    def archived_rows(subject_id):
+        # Archived entries are older than the course's live ones
+        if subject_id not in archived_ids:
+            return []
+        archived_ids.discard(subject_id)
+        return [(e.created_at, e.predicted_score) for e in history_archive.archived_entries(subject_id)]
+
+    with transaction.atomic():
+        archived_ids = history_archive.archived_subject_ids(subject_ids)
+        built = {}
+        current_id, current_rows = None, []
+        for subject_id, created_at, score in rows.iterator(chunk_size=chunk_size):
+            if subject_id != current_id:
+                if current_rows:
+                    built[current_id] = summarize(current_id, current_rows)
+                current_id, current_rows = subject_id, archived_rows(subject_id)
+            current_rows.append((created_at, score))
+        if current_rows:
+            built[current_id] = summarize(current_id, current_rows)
+        for subject_id in list(archived_ids):
+            built[subject_id] = summarize(subject_id, archived_rows(subject_id))
+
+        ids = list(subjects.order_by('id').values_list('id', flat=True))
+        existing.delete()
+        CourseStats.objects.bulk_create(
+            [built.get(subject_id) or CourseStats(subject_id=subject_id) for subject_id in ids],
+            batch_size=500,
+        )
+        # bulk_create sends no signals: refresh the sidebars showing these scores
+        student_ids = set(subjects.values_list('student_id', flat=True))
+
+        def bump_sidebars():
+            for student_id in student_ids:
+                sidebar_cache.bump(student_id)
+        transaction.on_commit(bump_sidebars)
+    return len(ids)
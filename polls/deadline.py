@@ -0,0 +1,53 @@
+"""
+Per-request time budget for outbound calls.
+
+``RequestDeadlineMiddleware`` starts a budget of ``REQUEST_DEADLINE`` seconds
+for every request; ``fastapi_client`` shrinks its timeouts to whatever is
+left of it, so one slow dependency cannot hold a worker longer than the
+budget. Code outside a request (commands, the prediction worker) can set its
+own budget with ``with deadline(seconds):``.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+import requests
+
+_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """The request's time budget ran out before the call could be made."""
+
+
+@contextmanager
+def deadline(seconds):
+    """Run the block with a budget of ``seconds`` (None for no budget)."""
+    token = _deadline.set(time.monotonic() + seconds if seconds is not None else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left in the current budget, or None when there is no budget."""
+    expires = _deadline.get()
+    if expires is None:
+        return None
+    return expires - time.monotonic()
+
+
+def bound_timeout(timeout):
+    """
+    Shrink a requests ``timeout`` (number or (connect, read) tuple) to the
+    remaining budget. Raises DeadlineExceeded when nothing is left.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded before calling the service")
+    if isinstance(timeout, tuple):
+        return tuple(min(t, left) if t is not None else left for t in timeout)
+    return min(timeout, left) if timeout is not None else left
@@ -0,0 +1,295 @@
+"""
+Shared HTTP client for the FastAPI prediction and guidance services.
+
+Every call to the model service goes through this module so that each worker
+process reuses one pooled, keep-alive ``requests.Session`` instead of opening
+a new TCP connection per request. Timeouts, pool sizes and retry behaviour are
+read from the ``FASTAPI_*`` settings in ``mysite/settings.py``. Calls are
+guarded by a per-endpoint circuit breaker (circuit_breaker.py) and bounded by
+the current request deadline (deadline.py).
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .circuit_breaker import get_breaker
+from .deadline import DeadlineExceeded, bound_timeout, remaining
+
+logger = logging.getLogger(__name__)
+
+PREDICT_PATH = '/predict'
+BATCH_PREDICT_PATH = '/predict/batch'
+CHATBOT_ADVICE_PATH = '/chatbot-advice'
+CHATBOT_ADVICE_STREAM_PATH = '/chatbot-advice/stream'
+STUDY_PLAN_PATH = '/api/study-plan'
+
+# Upstream answers that are worth another attempt. Anything else (4xx, 500)
+# is returned to the caller straight away.
+RETRY_STATUSES = {502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def base_url():
+    return _setting('FASTAPI_BASE_URL', 'http://127.0.0.1:8000').rstrip('/')
+
+
+def default_timeout():
+    """(connect, read) tuple used when a call does not pass its own timeout."""
+    return (
+        _setting('FASTAPI_CONNECT_TIMEOUT', 3.05),
+        _setting('FASTAPI_READ_TIMEOUT', 20),
+    )
+
+
+def get_session():
+    """Return this process's pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Retries are handled in post_json() so that they can use
+                # jittered backoff and respect the idempotency of the call.
+                adapter = HTTPAdapter(
+                    pool_connections=_setting('FASTAPI_POOL_CONNECTIONS', 4),
+                    pool_maxsize=_setting('FASTAPI_POOL_MAXSIZE', 16),
+                    max_retries=0,
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update({'Connection': 'keep-alive'})
+                _session = session
+    return _session
+
+
+def reset_session():
+    """Drop the pooled session; the next call builds a fresh one."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+# Sockets must never be shared between a parent and a forked worker.
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=lambda: globals().update(_session=None))
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff for the given (0-based) retry attempt."""
+    base = _setting('FASTAPI_BACKOFF_FACTOR', 0.2)
+    cap = _setting('FASTAPI_BACKOFF_MAX', 2.0)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def post_json(path, payload, timeout=None, idempotent=False):
+    """
+    POST ``payload`` as JSON to ``path`` on the FastAPI service and return the
+    decoded JSON body.
+
+    Connection failures are always retried because the request never reached
+    the server. Read timeouts and 502/503/504 answers are only retried when
+    the caller passes ``idempotent=True``, which only the predict endpoints
+    do: the guidance and study-plan calls are too expensive to run twice.
+    Timeouts and backoff sleeps are bounded by the current request deadline,
+    and calls fail fast with ``CircuitOpenError`` while the endpoint's
+    circuit breaker is open. Raises
+    ``requests.exceptions.RequestException`` on failure, just like a plain
+    ``requests.post``.
+    """
+    if timeout is None:
+        timeout = default_timeout()
+    # Check the budget before taking a half-open probe slot
+    bound_timeout(timeout)
+
+    breaker = get_breaker(path)
+    breaker.allow()
+    try:
+        result = _post_with_retries(path, payload, timeout, idempotent)
+    except DeadlineExceeded:
+        # Our own budget ran out; that says nothing about the service
+        breaker.release()
+        raise
+    except requests.exceptions.HTTPError as e:
+        # 4xx means the service is up and answering
+        if e.response is not None and e.response.status_code < 500:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        raise
+    except requests.exceptions.RequestException:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
+
+
+def _post_with_retries(path, payload, timeout, idempotent):
+    url = f"{base_url()}{path}"
+    max_retries = _setting('FASTAPI_MAX_RETRIES', 2)
+    session = get_session()
+
+    attempt = 0
+    while True:
+        try:
+            response = session.post(url, json=payload, timeout=bound_timeout(timeout))
+            if idempotent and response.status_code in RETRY_STATUSES and attempt < max_retries:
+                logger.warning("FastAPI %s returned %s, retrying", path, response.status_code)
+            else:
+                response.raise_for_status()
+                return response.json()
+        except requests.exceptions.ConnectionError as e:
+            # ConnectTimeout is a ConnectionError; a ReadTimeout is not.
+            if attempt >= max_retries:
+                raise
+            logger.warning("FastAPI %s connection failed (%s), retrying", path, e)
+        except requests.exceptions.ReadTimeout:
+            if not idempotent or attempt >= max_retries:
+                raise
+            logger.warning("FastAPI %s read timed out, retrying", path)
+
+        delay = _backoff(attempt)
+        left = remaining()
+        if left is not None and left <= delay:
+            raise DeadlineExceeded(f"No time left to retry {path}")
+        time.sleep(delay)
+        attempt += 1
+
+
+def predict(payload, **kwargs):
+    """Score one feature payload with the ``/predict`` endpoint."""
+    kwargs.setdefault('idempotent', True)
+    return post_json(PREDICT_PATH, payload, **kwargs)
+
+
+def predict_batch(payloads, **kwargs):
+    """
+    Score many payloads in one call to the batch endpoint.
+
+    Sends ``{"instances": [...]}`` and returns a list of predicted scores in
+    the same order. The service may answer with ``{"predictions": [...]}``
+    holding either plain numbers or ``{"predicted_score": ...}`` objects.
+    """
+    kwargs.setdefault('idempotent', True)
+    result = post_json(BATCH_PREDICT_PATH, {'instances': list(payloads)}, **kwargs)
+    predictions = result.get('predictions', []) if isinstance(result, dict) else result
+    return [p.get('predicted_score') if isinstance(p, dict) else p for p in predictions]
+
+
+def chatbot_advice(payload, **kwargs):
+    """Ask ``/chatbot-advice`` for a study guide."""
+    return post_json(CHATBOT_ADVICE_PATH, payload, **kwargs)
+
+
+def stream_post(path, payload, timeout=None):
+    """
+    POST ``payload`` and yield the response text as it arrives.
+
+    ``text/event-stream`` responses are parsed as SSE and each event's text is
+    yielded; other chunked responses are yielded as raw decoded chunks. The
+    read timeout applies to each chunk rather than to the whole response, so a
+    long stream is fine but a stalled one is cut off. Not retried: a partial
+    stream cannot be replayed.
+    """
+    if timeout is None:
+        timeout = default_timeout()
+    breaker = get_breaker(path)
+    breaker.allow()
+    outcome = None
+    try:
+        response = get_session().post(
+            f"{base_url()}{path}", json=payload, timeout=bound_timeout(timeout),
+            stream=True, headers={'Accept': 'text/event-stream'},
+        )
+        with response:
+            if 400 <= response.status_code < 500:
+                outcome = 'success'
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '')
+            if content_type.startswith('text/event-stream'):
+                response.encoding = 'utf-8'  # SSE is always UTF-8
+                chunks = _iter_sse(response)
+            elif 'json' in content_type:
+                # Service answered in one piece; hand it over as a single chunk
+                body = response.json()
+                chunks = iter([_event_text(body)])
+            else:
+                response.encoding = response.encoding or 'utf-8'
+                chunks = response.iter_content(chunk_size=None, decode_unicode=True)
+            for chunk in chunks:
+                if chunk:
+                    yield chunk
+        outcome = 'success'
+    except DeadlineExceeded:
+        raise
+    except requests.exceptions.RequestException:
+        if outcome is None:
+            outcome = 'failure'
+        raise
+    finally:
+        if outcome == 'success':
+            breaker.record_success()
+        elif outcome == 'failure':
+            breaker.record_failure()
+        else:
+            # Consumer went away or the budget ran out before we could judge
+            breaker.release()
+
+
+def _event_text(data):
+    """Text carried by one SSE event / JSON body from the guidance service."""
+    if isinstance(data, dict):
+        for key in ('chunk', 'delta', 'text', 'study_guide'):
+            if data.get(key):
+                return str(data[key])
+        return ''
+    return '' if data is None else str(data)
+
+
+def _iter_sse(response):
+    data_lines = []
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            if line.startswith('data:'):
+                value = line[5:]
+                # The spec strips exactly one leading space; token text may need the rest
+                data_lines.append(value[1:] if value.startswith(' ') else value)
+            continue
+        # A blank line ends the event
+        if not data_lines:
+            continue
+        data = '\n'.join(data_lines)
+        data_lines = []
+        if data == '[DONE]':
+            return
+        yield _decode_event(data)
+    if data_lines:
+        data = '\n'.join(data_lines)
+        if data != '[DONE]':
+            yield _decode_event(data)
+
+
+def _decode_event(data):
+    try:
+        return _event_text(json.loads(data))
+    except ValueError:
+        return data
+
+
+def study_plan(payload, **kwargs):
+    """Request a study plan from ``/api/study-plan``."""
+    return post_json(STUDY_PLAN_PATH, payload, **kwargs)
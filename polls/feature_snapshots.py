@@ -0,0 +1,235 @@
+"""
+Column-oriented training-data snapshots (``manage.py snapshot_features``).
+
+A snapshot directory holds one ``.npy`` file per column and a
+``manifest.json``. The feature columns are encoded the way the local
+predictor encodes them (local_predictor.FEATURE_NAMES), and there are also
+``entry_id``, ``subject_id``, ``created_at`` and ``predicted_score``
+columns. Each run appends only entries newer than the manifest's watermark:
+their bytes go at the end of each file, then the array header is rewritten
+in place with the new length. NumPy pads .npy headers so the shape can grow
+without moving the data. A reader therefore memory-maps each column with
+``np.load(path, mmap_mode='r')`` and pays no copy at any size; :func:`load`
+does that for every column.
+
+Only scored entries are snapshotted, and not the local model's fallback
+estimates (``score_degraded``). The watermark never passes an entry
+that still has an open prediction job, so an entry scored late is picked up
+by a later run. A full rebuild (also forced when PREDICTION_MODEL_VERSION
+changes) starts over and includes the archive tier. NumPy is imported
+lazily, as in local_predictor.
+"""
+import json
+import os
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+
+from . import history_archive, local_predictor, prediction_cache
+from .models import CourseSpecificEntry, EntryArchive, PredictionJob
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+# Column name -> NumPy dtype; features follow local_predictor.encode_values()
+COLUMNS = {
+    'entry_id': 'int64',
+    'subject_id': 'int64',
+    'created_at': 'datetime64[us]',
+    **{name: 'float32' for name in local_predictor.FEATURE_NAMES},
+    'predicted_score': 'float32',
+}
+
+_FIELDS = (
+    'id', 'subject_id', 'created_at', 'hours_studied', 'previous_scores', 'extracurricular',
+    'sleep_hours', 'question_papers', 'motivation', 'learning_styles', 'predicted_score',
+)
+
+
+def snapshot_dir():
+    return getattr(settings, 'FEATURE_SNAPSHOT_DIR', settings.BASE_DIR / 'feature_snapshots')
+
+
+def read_manifest(directory):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(directory, manifest):
+    # Written last and swapped in atomically: it is what readers trust
+    path = os.path.join(directory, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _header(dtype, rows):
+    import numpy as np
+
+    return {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': (rows,)}
+
+
+def _create(path, dtype):
+    import numpy as np
+
+    with open(path, 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, _header(dtype, 0))
+
+
+def _append(path, array, rows):
+    """
+    Append ``array`` to the 1-D .npy file at ``path``, which the manifest
+    says holds ``rows`` rows. Bytes past that point (left by an interrupted
+    run) are dropped first.
+    """
+    import numpy as np
+
+    with open(path, 'r+b') as f:
+        np.lib.format.read_magic(f)
+        np.lib.format.read_array_header_1_0(f)
+        offset = f.tell()
+        f.truncate(offset + rows * array.dtype.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(array.tobytes())
+        f.seek(0)
+        np.lib.format.write_array_header_1_0(f, _header(array.dtype, rows + len(array)))
+        if f.tell() != offset:
+            raise ValueError(f"{path}: .npy header no longer fits; rebuild the snapshot with --full")
+
+
+def _encode(rows):
+    """Column arrays for a chunk of _FIELDS value tuples."""
+    import numpy as np
+
+    features = [local_predictor.encode_values(dict(zip(_FIELDS, row))) for row in rows]
+    matrix = np.asarray(features, dtype=np.float32).reshape(len(rows), len(local_predictor.FEATURE_NAMES))
+    columns = {
+        'entry_id': np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+        'subject_id': np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows)),
+        'created_at': np.array([row[2].astimezone(dt_timezone.utc).replace(tzinfo=None) for row in rows],
+                               dtype='datetime64[us]'),
+        'predicted_score': np.fromiter((row[-1] for row in rows), dtype=np.float32, count=len(rows)),
+    }
+    for i, name in enumerate(local_predictor.FEATURE_NAMES):
+        columns[name] = np.ascontiguousarray(matrix[:, i])
+    return columns
+
+
+def _archived_rows():
+    """Every archived entry with a model score as _FIELDS tuples, one archive row at a time."""
+    for archive in EntryArchive.objects.order_by('id').iterator(chunk_size=20):
+        for entry in history_archive.unpack(archive):
+            if entry.predicted_score is not None and not entry.score_degraded:
+                yield tuple(getattr(entry, field) for field in _FIELDS)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _chain(*iterables):
+    for iterable in iterables:
+        yield from iterable
+
+
+def safe_watermark():
+    """
+    The highest entry id that may be snapshotted now: just below the oldest
+    entry still waiting for a prediction job, or None when nothing waits.
+    """
+    waiting = PredictionJob.objects.filter(
+        status__in=[PredictionJob.STATUS_PENDING, PredictionJob.STATUS_RUNNING],
+    ).aggregate(oldest=Min('entry_id'))['oldest']
+    return None if waiting is None else waiting - 1
+
+
+def snapshot(directory=None, full=False, chunk_size=50000):
+    """
+    Bring the snapshot in ``directory`` up to date. Returns a dict with
+    ``appended`` (rows added by this run), ``rows`` (total), ``watermark``
+    and ``full`` (whether it was rebuilt from scratch).
+
+    A full rebuild writes new files next to the old ones and swaps them in
+    at the end, so readers holding the old memory maps are not cut short and
+    an interrupted rebuild leaves the previous snapshot intact.
+    """
+    directory = str(directory or snapshot_dir())
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory)
+    model_version = prediction_cache.model_version()
+    if manifest is None or (
+        manifest.get('format') != FORMAT_VERSION
+        or manifest.get('columns') != COLUMNS
+        or manifest.get('model_version') != model_version
+    ):
+        full = True
+
+    suffix = '.new' if full else ''
+    if full:
+        for name, dtype in COLUMNS.items():
+            _create(os.path.join(directory, f'{name}.npy{suffix}'), dtype)
+        manifest = {
+            'format': FORMAT_VERSION, 'columns': COLUMNS, 'model_version': model_version,
+            'rows': 0, 'watermark': 0, 'created_at': timezone.now().isoformat(),
+        }
+
+    entries = (
+        CourseSpecificEntry.objects
+        .filter(id__gt=manifest['watermark'], predicted_score__isnull=False, score_degraded=False)
+        .order_by('id')
+    )
+    limit = safe_watermark()
+    if limit is not None:
+        entries = entries.filter(id__lte=limit)
+    rows = entries.values_list(*_FIELDS).iterator(chunk_size=chunk_size)
+    if full:
+        rows = _chain(_archived_rows(), rows)
+
+    appended = 0
+    for chunk in _chunks(rows, chunk_size):
+        columns = _encode(chunk)
+        for name in COLUMNS:
+            _append(os.path.join(directory, f'{name}.npy{suffix}'), columns[name], manifest['rows'])
+        manifest['rows'] += len(chunk)
+        manifest['watermark'] = max(manifest['watermark'], int(columns['entry_id'].max()))
+        appended += len(chunk)
+        if not full:
+            # Record progress per chunk, so an interrupted run resumes from here
+            manifest['updated_at'] = timezone.now().isoformat()
+            _write_manifest(directory, manifest)
+
+    if full:
+        for name in COLUMNS:
+            os.replace(os.path.join(directory, f'{name}.npy{suffix}'), os.path.join(directory, f'{name}.npy'))
+    manifest['updated_at'] = timezone.now().isoformat()
+    _write_manifest(directory, manifest)
+    return {'appended': appended, 'rows': manifest['rows'], 'watermark': manifest['watermark'], 'full': full}
+
+
+def load(directory=None):
+    """
+    Every column of a snapshot as a read-only memory map, cut to the rows
+    the manifest vouches for (a slice of a memmap is a view, not a copy).
+    """
+    import numpy as np
+
+    directory = str(directory or snapshot_dir())
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest in {directory}")
+    return {
+        name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')[:manifest['rows']]
+        for name in manifest['columns']
+    }
@@ -1,6 +1,7 @@
 from django import forms
 from .models import SubjectEntry
 from .models import StudyPlanQuestionnaire
+from .models import Extracurricular, LearningStyle, Motivation
 
 class Step1Form(forms.Form):
     subject_name = forms.CharField(
@@ -67,10 +68,11 @@ class Step1Form(forms.Form):
         elif hasattr(self, 'mode') and self.mode == 'not_editing':
             if hasattr(self, 'user') and self.user and hasattr(self.user, 'student'):
                 print(f"DEBUG: not_editing mode - checking for duplicates with name: {name}")
-                # Check for duplicate subject names for this user
+                # Check for duplicate subject names for this user (an indexed
+                # equality lookup on the lower-cased name, not an iexact scan)
                 qs = SubjectEntry.objects.filter(
-                    student=self.user.student, 
-                    subject_name__iexact=name
+                    student=self.user.student,
+                    subject_name_normalized=SubjectEntry.normalize_name(name)
                 )
                 
                 if qs.exists():
@@ -103,7 +105,8 @@ class Step2Form(forms.Form):
         return data
     
 class Step3Form(forms.Form):
-    extracurricular = forms.ChoiceField(label="Do you participate in extracurriculars?", choices=[('Yes', 'Yes'), ('No', 'No')])
+    extracurricular = forms.TypedChoiceField(label="Do you participate in extracurriculars?",
+                                             choices=Extracurricular.choices[::-1], coerce=int)
 
 class Step4Form(forms.Form):
     sleep_hours = forms.FloatField(label="How many hours do you sleep on average?")
@@ -115,18 +118,14 @@ class Step4Form(forms.Form):
         return data
 
 class Step5Form(forms.Form):
-    MOTIVATION_CHOICES = [
-        ('high', 'High'),
-        ('medium', 'Medium'),
-        ('low', 'Low'),
-    ]
+    MOTIVATION_CHOICES = Motivation.choices[::-1]
     
     LEARNING_STYLE_CHOICES = [
-        ('visual', 'Visual Learning (charts, diagrams, images)'),
-        ('auditory', 'Auditory Learning (lectures, discussions, music)'),
-        ('kinesthetic', 'Kinesthetic Learning (hands-on, movement, practice)'),
-        ('reading_writing', 'Reading/Writing Learning (notes, lists, texts)'),
-        ('social', 'Social Learning (group study, collaboration)'),
+        (LearningStyle.VISUAL, 'Visual Learning (charts, diagrams, images)'),
+        (LearningStyle.AUDITORY, 'Auditory Learning (lectures, discussions, music)'),
+        (LearningStyle.KINESTHETIC, 'Kinesthetic Learning (hands-on, movement, practice)'),
+        (LearningStyle.READING_WRITING, 'Reading/Writing Learning (notes, lists, texts)'),
+        (LearningStyle.SOCIAL, 'Social Learning (group study, collaboration)'),
     ]
     
     question_papers = forms.IntegerField(
@@ -138,17 +137,19 @@ class Step5Form(forms.Form):
         })
     )
     
-    motivation = forms.ChoiceField(
+    motivation = forms.TypedChoiceField(
         label="What is your motivation level?",
         choices=MOTIVATION_CHOICES,
+        coerce=int,
         widget=forms.Select(attrs={
             'class': 'form-control'
         })
     )
     
-    preferred_learning_style = forms.MultipleChoiceField(
+    preferred_learning_style = forms.TypedMultipleChoiceField(
         label="Select your preferred learning styles (choose 1-3 options)",
         choices=LEARNING_STYLE_CHOICES,
+        coerce=int,
         widget=forms.CheckboxSelectMultiple(attrs={
             'class': 'learning-style-checkboxes'
         })
@@ -166,7 +167,8 @@ class Step5Form(forms.Form):
             raise forms.ValidationError("Please select at least 1 learning style.")
         if len(data) > 3:
             raise forms.ValidationError("Please select at most 3 learning styles.")
-        return data
+        # Stored as a LearningStyle bitmask
+        return LearningStyle.mask(data)
 
 
 
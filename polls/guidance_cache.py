@@ -0,0 +1,146 @@
+"""
+Cache and single-flight coalescing for /chatbot-advice guidance.
+
+Guidance is keyed on the subject, the predicted score rounded into
+``GUIDANCE_SCORE_BUCKET``-point buckets, the weekly study hours, motivation and
+learning style; it does not depend on who asked, so students with the same
+profile share an answer. Concurrent identical requests in one worker process
+wait for a single upstream call instead of each making their own.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import async_fastapi_client, fastapi_client
+from .deadline import DeadlineExceeded, remaining
+
+CACHE_ALIAS = 'guidance'
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+# Async single-flight: (event loop, key) -> Future of the leader's result
+_ainflight = {}
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _bucket(score):
+    if score is None:
+        return None
+    size = getattr(settings, 'GUIDANCE_SCORE_BUCKET', 5)
+    return int(float(score) // size * size)
+
+
+def cache_key(payload):
+    styles = str(payload.get('preferred_learning_style') or '').split(',')
+    canonical = {
+        'subject': str(payload.get('subject', '')).strip().lower(),
+        'score_bucket': _bucket(payload.get('predicted_score')),
+        'hours': round(float(payload.get('subject_weekly_study_hours') or 0)),
+        'motivation': str(payload.get('motivation_level', '')).strip().lower(),
+        'styles': sorted(s.strip().lower() for s in styles if s.strip()),
+    }
+    raw = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return 'guidance:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def get(payload):
+    return _cache().get(cache_key(payload))
+
+
+def put(payload, result):
+    """Cache a guidance result; empty guides are not cached."""
+    if result and result.get('study_guide'):
+        timeout = getattr(settings, 'GUIDANCE_CACHE_TTL', 60 * 60 * 6)
+        _cache().set(cache_key(payload), result, timeout)
+
+
+def get_guidance(payload):
+    """
+    Return the /chatbot-advice result for ``payload``, from the cache when
+    possible. If an identical request is already in flight in this process,
+    wait for its answer instead of calling the service again.
+    """
+    result = get(payload)
+    if result is not None:
+        return result
+
+    key = cache_key(payload)
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _Call()
+
+    if not leader:
+        wait = remaining()
+        if wait is None:
+            wait = fastapi_client.default_timeout()[1]
+        if not call.event.wait(max(wait, 0)):
+            raise DeadlineExceeded("Timed out waiting for an identical guidance request")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fastapi_client.chatbot_advice(payload)
+        put(payload, call.result)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        call.event.set()
+
+
+async def aget_guidance(payload):
+    """Async version of get_guidance; coalesces identical calls on this event loop."""
+    cache = _cache()
+    key = cache_key(payload)
+    result = await cache.aget(key)
+    if result is not None:
+        return result
+
+    loop = asyncio.get_running_loop()
+    future = _ainflight.get((loop, key))
+    if future is not None:
+        wait = remaining()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), wait if wait is None else max(wait, 0))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("Timed out waiting for an identical guidance request")
+
+    future = _ainflight[(loop, key)] = loop.create_future()
+    try:
+        result = await async_fastapi_client.chatbot_advice(payload)
+        if result and result.get('study_guide'):
+            await cache.aset(key, result, getattr(settings, 'GUIDANCE_CACHE_TTL', 60 * 60 * 6))
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Followers re-raise it; don't warn about an unretrieved exception
+        future.exception()
+        raise
+    finally:
+        _ainflight.pop((loop, key), None)
@@ -0,0 +1,291 @@
+"""
+Course history queries: keyset-paginated prediction tables and downsampled
+chart series.
+
+The table is paged on (created_at, id) rather than by OFFSET, so every page
+costs the same index range scan however deep the student goes. The chart
+reads only the three columns it plots and is reduced to at most
+``HISTORY_CHART_POINTS`` points with Largest-Triangle-Three-Buckets, which
+keeps peaks and dips that plain every-nth sampling would drop.
+
+Ranges that reach back past the archive horizon also pull in the course's
+archive (history_archive.py), so moving old rows out of the hot table does
+not change what the student sees. The chart plots each archived month from
+its stored totals, and the table only unpacks a month's entries once paging
+actually reaches it, so neither costs more as archived history grows.
+"""
+import base64
+import hashlib
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import history_archive
+from .models import CourseStats, EntryArchive
+
+# Time ranges offered on the history page: key -> (label, days or None for all)
+RANGES = {
+    '30d': ('Last 30 days', 30),
+    '90d': ('Last 90 days', 90),
+    '1y': ('Last year', 365),
+    'all': ('All time', None),
+}
+DEFAULT_RANGE = 'all'
+
+
+def selected_range(value):
+    """The range key from a request parameter, falling back to the default."""
+    return value if value in RANGES else DEFAULT_RANGE
+
+
+def range_start(range_key):
+    """Start of the selected time range, or None for all history."""
+    _, days = RANGES.get(range_key, RANGES[DEFAULT_RANGE])
+    if days is None:
+        return None
+    return timezone.now() - timedelta(days=days)
+
+
+def entries_in_range(course, range_key):
+    entries = course.entries.all()
+    since = range_start(range_key)
+    if since is not None:
+        entries = entries.filter(created_at__gte=since)
+    return entries
+
+
+def _key(entry):
+    return entry.created_at, entry.id
+
+
+class ArchivedMonths:
+    """
+    A course's archive rows that overlap the selected range. Only their
+    dates and totals are read up front; a month's packed entries are loaded
+    and unpacked when :meth:`entries` is called for it.
+    """
+
+    def __init__(self, course, range_key):
+        self.since = range_start(range_key)
+        archives = EntryArchive.objects.filter(subject_id=course.id).defer('rows')
+        if self.since is not None:
+            archives = archives.filter(last_created_at__gte=self.since)
+        self.archives = archives
+
+    def entries(self, archive):
+        """The archive's entries inside the range, oldest first."""
+        entries = history_archive.unpack(archive)
+        if self.since is not None:
+            entries = [entry for entry in entries if entry.created_at >= self.since]
+        return entries
+
+    def merge(self, rows, wanted, newest_first, cursor=None):
+        """
+        Merge the archived entries past ``cursor`` into ``rows`` (already in
+        page order) and return the first ``wanted`` of them. Months are
+        visited nearest first and unpacking stops as soon as the next month
+        lies entirely beyond the last row needed.
+        """
+        archives = self.archives
+        if newest_first:
+            if cursor is not None:
+                archives = archives.filter(first_created_at__lte=cursor[0])
+            archives = archives.order_by('-last_created_at')
+        else:
+            if cursor is not None:
+                archives = archives.filter(last_created_at__gte=cursor[0])
+            archives = archives.order_by('first_created_at')
+
+        rows = list(rows)
+        for archive in archives:
+            if len(rows) >= wanted:
+                edge = rows[wanted - 1].created_at
+                if (archive.last_created_at < edge) if newest_first else (archive.first_created_at > edge):
+                    break
+            entries = self.entries(archive)
+            if cursor is not None:
+                entries = [
+                    entry for entry in entries
+                    if (_key(entry) < cursor if newest_first else _key(entry) > cursor)
+                ]
+            rows = sorted(rows + entries, key=_key, reverse=newest_first)[:wanted]
+        return rows
+
+
+def encode_cursor(entry):
+    raw = f"{entry.created_at.isoformat()}|{entry.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (created_at, id) from a cursor token, or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, entry_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(entry_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class Page:
+    """One page of entries, newest first, with cursors for its neighbours."""
+
+    def __init__(self, entries, newer=None, older=None):
+        self.entries = entries
+        self.newer = newer
+        self.older = older
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def keyset_page(queryset, after=None, before=None, page_size=None, archives=None):
+    """
+    Return a Page of ``queryset`` ordered newest first.
+
+    ``after`` continues with entries older than that cursor, ``before``
+    goes back to the entries newer than it; neither gives the newest page.
+    The entries of ``archives`` (an ArchivedMonths) are merged in by the
+    same order.
+    """
+    page_size = page_size or getattr(settings, 'HISTORY_PAGE_SIZE', 20)
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before else None
+
+    if before is not None:
+        created_at, entry_id = before
+        rows = list(
+            queryset
+            .filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=entry_id))
+            .order_by('created_at', 'id')[:page_size + 1]
+        )
+        if archives is not None:
+            rows = archives.merge(rows, page_size + 1, newest_first=False, cursor=before)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        return Page(
+            rows,
+            newer=encode_cursor(rows[0]) if has_more and rows else None,
+            older=encode_cursor(rows[-1]) if rows else None,
+        )
+
+    queryset = queryset.order_by('-created_at', '-id')
+    if after is not None:
+        created_at, entry_id = after
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=entry_id))
+    rows = list(queryset[:page_size + 1])
+    if archives is not None:
+        rows = archives.merge(rows, page_size + 1, newest_first=True, cursor=after)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return Page(
+        rows,
+        newer=encode_cursor(rows[0]) if after is not None and rows else None,
+        older=encode_cursor(rows[-1]) if has_more else None,
+    )
+
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    ``points`` is a list of (x, y) pairs sorted by x. Returns the indices of
+    at most ``threshold`` points to keep, always including the first and last.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    keep = [0]
+    bucket_size = (count - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third corner of the triangle
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, count)
+        span = points[next_start:next_end]
+        avg_x = sum(p[0] for p in span) / len(span)
+        avg_y = sum(p[1] for p in span) / len(span)
+
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        keep.append(best)
+        a = best
+    keep.append(count - 1)
+    return keep
+
+
+def chart_series(course, range_key=DEFAULT_RANGE, max_points=None):
+    """
+    Dates, scores and hours for the course's chart, oldest first, reduced to
+    at most ``max_points`` points (chosen on the score line). Entries without
+    a score are left out. Each archived month in range is one point, its
+    mean score, placed midway through the month's entries and without hours;
+    only a month straddling the start of the range is unpacked.
+    """
+    max_points = max_points or getattr(settings, 'HISTORY_CHART_POINTS', 200)
+    archived = ArchivedMonths(course, range_key)
+    rows = []
+    for archive in archived.archives.order_by('month'):
+        if archived.since is not None and archive.first_created_at < archived.since:
+            rows += [
+                (entry.created_at, entry.predicted_score, entry.hours_studied)
+                for entry in archived.entries(archive)
+                if entry.predicted_score is not None
+            ]
+        elif archive.scored_count:
+            midpoint = archive.first_created_at + (archive.last_created_at - archive.first_created_at) / 2
+            rows.append((midpoint, archive.score_sum / archive.scored_count, None))
+    rows += (
+        entries_in_range(course, range_key)
+        .filter(predicted_score__isnull=False)
+        .order_by('created_at', 'id')
+        .values_list('created_at', 'predicted_score', 'hours_studied')
+    )
+    rows.sort(key=lambda row: row[0])
+    keep = lttb([(created_at.timestamp(), score) for created_at, score, _ in rows], max_points)
+    rows = [rows[i] for i in keep]
+    return {
+        'labels': [created_at.strftime('%Y-%m-%d') for created_at, _, _ in rows],
+        'scores': [float(score) for _, score, _ in rows],
+        'hours': [None if hours is None else float(hours) for _, _, hours in rows],
+    }
+
+
+def chart_etag(course_id, user, range_key=DEFAULT_RANGE):
+    """
+    ETag for a course's chart series, built from its CourseStats row (entry
+    count, latest entry time and last update, which moves whenever a score
+    is written). Returns None when the course is not the user's or has no
+    stats yet, so the caller just serves a fresh response.
+    """
+    row = (
+        CourseStats.objects
+        .filter(subject_id=course_id, subject__student__user=user)
+        .values_list('entry_count', 'last_created_at', 'updated_at')
+        .first()
+    )
+    if row is None:
+        return None
+    count, last_created_at, updated_at = row
+    parts = [
+        course_id, range_key, getattr(settings, 'HISTORY_CHART_POINTS', 200), count,
+        last_created_at.isoformat() if last_created_at else '', updated_at.isoformat(),
+    ]
+    if RANGES[range_key][1] is not None:
+        # Bounded ranges slide forward: let the tag change at least daily
+        parts.append(timezone.now().date().isoformat())
+    return hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest()
@@ -0,0 +1,161 @@
+"""
+Archive tier for old course history.
+
+``manage.py archive_history`` moves CourseSpecificEntry rows older than
+``HISTORY_ARCHIVE_AFTER_DAYS`` into EntryArchive: one row per course and
+month, with the entries stored as compressed JSON next to their totals. The
+hot table and its (subject, created_at) index then only hold recent history.
+Each course keeps its latest entry, and any entry with an open prediction
+job, in the hot table.
+
+Archived entries come back as unsaved CourseSpecificEntry instances, so the
+history page and chart (history.py) and CourseStats (course_stats.py) treat
+them like live rows.
+"""
+import json
+import zlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
+
+from .models import CourseSpecificEntry, CourseStats, EntryArchive, PredictionJob
+
+# Entry columns kept in the archive, in storage order
+COLUMNS = (
+    'id', 'created_at', 'hours_studied', 'previous_scores', 'extracurricular', 'sleep_hours',
+    'question_papers', 'motivation', 'learning_styles', 'predicted_score', 'study_guide',
+    'score_degraded',
+)
+
+# Entries deleted from the hot table per statement
+DELETE_BATCH = 500
+
+
+def month_of(created_at):
+    """First day of the (UTC) month an entry was created in."""
+    return created_at.astimezone(dt_timezone.utc).date().replace(day=1)
+
+
+def pack(entries):
+    rows = []
+    for entry in entries:
+        row = [getattr(entry, column) for column in COLUMNS]
+        row[1] = entry.created_at.isoformat()
+        rows.append(row)
+    return zlib.compress(json.dumps(rows, separators=(',', ':')).encode())
+
+
+def unpack(archive):
+    """The archive's entries as unsaved CourseSpecificEntry instances, oldest first."""
+    entries = []
+    for row in json.loads(zlib.decompress(archive.rows)):
+        values = dict(zip(COLUMNS, row))
+        values['created_at'] = datetime.fromisoformat(values['created_at'])
+        entries.append(CourseSpecificEntry(subject_id=archive.subject_id, **values))
+    return entries
+
+
+def _fill(archive, entries):
+    """Store ``entries`` (one course and month) in ``archive`` and recompute its totals."""
+    entries = sorted({entry.id: entry for entry in entries}.values(), key=lambda e: (e.created_at, e.id))
+    scores = [entry.predicted_score for entry in entries if entry.predicted_score is not None]
+    archive.entry_count = len(entries)
+    archive.scored_count = len(scores)
+    archive.score_sum = sum(scores)
+    archive.score_min = min(scores, default=None)
+    archive.score_max = max(scores, default=None)
+    archive.first_created_at = entries[0].created_at
+    archive.last_created_at = entries[-1].created_at
+    archive.rows = pack(entries)
+
+
+def archive_course(subject_id, cutoff):
+    """Move one course's entries created before ``cutoff`` into its archive. Returns how many moved."""
+    with transaction.atomic():
+        latest_id = (
+            CourseSpecificEntry.objects
+            .filter(subject_id=subject_id)
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        open_jobs = PredictionJob.objects.filter(
+            entry=OuterRef('pk'),
+            status__in=[PredictionJob.STATUS_PENDING, PredictionJob.STATUS_RUNNING],
+        )
+        old = list(
+            CourseSpecificEntry.objects
+            .filter(subject_id=subject_id, created_at__lt=cutoff)
+            .exclude(id=latest_id)
+            .exclude(Exists(open_jobs))
+            .order_by('created_at', 'id')
+        )
+        if not old:
+            return 0
+
+        by_month = {}
+        for entry in old:
+            by_month.setdefault(month_of(entry.created_at), []).append(entry)
+        existing = {
+            archive.month: archive
+            for archive in EntryArchive.objects.select_for_update().filter(subject_id=subject_id, month__in=by_month)
+        }
+        for month, entries in by_month.items():
+            archive = existing.get(month)
+            if archive is None:
+                archive = EntryArchive(subject_id=subject_id, month=month)
+            else:
+                entries = unpack(archive) + entries
+            _fill(archive, entries)
+            archive.save()
+
+        ids = [entry.id for entry in old]
+        for start in range(0, len(ids), DELETE_BATCH):
+            CourseSpecificEntry.objects.filter(id__in=ids[start:start + DELETE_BATCH]).delete()
+        # The chart now shows these months as monthly points: move its ETag on
+        # (history.chart_etag reads CourseStats.updated_at)
+        CourseStats.objects.filter(subject_id=subject_id).update(updated_at=timezone.now())
+    return len(old)
+
+
+def archive(cutoff, subject_ids=None):
+    """
+    Archive entries created before ``cutoff`` for the given courses (all by
+    default), one transaction per course. Returns (courses, entries) moved.
+    """
+    candidates = CourseSpecificEntry.objects.filter(created_at__lt=cutoff)
+    if subject_ids is not None:
+        candidates = candidates.filter(subject_id__in=subject_ids)
+    courses = moved = 0
+    for subject_id in list(candidates.order_by().values_list('subject_id', flat=True).distinct()):
+        count = archive_course(subject_id, cutoff)
+        if count:
+            courses += 1
+            moved += count
+    return courses, moved
+
+
+def archived_entries(subject_id, since=None):
+    """A course's archived entries created at or after ``since`` (all by default), oldest first."""
+    archives = EntryArchive.objects.filter(subject_id=subject_id).order_by('month')
+    if since is not None:
+        archives = archives.filter(last_created_at__gte=since)
+    entries = [entry for archive in archives for entry in unpack(archive)]
+    if since is not None:
+        entries = [entry for entry in entries if entry.created_at >= since]
+    return entries
+
+
+def archived_subject_ids(subject_ids=None):
+    archives = EntryArchive.objects.all()
+    if subject_ids is not None:
+        archives = archives.filter(subject_id__in=subject_ids)
+    return set(archives.values_list('subject_id', flat=True))
+
+
+def score_extremes(subject_id):
+    """(lowest, highest) archived score of a course; None where there is none."""
+    extremes = EntryArchive.objects.filter(subject_id=subject_id).aggregate(low=Min('score_min'), high=Max('score_max'))
+    return extremes['low'], extremes['high']
@@ -0,0 +1,147 @@
+"""
+Streaming export of prediction history as CSV or NDJSON.
+
+Rows are read with ``values_list().iterator(chunk_size=...)`` in id order
+and turned into text one at a time, so an export of millions of entries
+runs in constant memory. The same generators feed the export views
+(StreamingHttpResponse) and ``manage.py export_history``.
+
+Every row carries its entry ``id``, and rows come out in id order. A client
+that was cut off resumes with ``after=<last id it received>``; the command
+keeps that watermark in a file for incremental exports. ``source='archive'``
+exports the archived entries (history_archive.py) instead. Those stream per
+EntryArchive row in archive id order, and the watermark is that id, which
+each row carries in an extra ``archive_id`` column. A client cut off part-way
+through an archive resumes with ``after=<last archive_id> - 1`` and skips the
+entry ids it already has. The encoded
+choice columns are written as the text the wizard shows ('Yes', 'high',
+'visual, social'), which ``manage.py import_records`` reads back.
+"""
+import csv
+import json
+
+from django.utils.text import compress_sequence
+
+from . import history_archive
+from .models import (
+    CourseSpecificEntry, EntryArchive, Extracurricular, LearningStyle, Motivation, choice_code, learning_style_codes,
+)
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+SOURCES = ('live', 'archive')
+
+COLUMNS = (
+    'id', 'username', 'course_id', 'subject_name', 'created_at',
+    'hours_studied', 'previous_scores', 'extracurricular', 'sleep_hours',
+    'question_papers', 'motivation', 'preferred_learning_style', 'predicted_score',
+)
+ARCHIVE_COLUMNS = COLUMNS + ('archive_id',)
+
+_LOOKUPS = (
+    'id', 'subject__student__user__username', 'subject_id', 'subject__subject_name', 'created_at',
+    'hours_studied', 'previous_scores', 'extracurricular', 'sleep_hours',
+    'question_papers', 'motivation', 'learning_styles', 'predicted_score',
+)
+
+# Text for each encoded value, looked up per row
+_EXTRACURRICULAR = {choice.value: choice.label for choice in Extracurricular}
+_MOTIVATION = {choice.value: choice_code(choice) for choice in Motivation}
+_STYLES = {mask: learning_style_codes(mask) for mask in range(1 << len(LearningStyle))}
+
+
+def _as_text(row):
+    row = list(row)
+    row[7] = _EXTRACURRICULAR[row[7]]
+    row[10] = _MOTIVATION[row[10]]
+    row[11] = _STYLES[row[11]]
+    return row
+
+
+def _live_rows(student=None, course_id=None, after=0, chunk_size=2000):
+    entries = CourseSpecificEntry.objects.filter(id__gt=after)
+    if student is not None:
+        entries = entries.filter(subject__student=student)
+    if course_id is not None:
+        entries = entries.filter(subject_id=course_id)
+    for row in entries.order_by('id').values_list(*_LOOKUPS).iterator(chunk_size=chunk_size):
+        yield row[0], _as_text(row)
+
+
+def _archive_rows(student=None, course_id=None, after=0):
+    archives = EntryArchive.objects.filter(id__gt=after).select_related('subject__student__user')
+    if student is not None:
+        archives = archives.filter(subject__student=student)
+    if course_id is not None:
+        archives = archives.filter(subject_id=course_id)
+    # A few archive rows at a time: each holds a whole month of entries
+    for archive in archives.order_by('id').iterator(chunk_size=20):
+        username = archive.subject.student.user.username
+        for entry in history_archive.unpack(archive):
+            yield archive.id, _as_text((
+                entry.id, username, archive.subject_id, archive.subject.subject_name, entry.created_at,
+                entry.hours_studied, entry.previous_scores, entry.extracurricular, entry.sleep_hours,
+                entry.question_papers, entry.motivation, entry.learning_styles, entry.predicted_score,
+            )) + [archive.id]
+
+
+def columns(source='live'):
+    """The column names of ``source``'s rows."""
+    return ARCHIVE_COLUMNS if source == 'archive' else COLUMNS
+
+
+def rows(source='live', student=None, course_id=None, after=0, chunk_size=2000):
+    """
+    Yield (watermark, row in ``columns(source)`` order) for every exported
+    entry, optionally limited to one student and/or course, starting after
+    the ``after`` watermark.
+    """
+    if source == 'archive':
+        return _archive_rows(student, course_id, after)
+    return _live_rows(student, course_id, after, chunk_size)
+
+
+class _Line:
+    """File-like target for csv.writer that hands back each written line."""
+
+    def write(self, value):
+        return value
+
+
+def as_csv(row_iter, columns=COLUMNS):
+    writer = csv.writer(_Line())
+    yield writer.writerow(columns)
+    for _, row in row_iter:
+        yield writer.writerow([value.isoformat() if hasattr(value, 'isoformat') else value for value in row])
+
+
+def as_ndjson(row_iter, columns=COLUMNS):
+    for _, row in row_iter:
+        record = dict(zip(columns, row))
+        record['created_at'] = record['created_at'].isoformat()
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def render(row_iter, fmt, columns=COLUMNS):
+    """The rows as text lines in ``fmt`` ('csv' or 'ndjson') under the given column names."""
+    return as_csv(row_iter, columns) if fmt == 'csv' else as_ndjson(row_iter, columns)
+
+
+def batched(lines, size=64 * 1024):
+    """Join lines into chunks of about ``size`` characters for fewer, larger writes."""
+    parts, length = [], 0
+    for line in lines:
+        parts.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(parts)
+            parts, length = [], 0
+    if parts:
+        yield ''.join(parts)
+
+
+def gzipped(chunks):
+    """gzip the text chunks on the fly (one gzip member, flushed per chunk)."""
+    return compress_sequence(chunk.encode() for chunk in chunks)
@@ -0,0 +1,147 @@
+"""
+In-process ridge regression that mirrors the FastAPI /predict model.
+
+The model is fitted offline by ``manage.py train_local_predictor`` from the
+CourseSpecificEntry feature columns and the scores FastAPI already returned,
+saved as a small ``.npz`` artifact, and loaded lazily on first use. NumPy is
+only needed when the local predictor is actually enabled.
+"""
+import threading
+
+from django.conf import settings
+
+from .models import Extracurricular, LearningStyle, Motivation, choice_code, from_code
+
+LEARNING_STYLES = tuple(choice_code(style) for style in LearningStyle)
+
+FEATURE_NAMES = (
+    'hours_studied', 'previous_scores', 'extracurricular', 'sleep_hours',
+    'question_papers', 'motivation',
+) + tuple(f'style_{style}' for style in LEARNING_STYLES)
+
+_model = None
+_model_lock = threading.Lock()
+
+
+class LocalPredictorUnavailable(Exception):
+    """Raised when no trained artifact (or NumPy) is available."""
+
+
+def artifact_path():
+    return getattr(settings, 'LOCAL_PREDICTOR_PATH', settings.BASE_DIR / 'local_predictor.npz')
+
+
+def encode_values(values):
+    """
+    The numeric feature row for a mapping of stored entry columns
+    (``extracurricular`` and ``motivation`` as their enum values,
+    ``learning_styles`` as a LearningStyle bitmask).
+    """
+    styles = values.get('learning_styles') or 0
+    row = [
+        float(values.get('hours_studied') or 0),
+        float(values.get('previous_scores') or 0),
+        float(values.get('extracurricular') or 0),
+        float(values.get('sleep_hours') or 0),
+        float(values.get('question_papers') or 0),
+        float(values.get('motivation', Motivation.MEDIUM)),
+    ]
+    row.extend(1.0 if styles & style else 0.0 for style in LearningStyle)
+    return row
+
+
+def encode(payload):
+    """Turn one /predict payload (choices as text codes) into the model's feature row."""
+    styles = payload.get('preferred_learning_style') or ''
+    if isinstance(styles, str):
+        styles = styles.split(',')
+    return encode_values({
+        **payload,
+        'extracurricular': from_code(Extracurricular, payload.get('extracurricular', ''), Extracurricular.NO),
+        'motivation': from_code(Motivation, payload.get('motivation', ''), Motivation.MEDIUM),
+        'learning_styles': LearningStyle.mask(from_code(LearningStyle, style, 0) for style in styles),
+    })
+
+
+def fit(X, y, alpha=1.0):
+    """
+    Closed-form ridge regression on standardised features.
+    Returns the dict of arrays that make up the artifact.
+    """
+    import numpy as np
+
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    Z = (X - mean) / scale
+
+    intercept = y.mean()
+    A = Z.T @ Z + alpha * np.eye(Z.shape[1])
+    coef = np.linalg.solve(A, Z.T @ (y - intercept))
+    return {'coef': coef, 'intercept': np.array(intercept), 'mean': mean, 'scale': scale,
+            'features': np.array(FEATURE_NAMES)}
+
+
+def save(model, path=None):
+    import numpy as np
+
+    path = path or artifact_path()
+    np.savez(path, **model)
+    reset()
+    return path
+
+
+def load():
+    """Load the artifact once per process; raises LocalPredictorUnavailable."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    import numpy as np
+                except ImportError as e:
+                    raise LocalPredictorUnavailable("NumPy is not installed") from e
+                try:
+                    with np.load(artifact_path()) as data:
+                        model = {key: data[key] for key in data.files}
+                except FileNotFoundError as e:
+                    raise LocalPredictorUnavailable(f"No artifact at {artifact_path()}") from e
+                if tuple(model['features']) != FEATURE_NAMES:
+                    raise LocalPredictorUnavailable("Artifact was trained on a different feature set")
+                weights, bias = fold(model)
+                # Plain floats: scoring one row is faster without NumPy overhead
+                _model = (weights.tolist(), bias)
+    return _model
+
+
+def fold(model):
+    """
+    Fold the standardisation into the weights so a prediction is a single
+    dot product. Returns ``(weights, bias)``.
+    """
+    weights = model['coef'] / model['scale']
+    bias = float(model['intercept']) - float(weights @ model['mean'])
+    return weights, bias
+
+
+def reset():
+    global _model
+    with _model_lock:
+        _model = None
+
+
+def is_available():
+    try:
+        load()
+    except LocalPredictorUnavailable:
+        return False
+    return True
+
+
+def predict(payload):
+    """Predicted score for one payload, clipped to 0-100."""
+    weights, bias = load()
+    score = bias + sum(w * x for w, x in zip(weights, encode(payload)))
+    return round(min(100.0, max(0.0, score)), 2)
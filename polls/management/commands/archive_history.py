@@ -0,0 +1,33 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from polls import history_archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move prediction entries older than the archive horizon out of the hot "
+        "CourseSpecificEntry table into the compressed per-course monthly archive."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int,
+                            help="Only archive these courses (default: all).")
+        parser.add_argument('--days', type=int, default=getattr(settings, 'HISTORY_ARCHIVE_AFTER_DAYS', 365),
+                            help="Archive entries older than this many days "
+                                 "(default: HISTORY_ARCHIVE_AFTER_DAYS).")
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1.")
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        started = time.monotonic()
+        courses, entries = history_archive.archive(cutoff, options['course_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {entries} entries from {courses} courses created before "
+            f"{cutoff:%Y-%m-%d} in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,96 @@
+import csv
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from polls import record_import
+
+
+class Command(BaseCommand):
+    help = (
+        "Import historical prediction records from CSV or JSONL: one row per past "
+        "prediction, creating users, students and courses as needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or - for standard input.")
+        parser.add_argument('--format', choices=record_import.FORMATS,
+                            help="Input format (default: from the file extension, else csv).")
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Rows written per transaction (default: 2000).")
+        parser.add_argument('--score', action='store_true',
+                            help="Score rows without a predicted_score through the batch endpoint.")
+        parser.add_argument('--rejects',
+                            help="Write rejected rows here as CSV (line, error, row).")
+        parser.add_argument('--progress-every', type=int, default=50000,
+                            help="Report progress every N rows read (default: 50000).")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if path != '-' and not Path(path).exists():
+            raise CommandError(f"No such file: {path}")
+
+        validate = record_import.RowValidator()
+        importer = record_import.Importer(score=options['score'])
+        rejects_file = open(options['rejects'], 'w', newline='') if options['rejects'] else None
+        rejects = csv.writer(rejects_file) if rejects_file else None
+        if rejects:
+            rejects.writerow(['line', 'error', 'row'])
+        reasons = Counter()
+
+        read = rejected = 0
+        started = time.monotonic()
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            batch = []
+            for line, row in record_import.read_rows(stream, fmt):
+                read += 1
+                data, error = validate(row)
+                if error:
+                    rejected += 1
+                    reasons[error.split(':', 1)[0]] += 1
+                    if rejects:
+                        rejects.writerow([line, error, row.get('__error__') or json.dumps(row)])
+                else:
+                    batch.append(data)
+                    if len(batch) >= batch_size:
+                        importer.write(batch)
+                        batch = []
+                if read % options['progress_every'] == 0:
+                    self.progress(read, importer, rejected, started)
+            if batch:
+                importer.write(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects_file:
+                rejects_file.close()
+
+        self.stdout.write("Refreshing courses and their stats...")
+        courses = importer.finish()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.imported} of {read} rows ({rejected} rejected) in {elapsed:.1f}s "
+            f"({read / elapsed if elapsed else 0:.0f} rows/s): {importer.users_created} new students, "
+            f"{importer.courses_created} new courses, {courses} courses refreshed."
+        ))
+        if options['score']:
+            self.stdout.write(f"Scored {importer.scored} rows; {importer.unscored} left without a score.")
+        for reason, count in reasons.most_common(10):
+            self.stdout.write(self.style.WARNING(f"  {count} rejected on {reason}"))
+
+    def progress(self, read, importer, rejected, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"  {read} rows read: {importer.imported} imported, {rejected} rejected, "
+            f"{read / elapsed if elapsed else 0:.0f} rows/s"
+        )
@@ -0,0 +1,177 @@
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.models import Extracurricular, LearningStyle, Motivation
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class VirtualStudent:
+    """One synthetic student driving the app through its own HTTP session."""
+
+    def __init__(self, base_url, record):
+        self.base_url = base_url.rstrip('/')
+        self.record = record
+        self.session = requests.Session()
+        self.username = f"load_{uuid.uuid4().hex[:12]}"
+
+    def request(self, label, method, path, data=None, allow_redirects=True, expect=(200, 302)):
+        if data is not None:
+            data = dict(data, csrfmiddlewaretoken=self.session.cookies.get('csrftoken', ''))
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, data=data,
+                                            allow_redirects=allow_redirects, timeout=60)
+            ok = response.status_code in expect
+        except requests.exceptions.RequestException:
+            response, ok = None, False
+        self.record(label, time.perf_counter() - started, ok)
+        return response
+
+    def signup(self):
+        self.request('signup (GET)', 'GET', '/signup/')
+        password = uuid.uuid4().hex + 'Aa1!'
+        response = self.request('signup (POST)', 'POST', '/signup/', {
+            'username': self.username, 'password1': password, 'password2': password,
+        }, allow_redirects=False, expect=(302,))
+        return response is not None and response.status_code == 302
+
+    def run_wizard(self, start_path, subject_name):
+        """
+        Walk the five wizard steps, or post them all at once when the app
+        serves the single-page wizard (WIZARD_SINGLE_PAGE); returns the
+        course id or None.
+        """
+        start = self.request('wizard start', 'GET', start_path)
+        if start is None:
+            return None
+        steps = [
+            {'0-subject_name': subject_name, '0-previous_scores': random.randint(30, 95)},
+            {'1-hours_studied': random.randint(1, 25)},
+            {'2-extracurricular': random.choice(Extracurricular.values)},
+            {'3-sleep_hours': random.randint(5, 10)},
+            {'4-question_papers': random.randint(0, 12),
+             '4-motivation': random.choice(Motivation.values),
+             '4-preferred_learning_style': random.sample(LearningStyle.values, random.randint(1, 3))},
+        ]
+        if 'data-single-page' in start.text:
+            data = {key: value for step in steps for key, value in step.items()}
+            response = self.request('wizard submit', 'POST', '/create-subject/', data, allow_redirects=False)
+            return self.course_id(response)
+
+        response = None
+        for number, step in enumerate(steps):
+            # The sync and async wizards use different management-form prefixes
+            step = dict(step, **{
+                'subject_wizard-current_step': str(number),
+                'async_subject_wizard-current_step': str(number),
+            })
+            response = self.request(f'wizard step {number + 1}', 'POST', '/create-subject/', step,
+                                    allow_redirects=False)
+            if response is None:
+                return None
+        return self.course_id(response)
+
+    @staticmethod
+    def course_id(response):
+        """The course id from the wizard's final redirect, or None."""
+        if response is None or response.status_code != 302:
+            return None
+        match = re.search(r'/course/(\d+)/', response.headers.get('Location', ''))
+        return int(match.group(1)) if match else None
+
+    def run(self, courses, predictions, guidance):
+        if not self.signup():
+            return
+        for n in range(courses):
+            course_id = self.run_wizard('/new-course/', f"Course {n + 1}")
+            if course_id is None:
+                continue
+            for _ in range(predictions - 1):
+                self.run_wizard(f'/course/new-prediction/{course_id}/', f"Course {n + 1}")
+            self.request('subject_dashboard', 'GET', f'/course/{course_id}/')
+            self.request('course_history_dashboard', 'GET', f'/course/{course_id}/history/')
+            if guidance:
+                self.request('guidance', 'POST', f'/guidance/{course_id}/', {}, allow_redirects=False)
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a running instance of the app with concurrent synthetic students "
+        "(signup, the wizard in either mode, dashboards and guidance) and report "
+        "p50/p95/p99 latency and requests/s per endpoint. Point the app at "
+        "`manage.py run_fastapi_stub` to test without the real model service."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8001',
+                            help="URL of the app under test (default: http://127.0.0.1:8001).")
+        parser.add_argument('--users', type=int, default=20, help="Synthetic students (default: 20).")
+        parser.add_argument('--concurrency', type=int, default=10,
+                            help="Students active at the same time (default: 10).")
+        parser.add_argument('--courses', type=int, default=2, help="Courses per student (default: 2).")
+        parser.add_argument('--predictions', type=int, default=2,
+                            help="Wizard runs per course, including the first (default: 2).")
+        parser.add_argument('--no-guidance', action='store_true', help="Skip the guidance requests.")
+
+    def handle(self, *args, **options):
+        try:
+            requests.get(options['base_url'], timeout=5)
+        except requests.exceptions.RequestException as e:
+            raise CommandError(f"App not reachable at {options['base_url']}: {e}")
+
+        samples = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+
+        def record(label, seconds, ok):
+            with lock:
+                samples[label].append(seconds)
+                if not ok:
+                    errors[label] += 1
+
+        def one_student(_):
+            VirtualStudent(options['base_url'], record).run(
+                options['courses'], options['predictions'], not options['no_guidance'],
+            )
+
+        self.stdout.write(
+            f"Running {options['users']} students, {options['concurrency']} at a time, "
+            f"against {options['base_url']}..."
+        )
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(one_student, range(options['users'])))
+        elapsed = time.perf_counter() - started
+
+        header = f"{'endpoint':<26}{'count':>7}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>8}"
+        self.stdout.write("\n" + header)
+        self.stdout.write("-" * len(header))
+        total = 0
+        for label, values in samples.items():
+            values.sort()
+            total += len(values)
+            self.stdout.write(
+                f"{label:<26}{len(values):>7}{errors[label]:>8}"
+                f"{percentile(values, 50) * 1000:>9.1f}{percentile(values, 95) * 1000:>9.1f}"
+                f"{percentile(values, 99) * 1000:>9.1f}{len(values) / elapsed:>8.1f}"
+            )
+        self.stdout.write("-" * len(header))
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s), "
+            f"{sum(errors.values())} errors"
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from polls import prediction_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the prediction cache hit/miss counters for the current model version. "
+        "Needs a shared cache backend; with LocMemCache use the staff-only "
+        "/staff/prediction-cache-stats/ page of a running server instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        if prediction_cache.is_process_local():
+            raise CommandError(
+                f"CACHES['{prediction_cache.CACHE_ALIAS}'] is process-local, so this command cannot see the "
+                "server's counters. Open /staff/prediction-cache-stats/ on the running server instead."
+            )
+        stats = prediction_cache.stats()
+        self.stdout.write(
+            f"Model version {stats['model_version']}: {stats['hits']} hits, "
+            f"{stats['misses']} misses, hit ratio {stats['hit_ratio']:.1%}"
+        )
+        if options['reset']:
+            prediction_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
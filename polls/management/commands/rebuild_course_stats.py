@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from polls import course_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-course CourseStats rows from the prediction entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int,
+                            help="Only rebuild these courses (default: all).")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Rows fetched per database round-trip (default: 2000).")
+
+    def handle(self, *args, **options):
+        count = course_stats.rebuild(options['course_ids'] or None, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} courses."))
@@ -0,0 +1,166 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from polls import fastapi_client, prediction_cache, prediction_records
+from polls.circuit_breaker import CircuitOpenError
+from polls.deadline import DeadlineExceeded
+from polls.models import CourseSpecificEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-score every CourseSpecificEntry with the current FastAPI model and "
+        "refresh SubjectEntry.predicted_score from each course's latest entry."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Entries scored and written per batch (default: 500).")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Rows fetched per database round-trip (default: 2000).")
+        parser.add_argument('--workers', type=int, default=8,
+                            help="Concurrent /predict calls when fanning out (default: 8).")
+        parser.add_argument('--mode', choices=['auto', 'batch', 'fanout'], default='auto',
+                            help="'batch' uses the batch endpoint, 'fanout' calls /predict per row, "
+                                 "'auto' tries batch and falls back to fan-out (default).")
+        parser.add_argument('--checkpoint', default=str(Path(settings.BASE_DIR) / '.rescore_checkpoint.json'),
+                            help="File recording the last rescored entry id and the ids that failed.")
+        parser.add_argument('--resume', action='store_true',
+                            help="Retry the failed ids and continue after the last id in the checkpoint file.")
+        parser.add_argument('--max-failures', type=int, default=100,
+                            help="Stop once this many rows have failed to score (default: 100).")
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.workers = options['workers']
+        self.mode = options['mode']
+        self.max_failures = options['max_failures']
+        checkpoint = Path(options['checkpoint'])
+
+        self.last_id = 0
+        # Rows that failed to score; kept in the checkpoint and retried on --resume
+        self.failed_ids = set()
+        if options['resume'] and checkpoint.exists():
+            state = json.loads(checkpoint.read_text())
+            if state.get('model_version') != prediction_cache.model_version():
+                raise CommandError(
+                    f"Checkpoint was written for model version {state.get('model_version')}, "
+                    f"current version is {prediction_cache.model_version()}. Run without --resume."
+                )
+            self.last_id = state['last_id']
+            self.failed_ids = set(state.get('failed_ids', []))
+            self.stdout.write(
+                f"Resuming after entry id {self.last_id}, retrying {len(self.failed_ids)} failed entries."
+            )
+
+        fields = ['id', 'subject', 'created_at', 'predicted_score', 'hours_studied', 'previous_scores', 'extracurricular', 'sleep_hours',
+                  'question_papers', 'motivation', 'learning_styles']
+        queryset = (
+            CourseSpecificEntry.objects
+            .filter(Q(id__gt=self.last_id) | Q(id__in=self.failed_ids))
+            .order_by('id')
+            .only(*fields)
+        )
+
+        self.scored = self.failed = 0
+        self.courses = set()
+        started = time.monotonic()
+        batch = []
+        with ThreadPoolExecutor(max_workers=self.workers) as self.executor:
+            for entry in queryset.iterator(chunk_size=options['chunk_size']):
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    self.flush(batch, checkpoint, started)
+                    batch = []
+            if batch:
+                self.flush(batch, checkpoint, started)
+
+        elapsed = time.monotonic() - started
+        rate = self.scored / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {self.scored} entries ({self.failed} failed) and {len(self.courses)} courses "
+            f"in {elapsed:.1f}s ({rate:.0f} rows/s)."
+        ))
+        if self.failed_ids:
+            self.stdout.write(self.style.WARNING(
+                f"{len(self.failed_ids)} entries still failed; run again with --resume to retry them."
+            ))
+        elif checkpoint.exists():
+            checkpoint.unlink()
+
+    def write_checkpoint(self, checkpoint):
+        checkpoint.write_text(json.dumps({
+            'last_id': self.last_id,
+            'failed_ids': sorted(self.failed_ids),
+            'model_version': prediction_cache.model_version(),
+        }))
+
+    def flush(self, batch, checkpoint, started):
+        try:
+            scores = self.score(batch)
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            # Every remaining row would fail the same way. Nothing in this
+            # batch is written or checkpointed, so --resume starts with it.
+            raise CommandError(
+                f"Prediction service unavailable ({e}); stopped before entry id {batch[0].id}. "
+                f"Run again with --resume once it recovers."
+            )
+        scored = []
+        for entry, score in zip(batch, scores):
+            if score is None:
+                self.failed += 1
+                self.failed_ids.add(entry.id)
+                continue
+            self.failed_ids.discard(entry.id)
+            prediction_cache.put(entry.prediction_payload(), {'predicted_score': score})
+            scored.append((entry, score))
+        # Entries, their courses' latest scores and the stats in one transaction
+        self.courses |= prediction_records.record_scores(scored)
+        self.scored += len(scored)
+
+        # Retried ids can be older than the checkpoint: never move it back
+        self.last_id = max(self.last_id, batch[-1].id)
+        self.write_checkpoint(checkpoint)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"  up to id {self.last_id}: {self.scored} scored, {self.failed} failed, "
+            f"{self.scored / elapsed if elapsed else 0:.0f} rows/s"
+        )
+        if self.failed >= self.max_failures:
+            raise CommandError(
+                f"{self.failed} entries failed to score; stopped after entry id {self.last_id}. "
+                f"Run again with --resume to retry them."
+            )
+
+    def score(self, batch):
+        payloads = [entry.prediction_payload() for entry in batch]
+        if self.mode in ('auto', 'batch'):
+            try:
+                scores = fastapi_client.predict_batch(payloads)
+                if len(scores) != len(payloads):
+                    raise ValueError(f"got {len(scores)} scores for {len(payloads)} rows")
+                return scores
+            except (requests.exceptions.RequestException, ValueError) as e:
+                if self.mode == 'batch':
+                    raise CommandError(f"Batch prediction failed: {e}")
+                self.stdout.write(self.style.WARNING(
+                    f"Batch endpoint unavailable ({e}); falling back to /predict fan-out."
+                ))
+                self.mode = 'fanout'
+        return list(self.executor.map(self.score_one, payloads))
+
+    def score_one(self, payload):
+        try:
+            return fastapi_client.predict(payload).get('predicted_score')
+        except (CircuitOpenError, DeadlineExceeded):
+            # Not this row's fault: let flush() stop the run
+            raise
+        except requests.exceptions.RequestException:
+            return None
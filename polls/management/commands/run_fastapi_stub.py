@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from polls import stub_service
+
+
+class Command(BaseCommand):
+    help = "Serve a local stand-in for the FastAPI prediction and guidance service."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8000)
+        parser.add_argument('--latency', choices=['fixed', 'uniform', 'exponential', 'lognormal'],
+                            default='lognormal', help="Response time distribution (default: lognormal).")
+        parser.add_argument('--latency-mean', type=float, default=50,
+                            help="Mean response time in milliseconds (default: 50).")
+        parser.add_argument('--latency-sigma', type=float, default=0.5,
+                            help="Spread of the lognormal distribution (default: 0.5).")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Fraction of requests answered with 503 (default: 0).")
+        parser.add_argument('--hang-rate', type=float, default=0.0,
+                            help="Fraction of requests that hang for --hang-seconds (default: 0).")
+        parser.add_argument('--hang-seconds', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        latency = stub_service.Latency(
+            options['latency'], options['latency_mean'] / 1000, options['latency_sigma'],
+        )
+        server = stub_service.StubServer(
+            (options['host'], options['port']),
+            stub_service.make_handler(
+                latency,
+                error_rate=options['error_rate'],
+                hang_rate=options['hang_rate'],
+                hang_seconds=options['hang_seconds'],
+            ),
+        )
+        self.stdout.write(
+            f"FastAPI stub on http://{options['host']}:{options['port']} "
+            f"({options['latency']} latency, mean {options['latency_mean']:.0f} ms, "
+            f"{options['error_rate']:.0%} errors, {options['hang_rate']:.0%} hangs). Ctrl-C to stop."
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
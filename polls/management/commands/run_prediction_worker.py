@@ -0,0 +1,47 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from polls import prediction_jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued prediction jobs and write the scores back to their entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the queue once and exit instead of polling forever.")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty (default: 1).")
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help="Requeue jobs left running for this many seconds (default: 300).")
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options['stale_after'])
+        processed = failed = 0
+
+        self.stdout.write("Prediction worker started.")
+        try:
+            while True:
+                requeued = prediction_jobs.requeue_stale(stale_after)
+                if requeued:
+                    self.stdout.write(f"Requeued {requeued} stale job(s).")
+
+                job = prediction_jobs.claim_next()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                if prediction_jobs.run_job(job):
+                    processed += 1
+                else:
+                    failed += 1
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Prediction worker stopped: {processed} scored, {failed} failed attempt(s)."
+        ))
@@ -0,0 +1,46 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from polls import sqlite_tuning
+
+
+class Command(BaseCommand):
+    help = (
+        "Checkpoint the SQLite write-ahead log and run PRAGMA optimize. "
+        "Run it from cron, or keep it running with --interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=sqlite_tuning.CHECKPOINT_MODES, default='TRUNCATE',
+                            help="wal_checkpoint mode (default: TRUNCATE, which also shrinks the WAL file).")
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Repeat every this many seconds instead of running once.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("sqlite_maintenance only applies to the SQLite backend.")
+
+        while True:
+            self.run_once(options['mode'])
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def run_once(self, mode):
+        wal_path = f"{connection.settings_dict['NAME']}-wal"
+        if sqlite_tuning.journal_mode() != 'wal':
+            self.stdout.write("Database is not in WAL mode; only running PRAGMA optimize.")
+        else:
+            size_before = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+            busy, frames, checkpointed = sqlite_tuning.checkpoint(mode)
+            size_after = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+            message = (
+                f"Checkpoint ({mode}): {checkpointed}/{frames} WAL frames written back, "
+                f"WAL {size_before / 1024:.0f} KiB -> {size_after / 1024:.0f} KiB"
+            )
+            self.stdout.write(self.style.WARNING(message + " (blocked by a reader)") if busy else message)
+        sqlite_tuning.optimize()
+        self.stdout.write(self.style.SUCCESS("PRAGMA optimize done."))
@@ -0,0 +1,28 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .deadline import deadline
+
+
+class RequestDeadlineMiddleware:
+    """
+    Give every request a REQUEST_DEADLINE-second budget for outbound calls.
+    Works in both sync and async chains so async views stay on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with deadline(getattr(settings, 'REQUEST_DEADLINE', None)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with deadline(getattr(settings, 'REQUEST_DEADLINE', None)):
+            return await self.get_response(request)
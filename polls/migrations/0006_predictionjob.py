@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0005_coursespecificentry_studyplanquestionnaire'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prediction_jobs', to='polls.coursespecificentry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='predjob_status_run_after')],
+            },
+        ),
+    ]
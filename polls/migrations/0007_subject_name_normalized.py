@@ -0,0 +1,56 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_normalized_names(apps, schema_editor):
+    """
+    Fill subject_name_normalized for existing courses. The old constraint was
+    case-sensitive, so a student may already have both "Maths" and "maths";
+    later duplicates get their id appended so the new unique index can be
+    built without deleting anyone's history.
+    """
+    SubjectEntry = apps.get_model('polls', 'SubjectEntry')
+    seen = set()
+    to_update = []
+    for subject in SubjectEntry.objects.order_by('id').only('id', 'student_id', 'subject_name').iterator():
+        normalized = (subject.subject_name or '').strip().lower()
+        if (subject.student_id, normalized) in seen:
+            normalized = f"{normalized[:90]}#{subject.id}"
+        seen.add((subject.student_id, normalized))
+        subject.subject_name_normalized = normalized
+        to_update.append(subject)
+    SubjectEntry.objects.bulk_update(to_update, ['subject_name_normalized'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0006_predictionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subjectentry',
+            name='subject_name_normalized',
+            field=models.CharField(default='', editable=False, max_length=100),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_normalized_names, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='subjectentry',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='subjectentry',
+            constraint=models.UniqueConstraint(fields=('student', 'subject_name_normalized'), name='unique_subject_name_per_student'),
+        ),
+        migrations.AlterField(
+            model_name='coursespecificentry',
+            name='subject',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='polls.subjectentry'),
+        ),
+        migrations.AddIndex(
+            model_name='coursespecificentry',
+            index=models.Index(fields=['subject', 'created_at'], name='entry_subject_created_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_course_stats(apps, schema_editor):
+    """Same computation as polls.course_stats.rebuild, on the historical models."""
+    CourseStats = apps.get_model('polls', 'CourseStats')
+    CourseSpecificEntry = apps.get_model('polls', 'CourseSpecificEntry')
+    SubjectEntry = apps.get_model('polls', 'SubjectEntry')
+
+    built = {}
+    rows = (
+        CourseSpecificEntry.objects
+        .order_by('subject_id', 'created_at', 'id')
+        .values_list('subject_id', 'created_at', 'predicted_score')
+    )
+    for subject_id, created_at, score in rows.iterator(chunk_size=2000):
+        stats = built.get(subject_id)
+        if stats is None:
+            stats = built[subject_id] = CourseStats(subject_id=subject_id, origin=created_at)
+        stats.entry_count += 1
+        stats.last_created_at = created_at
+        stats.last_score = score
+        if score is not None:
+            x = (created_at - stats.origin).total_seconds() / 86400
+            stats.scored_count += 1
+            stats.score_sum += score
+            stats.sum_x += x
+            stats.sum_xx += x * x
+            stats.sum_xy += x * score
+            stats.score_min = score if stats.score_min is None else min(stats.score_min, score)
+            stats.score_max = score if stats.score_max is None else max(stats.score_max, score)
+
+    CourseStats.objects.bulk_create(
+        [built.get(subject_id) or CourseStats(subject_id=subject_id)
+         for subject_id in SubjectEntry.objects.order_by('id').values_list('id', flat=True)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0007_subject_name_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('subject', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='polls.subjectentry')),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('scored_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_min', models.FloatField(blank=True, null=True)),
+                ('score_max', models.FloatField(blank=True, null=True)),
+                ('last_score', models.FloatField(blank=True, null=True)),
+                ('last_created_at', models.DateTimeField(blank=True, null=True)),
+                ('origin', models.DateTimeField(blank=True, null=True)),
+                ('sum_x', models.FloatField(default=0)),
+                ('sum_xx', models.FloatField(default=0)),
+                ('sum_xy', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_course_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0008_coursestats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntryArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('scored_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_min', models.FloatField(blank=True, null=True)),
+                ('score_max', models.FloatField(blank=True, null=True)),
+                ('first_created_at', models.DateTimeField()),
+                ('last_created_at', models.DateTimeField()),
+                ('rows', models.BinaryField()),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='polls.subjectentry')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('subject', 'month'), name='unique_archive_month_per_course')],
+            },
+        ),
+    ]
@@ -0,0 +1,236 @@
+import json
+import zlib
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+# Frozen copies of the encodings in polls.models at the time of this migration
+STYLE_BITS = {'visual': 1, 'auditory': 2, 'kinesthetic': 4, 'reading_writing': 8, 'social': 16}
+MOTIVATIONS = {'low': 0, 'medium': 1, 'high': 2}
+
+# Free-text variants found in existing rows, mapped to the codes above.
+# Anything else is stored as the field default and reported.
+MOTIVATION_ALIASES = {
+    'very low': 'low', 'okay': 'medium', 'ok': 'medium', 'average': 'medium',
+    'moderate': 'medium', 'very high': 'high',
+}
+EXTRACURRICULAR_TEXT = {'yes': 1, 'y': 1, 'true': 1, 'no': 0, 'n': 0, 'false': 0}
+# Words that mark each style inside a free-text learning style
+STYLE_WORDS = {
+    'visual': ('visual',),
+    'auditory': ('auditory', 'audio'),
+    'kinesthetic': ('kinesthetic', 'kinaesthetic', 'hands-on'),
+    'reading_writing': ('reading_writing', 'reading', 'read and write', 'writing'),
+    'social': ('social',),
+}
+
+# Positions of extracurricular, motivation and the learning styles in an
+# EntryArchive row (history_archive.COLUMNS)
+ARCHIVE_EXTRACURRICULAR, ARCHIVE_MOTIVATION, ARCHIVE_STYLES = 4, 7, 8
+
+
+def _clean(text):
+    return str(text if text is not None else '').strip().lower()
+
+
+def encode_extracurricular(text):
+    """(value, recognised) for a stored extracurricular text."""
+    text = _clean(text)
+    return EXTRACURRICULAR_TEXT.get(text, 0), text in EXTRACURRICULAR_TEXT or not text
+
+
+def encode_motivation(text):
+    text = _clean(text)
+    code = MOTIVATION_ALIASES.get(text, text)
+    return MOTIVATIONS.get(code, MOTIVATIONS['medium']), code in MOTIVATIONS or not text
+
+
+def encode_styles(text):
+    text = _clean(text)
+    mask = sum(bit for code, bit in STYLE_BITS.items() if any(word in text for word in STYLE_WORDS[code]))
+    return mask, bool(mask) or text in ('', 'none')
+
+
+def decode_styles(mask):
+    return ", ".join(code for code, bit in STYLE_BITS.items() if mask & bit) or 'None'
+
+
+class Unrecognised:
+    """Counts the stored values that fell back to a default, for the report."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, where, value, count=1):
+        self.counts[where, value] = self.counts.get((where, value), 0) + count
+
+    def report(self):
+        if self.counts:
+            print()
+        for (where, value), count in sorted(self.counts.items(), key=str):
+            print(f"  polls.0010: {count} {where} value(s) {value!r} not recognised; stored the default")
+
+
+def _encoded(model, unrecognised):
+    """
+    Backfill the integer columns from the text ones. Each text column has few
+    distinct values, so each is mapped in Python and written with one CASE
+    UPDATE per table.
+    """
+    updates = {}
+    for text_field, code_field, encode, default in (
+        ('extracurricular', 'extracurricular_code', encode_extracurricular, 0),
+        ('motivation', 'motivation_code', encode_motivation, MOTIVATIONS['medium']),
+        ('preferred_learning_style', 'learning_styles', encode_styles, 0),
+    ):
+        whens = []
+        for text, count in model.objects.values_list(text_field).annotate(n=models.Count('id')).order_by():
+            value, recognised = encode(text)
+            if not recognised:
+                unrecognised.add(f"{model._meta.model_name}.{text_field}", text, count)
+            if text is not None and value != default:
+                whens.append(When(**{text_field: text}, then=Value(value)))
+        updates[code_field] = Case(*whens, default=Value(default)) if whens else Value(default)
+    model.objects.update(**updates)
+
+
+def _repack(EntryArchive, convert):
+    for archive in EntryArchive.objects.only('id', 'rows').iterator(chunk_size=50):
+        rows = json.loads(zlib.decompress(archive.rows))
+        for row in rows:
+            convert(row)
+        archive.rows = zlib.compress(json.dumps(rows, separators=(',', ':')).encode())
+        archive.save(update_fields=['rows'])
+
+
+def encode_choices(apps, schema_editor):
+    """
+    Backfill the integer columns from the text ones, and re-encode the
+    entries stored in EntryArchive rows. Values that match no known variant
+    are stored as the field default and listed at the end.
+    """
+    unrecognised = Unrecognised()
+    for name in ('SubjectEntry', 'CourseSpecificEntry'):
+        _encoded(apps.get_model('polls', name), unrecognised)
+
+    def convert(row):
+        for position, field, encode in (
+            (ARCHIVE_EXTRACURRICULAR, 'extracurricular', encode_extracurricular),
+            (ARCHIVE_MOTIVATION, 'motivation', encode_motivation),
+            (ARCHIVE_STYLES, 'preferred_learning_style', encode_styles),
+        ):
+            value, recognised = encode(row[position])
+            if not recognised:
+                unrecognised.add(f"entryarchive.{field}", row[position])
+            row[position] = value
+
+    _repack(apps.get_model('polls', 'EntryArchive'), convert)
+    unrecognised.report()
+
+
+def decode_choices(apps, schema_editor):
+    """Reverse of encode_choices: write the text values back."""
+    motivations = {value: code for code, value in MOTIVATIONS.items()}
+    for name in ('SubjectEntry', 'CourseSpecificEntry'):
+        model = apps.get_model('polls', name)
+        model.objects.update(
+            extracurricular=Case(When(extracurricular_code=1, then=Value('Yes')), default=Value('No')),
+            motivation=Case(
+                *[When(motivation_code=value, then=Value(code)) for value, code in motivations.items()],
+                default=Value('medium'),
+            ),
+        )
+        for mask in model.objects.values_list('learning_styles', flat=True).distinct():
+            model.objects.filter(learning_styles=mask).update(preferred_learning_style=decode_styles(mask))
+
+    def convert(row):
+        row[ARCHIVE_EXTRACURRICULAR] = 'Yes' if row[ARCHIVE_EXTRACURRICULAR] else 'No'
+        row[ARCHIVE_MOTIVATION] = motivations.get(row[ARCHIVE_MOTIVATION], 'medium')
+        row[ARCHIVE_STYLES] = decode_styles(row[ARCHIVE_STYLES])
+
+    _repack(apps.get_model('polls', 'EntryArchive'), convert)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0009_entryarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subjectentry',
+            name='extracurricular_code',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'No'), (1, 'Yes')], default=0),
+        ),
+        migrations.AddField(
+            model_name='subjectentry',
+            name='motivation_code',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Low'), (1, 'Medium'), (2, 'High')], default=1),
+        ),
+        migrations.AddField(
+            model_name='subjectentry',
+            name='learning_styles',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursespecificentry',
+            name='extracurricular_code',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'No'), (1, 'Yes')], default=0),
+        ),
+        migrations.AddField(
+            model_name='coursespecificentry',
+            name='motivation_code',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Low'), (1, 'Medium'), (2, 'High')], default=1),
+        ),
+        migrations.AddField(
+            model_name='coursespecificentry',
+            name='learning_styles',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(encode_choices, decode_choices),
+        migrations.RemoveField(
+            model_name='subjectentry',
+            name='extracurricular',
+        ),
+        migrations.RemoveField(
+            model_name='subjectentry',
+            name='motivation',
+        ),
+        migrations.RemoveField(
+            model_name='subjectentry',
+            name='preferred_learning_style',
+        ),
+        migrations.RenameField(
+            model_name='subjectentry',
+            old_name='extracurricular_code',
+            new_name='extracurricular',
+        ),
+        migrations.RenameField(
+            model_name='subjectentry',
+            old_name='motivation_code',
+            new_name='motivation',
+        ),
+        migrations.RemoveField(
+            model_name='coursespecificentry',
+            name='extracurricular',
+        ),
+        migrations.RemoveField(
+            model_name='coursespecificentry',
+            name='motivation',
+        ),
+        migrations.RemoveField(
+            model_name='coursespecificentry',
+            name='preferred_learning_style',
+        ),
+        migrations.RenameField(
+            model_name='coursespecificentry',
+            old_name='extracurricular_code',
+            new_name='extracurricular',
+        ),
+        migrations.RenameField(
+            model_name='coursespecificentry',
+            old_name='motivation_code',
+            new_name='motivation',
+        ),
+    ]
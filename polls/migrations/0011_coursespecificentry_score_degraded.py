@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0010_encoded_choices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursespecificentry',
+            name='score_degraded',
+            field=models.BooleanField(default=False),
+        ),
+    ]
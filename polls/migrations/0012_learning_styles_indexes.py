@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0011_coursespecificentry_score_degraded'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coursespecificentry',
+            index=models.Index(fields=['learning_styles'], name='entry_learning_styles_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subjectentry',
+            index=models.Index(fields=['learning_styles'], name='subject_learning_styles_idx'),
+        ),
+    ]
@@ -1,7 +1,70 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Create your models here.
+
+#Small-integer encodings of the categorical wizard inputs. The forms post
+#these values and the tables store them; the text codes ('yes', 'high',
+#'reading_writing') only appear in the payloads sent to FastAPI.
+class Extracurricular(models.IntegerChoices):
+    NO = 0, 'No'
+    YES = 1, 'Yes'
+
+
+class Motivation(models.IntegerChoices):
+    LOW = 0, 'Low'
+    MEDIUM = 1, 'Medium'
+    HIGH = 2, 'High'
+
+
+#Bit flags: a learning_styles column holds the OR of the chosen styles.
+class LearningStyle(models.IntegerChoices):
+    VISUAL = 1, 'Visual'
+    AUDITORY = 2, 'Auditory'
+    KINESTHETIC = 4, 'Kinesthetic'
+    READING_WRITING = 8, 'Reading/Writing'
+    SOCIAL = 16, 'Social'
+
+    @classmethod
+    def mask(cls, styles):
+        """OR of ``styles`` (members or their integer values)."""
+        mask = 0
+        for style in styles:
+            mask |= int(style)
+        return mask
+
+    @classmethod
+    def split(cls, mask):
+        """The styles set in ``mask``, in declaration order."""
+        return [style for style in cls if mask & style]
+
+    @classmethod
+    def masks_with(cls, style):
+        """
+        Every mask that includes ``style``. Filtering on
+        ``learning_styles__in=LearningStyle.masks_with(...)`` is a plain
+        IN lookup, which the learning_styles indexes of SubjectEntry and
+        CourseSpecificEntry serve.
+        """
+        return [mask for mask in range(1 << len(cls)) if mask & style]
+
+
+def choice_code(member):
+    """The text code of an encoded choice, e.g. 'yes', 'high', 'reading_writing'."""
+    return member.name.lower()
+
+
+def from_code(choices, code, default=None):
+    """Inverse of choice_code (case-insensitive); ``default`` for an unknown code."""
+    return choices.__members__.get(str(code).strip().upper(), default)
+
+
+def learning_style_codes(mask):
+    """The styles in ``mask`` as the comma-joined codes the FastAPI service expects."""
+    return ", ".join(choice_code(style) for style in LearningStyle.split(mask)) or 'None'
+
+
 class Student(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -12,28 +75,56 @@ class Student(models.Model):
 
 #This is the database per course.
 class CourseSpecificEntry(models.Model):
-    # Link to the parent course
-    subject = models.ForeignKey('SubjectEntry', on_delete=models.CASCADE, related_name='entries')
+    # Link to the parent course. No index of its own: the (subject, created_at)
+    # index below starts with subject and serves the same lookups.
+    subject = models.ForeignKey('SubjectEntry', on_delete=models.CASCADE, related_name='entries', db_index=False)
     
     # Entry-specific data
     hours_studied = models.FloatField(default=0)
     previous_scores = models.FloatField(default=50)
-    extracurricular = models.CharField(max_length=10, choices=[('Yes', 'Yes'), ('No', 'No')], default='No')
+    extracurricular = models.PositiveSmallIntegerField(choices=Extracurricular.choices, default=Extracurricular.NO)
     sleep_hours = models.FloatField(default=8)
     question_papers = models.IntegerField(default=0)
-    motivation = models.CharField(max_length=255, default='Medium')
-    preferred_learning_style = models.TextField(default='None')
+    motivation = models.PositiveSmallIntegerField(choices=Motivation.choices, default=Motivation.MEDIUM)
+    # LearningStyle bit flags
+    learning_styles = models.PositiveSmallIntegerField(default=0)
 
     # Outputs
     predicted_score = models.FloatField(null=True, blank=True)
+    # The score is the local model's estimate, served while FastAPI was down
+    # (PREDICTION_BACKEND = "fallback"); such scores are kept out of training
+    score_degraded = models.BooleanField(default=False)
     study_guide = models.TextField(null=True, blank=True)
 
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Course history pages list a course's entries newest first
+            models.Index(fields=['subject', 'created_at'], name='entry_subject_created_idx'),
+            # "Every kinesthetic learner": see LearningStyle.masks_with
+            models.Index(fields=['learning_styles'], name='entry_learning_styles_idx'),
+        ]
+
     def __str__(self):
         return f"{self.subject.subject_name} - {self.created_at.strftime('%Y-%m-%d')}"
 
+    def get_learning_styles_display(self):
+        return ", ".join(style.label for style in LearningStyle.split(self.learning_styles))
+
+    def prediction_payload(self):
+        """Feature payload sent to the FastAPI /predict endpoint (choices as their text codes)."""
+        return {
+            "hours_studied": self.hours_studied,
+            "previous_scores": self.previous_scores,
+            "extracurricular": Extracurricular(self.extracurricular).label,
+            "sleep_hours": self.sleep_hours,
+            "question_papers": self.question_papers,
+            "motivation": choice_code(Motivation(self.motivation)),
+            "preferred_learning_style": learning_style_codes(self.learning_styles),
+        }
+
 
 #This represents the databse for all courses.
 class SubjectEntry(models.Model):
@@ -42,13 +133,17 @@ class SubjectEntry(models.Model):
     
     # Subject information
     subject_name = models.CharField(max_length=100)
+    # Lower-cased subject_name, kept in sync by save(). Backs the
+    # case-insensitive "one course per name" rule with a unique index.
+    subject_name_normalized = models.CharField(max_length=100, editable=False)
     hours_studied = models.FloatField(default=0)
     previous_scores = models.FloatField(default=50)
-    extracurricular = models.CharField(max_length=10, choices=[('Yes', 'Yes'), ('No', 'No')], default='No')
+    extracurricular = models.PositiveSmallIntegerField(choices=Extracurricular.choices, default=Extracurricular.NO)
     sleep_hours = models.FloatField(default=8)
     question_papers = models.IntegerField(default=0)
-    motivation = models.CharField(max_length=255, default='Medium')
-    preferred_learning_style = models.TextField(default='None')
+    motivation = models.PositiveSmallIntegerField(choices=Motivation.choices, default=Motivation.MEDIUM)
+    # LearningStyle bit flags
+    learning_styles = models.PositiveSmallIntegerField(default=0)
 
 
     # Outputs
@@ -62,10 +157,46 @@ class SubjectEntry(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        unique_together = ('student', 'subject_name')  
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'subject_name_normalized'],
+                                    name='unique_subject_name_per_student'),
+        ]
+        indexes = [
+            models.Index(fields=['learning_styles'], name='subject_learning_styles_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.user.username} - {self.subject_name}"
+
+    def get_learning_styles_display(self):
+        return ", ".join(style.label for style in LearningStyle.split(self.learning_styles))
+
+    @staticmethod
+    def normalize_name(name):
+        return (name or '').strip().lower()
+
+    # subject_name as loaded from the database (see from_db)
+    _loaded_subject_name = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_subject_name = instance.__dict__.get('subject_name')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Re-derive the normalized name only when the name itself is saved and
+        # has changed: migration 0007 gave legacy case-duplicates a "#<id>"
+        # suffix, which an unrelated save must not turn back into a collision.
+        update_fields = kwargs.get('update_fields')
+        saves_name = 'subject_name' in self.__dict__ and (update_fields is None or 'subject_name' in update_fields)
+        if saves_name and (self._state.adding or self.subject_name != self._loaded_subject_name):
+            self.subject_name_normalized = self.normalize_name(self.subject_name)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'subject_name_normalized'}
+        super().save(*args, **kwargs)
+        if saves_name:
+            self._loaded_subject_name = self.subject_name
  
 
         
@@ -84,4 +215,115 @@ class StudyPlanQuestionnaire(models.Model):
     motivation_level = models.CharField(max_length=50, default="medium")
 
     def __str__(self):
-        return f"{self.user.username} - Study Plan"
\ No newline at end of file
+        return f"{self.user.username} - Study Plan"
+
+
+#Background scoring jobs for CourseSpecificEntry rows (see polls/prediction_jobs.py).
+class PredictionJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    entry = models.ForeignKey('CourseSpecificEntry', on_delete=models.CASCADE, related_name='prediction_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    # Jobs are not picked up before this time (used for retry backoff)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='predjob_status_run_after'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} for entry {self.entry_id} ({self.status})"
+
+
+#Running per-course totals, updated with every entry and score write
+#(see polls/course_stats.py) so pages never rescan a course's history.
+class CourseStats(models.Model):
+    subject = models.OneToOneField('SubjectEntry', on_delete=models.CASCADE, related_name='stats', primary_key=True)
+
+    entry_count = models.PositiveIntegerField(default=0)
+    scored_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_min = models.FloatField(null=True, blank=True)
+    score_max = models.FloatField(null=True, blank=True)
+
+    # Score and timestamp of the course's most recent entry
+    last_score = models.FloatField(null=True, blank=True)
+    last_created_at = models.DateTimeField(null=True, blank=True)
+
+    # Least-squares sums for the trend line; x is days since `origin`
+    origin = models.DateTimeField(null=True, blank=True)
+    sum_x = models.FloatField(default=0)
+    sum_xx = models.FloatField(default=0)
+    sum_xy = models.FloatField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for course {self.subject_id}"
+
+    @property
+    def mean_score(self):
+        if not self.scored_count:
+            return None
+        return self.score_sum / self.scored_count
+
+    @property
+    def trend_slope(self):
+        """
+        Change in predicted score per day, or None until there are two scored
+        entries whose dates spread over more than about an hour.
+        """
+        n = self.scored_count
+        if n < 2:
+            return None
+        # n^2 times the variance of x; a tiny spread makes the slope meaningless
+        denominator = n * self.sum_xx - self.sum_x ** 2
+        if denominator <= n * n * (1 / 24) ** 2:
+            return None
+        return (n * self.sum_xy - self.sum_x * self.score_sum) / denominator
+
+
+#Old CourseSpecificEntry rows moved out of the hot table by
+#`manage.py archive_history` (see polls/history_archive.py): one row per
+#course and month, holding the month's entries compressed plus their totals.
+class EntryArchive(models.Model):
+    subject = models.ForeignKey('SubjectEntry', on_delete=models.CASCADE, related_name='archives')
+    # First day of the month the entries were created in
+    month = models.DateField()
+
+    entry_count = models.PositiveIntegerField(default=0)
+    scored_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_min = models.FloatField(null=True, blank=True)
+    score_max = models.FloatField(null=True, blank=True)
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+
+    # zlib-compressed JSON, one list of history_archive.COLUMNS per entry
+    rows = models.BinaryField()
+
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['subject', 'month'], name='unique_archive_month_per_course'),
+        ]
+
+    def __str__(self):
+        return f"Archive of course {self.subject_id} for {self.month:%Y-%m}"
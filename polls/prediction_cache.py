@@ -0,0 +1,156 @@
+"""
+Cache of /predict results keyed on the canonicalised feature payload.
+
+Results live in the ``predictions`` cache alias (see ``CACHES`` in
+``mysite/settings.py``), which bounds them with a TTL and LRU eviction.
+Every key carries ``PREDICTION_MODEL_VERSION`` so shipping a new model
+invalidates all cached scores at once without having to flush the cache.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import async_fastapi_client, fastapi_client
+
+CACHE_ALIAS = 'predictions'
+HITS_KEY = 'predict:stats:hits'
+MISSES_KEY = 'predict:stats:misses'
+
+# Fields that make up the model input. Anything else in a payload is ignored
+# when building the key.
+FEATURE_FIELDS = (
+    'hours_studied',
+    'previous_scores',
+    'extracurricular',
+    'sleep_hours',
+    'question_papers',
+    'motivation',
+    'preferred_learning_style',
+)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def model_version():
+    return str(getattr(settings, 'PREDICTION_MODEL_VERSION', '1'))
+
+
+def canonical_payload(payload):
+    """
+    Normalise a payload so that equivalent inputs map to the same key:
+    numbers are rounded, strings are stripped and lower-cased, and the
+    learning styles are sorted.
+    """
+    canonical = {}
+    for field in FEATURE_FIELDS:
+        value = payload.get(field)
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            value = round(float(value), 2)
+        elif field == 'preferred_learning_style':
+            if isinstance(value, str):
+                value = value.split(',')
+            value = ','.join(sorted(str(v).strip().lower() for v in (value or []) if str(v).strip()))
+        elif value is not None:
+            value = str(value).strip().lower()
+        canonical[field] = value
+    return canonical
+
+
+def cache_key(payload):
+    raw = json.dumps(canonical_payload(payload), sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return f"predict:{model_version()}:{digest}"
+
+
+def _count(key):
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Counter missing or evicted; start it again.
+        cache.set(key, 1, None)
+
+
+def get(payload):
+    """Return the cached prediction result for ``payload`` or None."""
+    result = _cache().get(cache_key(payload))
+    _count(HITS_KEY if result is not None else MISSES_KEY)
+    return result
+
+
+def put(payload, result):
+    """Store a prediction result; results without a score are not cached."""
+    if not result or result.get('predicted_score') is None:
+        return
+    timeout = getattr(settings, 'PREDICTION_CACHE_TTL', 60 * 60 * 24)
+    _cache().set(cache_key(payload), result, timeout)
+
+
+def cached_predict(payload, **kwargs):
+    """
+    Drop-in replacement for ``fastapi_client.predict`` that answers repeated
+    payloads from the cache and only calls FastAPI on a miss.
+    """
+    result = get(payload)
+    if result is None:
+        result = fastapi_client.predict(payload, **kwargs)
+        put(payload, result)
+    return result
+
+
+async def acached_predict(payload, **kwargs):
+    """Async version of cached_predict for the ASGI views."""
+    cache = _cache()
+    key = cache_key(payload)
+    result = await cache.aget(key)
+    await _acount(HITS_KEY if result is not None else MISSES_KEY)
+    if result is None:
+        result = await async_fastapi_client.predict(payload, **kwargs)
+        if result and result.get('predicted_score') is not None:
+            await cache.aset(key, result, getattr(settings, 'PREDICTION_CACHE_TTL', 60 * 60 * 24))
+    return result
+
+
+async def _acount(key):
+    cache = _cache()
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, None)
+
+
+def is_process_local():
+    """
+    True when the cache (and so its counters) lives in each process's own
+    memory, where only that process can read it.
+    """
+    backend = settings.CACHES.get(CACHE_ALIAS, {}).get('BACKEND', '')
+    return backend.endswith(('.LocMemCache', '.DummyCache'))
+
+
+def stats():
+    """
+    Hit/miss counters and hit ratio, for sizing the cache. With a
+    process-local cache they only cover the calling process.
+    """
+    cache = _cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+        'model_version': model_version(),
+        'process_local': is_process_local(),
+    }
+
+
+def reset_stats():
+    _cache().delete_many([HITS_KEY, MISSES_KEY])
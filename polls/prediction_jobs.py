@@ -0,0 +1,97 @@
+"""
+DB-backed queue for scoring CourseSpecificEntry rows outside the request.
+
+``SubjectWizard.done`` calls :func:`enqueue` after saving the entry and
+redirects straight away; ``manage.py run_prediction_worker`` picks the jobs
+up, calls FastAPI and writes ``predicted_score`` back. Jobs are claimed with
+a conditional UPDATE, so several workers can share the table on SQLite
+without an external broker.
+"""
+import logging
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import prediction_records, predictions
+from .models import PredictionJob
+
+logger = logging.getLogger(__name__)
+
+
+def async_enabled():
+    return getattr(settings, 'PREDICTION_MODE', 'sync') == 'async'
+
+
+def enqueue(entry):
+    """Queue ``entry`` for scoring and return the job."""
+    return PredictionJob.objects.create(entry=entry)
+
+
+def is_pending(subject):
+    """True while the subject has a prediction waiting for a worker."""
+    return PredictionJob.objects.filter(
+        entry__subject=subject,
+        status__in=[PredictionJob.STATUS_PENDING, PredictionJob.STATUS_RUNNING],
+    ).exists()
+
+
+def claim_next():
+    """
+    Claim the oldest runnable job and return it, or None if there is none.
+
+    The UPDATE only succeeds while the job is still pending, so when two
+    workers race for the same row exactly one of them gets it.
+    """
+    now = timezone.now()
+    candidates = (
+        PredictionJob.objects
+        .filter(status=PredictionJob.STATUS_PENDING, run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:5]
+    )
+    for job_id in candidates:
+        claimed = PredictionJob.objects.filter(
+            id=job_id, status=PredictionJob.STATUS_PENDING,
+        ).update(status=PredictionJob.STATUS_RUNNING, attempts=F('attempts') + 1, updated_at=now)
+        if claimed:
+            return PredictionJob.objects.select_related('entry').get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Score one claimed job. Returns True on success."""
+    max_attempts = getattr(settings, 'PREDICTION_JOB_MAX_ATTEMPTS', 5)
+    try:
+        result = predictions.get_prediction(job.entry.prediction_payload())
+        predicted_score = result.get('predicted_score')
+        if predicted_score is None:
+            raise ValueError(f"No predicted_score in response: {result}")
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning("Prediction job %s failed (attempt %s): %s", job.id, job.attempts, e)
+        if job.attempts >= max_attempts:
+            status, run_after = PredictionJob.STATUS_FAILED, timezone.now()
+        else:
+            # Back off 2, 4, 8... seconds before the next attempt
+            status = PredictionJob.STATUS_PENDING
+            run_after = timezone.now() + timedelta(seconds=2 ** job.attempts)
+        PredictionJob.objects.filter(id=job.id).update(
+            status=status, run_after=run_after, last_error=str(e), updated_at=timezone.now(),
+        )
+        return False
+
+    prediction_records.record_score(job.entry, predicted_score, degraded=bool(result.get('degraded')))
+    PredictionJob.objects.filter(id=job.id).update(
+        status=PredictionJob.STATUS_DONE, last_error='', updated_at=timezone.now(),
+    )
+    return True
+
+
+def requeue_stale(older_than):
+    """Put jobs left 'running' by a crashed worker back in the queue."""
+    cutoff = timezone.now() - older_than
+    return PredictionJob.objects.filter(
+        status=PredictionJob.STATUS_RUNNING, updated_at__lt=cutoff,
+    ).update(status=PredictionJob.STATUS_PENDING, updated_at=timezone.now())
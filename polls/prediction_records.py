@@ -0,0 +1,140 @@
+"""
+Writes that record a prediction: the submitted inputs, the history entry and
+the score, each in one transaction.
+
+The wizard, the prediction worker and the batch rescore all go through here,
+so a submission never leaves a course updated without its entry (or an
+entry scored without its course and stats). Existing rows are written with
+``update_fields`` or ``QuerySet.update`` so only the changed columns hit the
+disk. Every function runs through :func:`write_queue.run`, so the writes are
+batched when SQLITE_WRITE_BATCHING is on.
+"""
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+
+from . import course_stats, write_queue
+from .models import CourseSpecificEntry, PredictionJob, SubjectEntry
+
+# Wizard inputs stored on both the course and each of its entries
+INPUT_FIELDS = (
+    'hours_studied', 'previous_scores', 'extracurricular', 'sleep_hours',
+    'question_papers', 'motivation', 'learning_styles',
+)
+
+
+def record_submission(subject, inputs, enqueue=False):
+    """
+    Save ``inputs`` (a dict of INPUT_FIELDS values) on ``subject`` and add a
+    history entry with the same values. An unsaved ``subject`` is created, an
+    existing one only has its input columns rewritten. With ``enqueue`` the
+    entry is also queued for the prediction worker. Returns the entry.
+    """
+    for field in INPUT_FIELDS:
+        setattr(subject, field, inputs[field])
+
+    def record():
+        if subject._state.adding:
+            subject.save()
+        else:
+            subject.save(update_fields=[*INPUT_FIELDS, 'updated_at'])
+        entry = CourseSpecificEntry.objects.create(
+            subject=subject, **{field: inputs[field] for field in INPUT_FIELDS}
+        )
+        course_stats.record_entry(entry)
+        if enqueue:
+            # The job commits with its entry (see prediction_jobs)
+            PredictionJob.objects.create(entry=entry)
+        return entry
+
+    return write_queue.run(record)
+
+
+def record_score(entry, predicted_score, subject=None, degraded=False):
+    """
+    Write the score to the entry, and to its course when this entry is the
+    course's most recent prediction. ``subject``, if given, is the in-memory
+    course object to keep in step. ``degraded`` marks a local-model estimate
+    (CourseSpecificEntry.score_degraded).
+    """
+    entries = CourseSpecificEntry.objects.filter(id=entry.id)
+    values = {'predicted_score': predicted_score, 'score_degraded': degraded}
+    # Read the old score before the transaction so that it opens with a write
+    # (see course_stats._locked): the UPDATE only applies if the score is
+    # still the one read here
+    old_score = entries.values_list('predicted_score', flat=True).get()
+
+    def record():
+        nonlocal old_score
+        if old_score is None:
+            unchanged = entries.filter(predicted_score__isnull=True)
+        else:
+            unchanged = entries.filter(predicted_score=old_score)
+        if not unchanged.update(**values):
+            # Scored by someone else meanwhile; holding the lock, this read is current
+            old_score = entries.values_list('predicted_score', flat=True).get()
+            entries.update(**values)
+
+        latest_id = (
+            CourseSpecificEntry.objects
+            .filter(subject_id=entry.subject_id)
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if latest_id == entry.id:
+            SubjectEntry.objects.filter(id=entry.subject_id).update(
+                predicted_score=predicted_score, updated_at=timezone.now(),
+            )
+        course_stats.record_score(entry, old_score, predicted_score)
+        return latest_id == entry.id
+
+    is_latest = write_queue.run(record)
+    entry.predicted_score = predicted_score
+    entry.score_degraded = degraded
+    if subject is not None and is_latest:
+        subject.predicted_score = predicted_score
+
+
+def record_scores(scored):
+    """
+    Write many (entry, predicted_score) pairs at once: one bulk UPDATE for the
+    entries (which also clears their score_degraded flag), one for their
+    courses' latest scores, and the stats changes.
+    The entries need ``id``, ``subject``, ``created_at`` and ``predicted_score``
+    (the old score) loaded; they hold the new scores afterwards. Returns the
+    ids of the courses touched.
+    """
+    changes = [(entry, entry.predicted_score, score) for entry, score in scored]
+    for entry, score in scored:
+        entry.predicted_score = score
+        entry.score_degraded = False
+    subject_ids = {entry.subject_id for entry, _ in scored}
+
+    def record():
+        CourseSpecificEntry.objects.bulk_update(
+            [entry for entry, _ in scored], ['predicted_score', 'score_degraded'],
+        )
+        latest = CourseSpecificEntry.objects.filter(subject=OuterRef('pk')).order_by('-created_at', '-id')
+        SubjectEntry.objects.filter(id__in=subject_ids).filter(Exists(latest)).update(
+            predicted_score=Subquery(latest.values('predicted_score')[:1]), updated_at=timezone.now(),
+        )
+        course_stats.record_scores(changes)
+
+    if scored:
+        write_queue.run(record)
+    return subject_ids
+
+
+def refresh_courses(subject_ids, chunk_size=500):
+    """
+    Copy each course's latest entry (inputs and score) onto the course, one
+    UPDATE per ``chunk_size`` courses. For writers that add entries in bulk,
+    which may land before or after a course's existing ones.
+    """
+    subject_ids = sorted(subject_ids)
+    latest = CourseSpecificEntry.objects.filter(subject=OuterRef('pk')).order_by('-created_at', '-id')
+    values = {field: Subquery(latest.values(field)[:1]) for field in (*INPUT_FIELDS, 'predicted_score')}
+    for start in range(0, len(subject_ids), chunk_size):
+        SubjectEntry.objects.filter(id__in=subject_ids[start:start + chunk_size]).filter(Exists(latest)).update(
+            updated_at=timezone.now(), **values,
+        )
@@ -0,0 +1,81 @@
+"""
+Single entry point for getting a predicted score for a feature payload.
+
+``PREDICTION_BACKEND`` selects where the score comes from:
+
+* ``"remote"``   - FastAPI /predict through the prediction cache (default)
+* ``"local"``    - the in-process ridge model only (see local_predictor.py)
+* ``"fallback"`` - FastAPI, and the local model when FastAPI is unreachable
+"""
+import logging
+
+import requests
+from django.conf import settings
+
+from . import local_predictor, prediction_cache
+
+logger = logging.getLogger(__name__)
+
+
+def backend():
+    return getattr(settings, 'PREDICTION_BACKEND', 'remote')
+
+
+def _local_result(payload, degraded):
+    return {
+        'predicted_score': local_predictor.predict(payload),
+        'source': 'local',
+        'degraded': degraded,
+    }
+
+
+def get_prediction(payload):
+    """
+    Return a result dict with at least ``predicted_score``. A result served by
+    the local model while FastAPI is down carries ``degraded: True``.
+    Raises ``requests.exceptions.RequestException`` when no backend can answer.
+    """
+    mode = backend()
+    if mode == 'local':
+        try:
+            return _local_result(payload, degraded=False)
+        except local_predictor.LocalPredictorUnavailable as e:
+            logger.warning("Local predictor unavailable (%s); using FastAPI", e)
+
+    try:
+        return prediction_cache.cached_predict(payload)
+    except requests.exceptions.RequestException as e:
+        if mode != 'fallback':
+            raise
+        error = e
+
+    try:
+        result = _local_result(payload, degraded=True)
+    except local_predictor.LocalPredictorUnavailable:
+        raise error
+    logger.warning("FastAPI unavailable (%s); served local fallback prediction", error)
+    return result
+
+
+async def aget_prediction(payload):
+    """Async version of get_prediction for the ASGI views."""
+    mode = backend()
+    if mode == 'local':
+        try:
+            return _local_result(payload, degraded=False)
+        except local_predictor.LocalPredictorUnavailable as e:
+            logger.warning("Local predictor unavailable (%s); using FastAPI", e)
+
+    try:
+        return await prediction_cache.acached_predict(payload)
+    except requests.exceptions.RequestException as e:
+        if mode != 'fallback':
+            raise
+        error = e
+
+    try:
+        result = _local_result(payload, degraded=True)
+    except local_predictor.LocalPredictorUnavailable:
+        raise error
+    logger.warning("FastAPI unavailable (%s); served local fallback prediction", error)
+    return result
@@ -0,0 +1,253 @@
+"""
+Bulk import of historical student records (``manage.py import_records``).
+
+Each input row is one past prediction: the student's username, the course
+name, the wizard inputs and, optionally, when it was made and the score it
+got. Rows are checked by ImportRowForm, which carries the fields and checks
+of Step1Form-Step5Form. They are then written in batches with bulk_create:
+missing users and students first, then missing courses, then the entries.
+Only the username -> student and course -> id maps are kept between batches,
+so memory depends on the number of students and courses, not on the number
+of rows.
+"""
+import csv
+import json
+import logging
+import re
+
+import requests
+from django import forms
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import course_stats, fastapi_client, prediction_cache, prediction_records
+from .forms import Step1Form, Step2Form, Step3Form, Step4Form, Step5Form
+from .models import CourseSpecificEntry, Extracurricular, LearningStyle, Motivation, Student, SubjectEntry, from_code
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'jsonl')
+
+
+class ImportRowForm(Step2Form, Step3Form, Step4Form, Step5Form):
+    """
+    One imported row: Step1Form's fields and checks plus those of steps 2-5.
+    Step 1's duplicate-name check is left out on purpose, since rows for an
+    existing course are added to its history.
+    """
+    username = forms.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    subject_name = Step1Form.base_fields['subject_name']
+    previous_scores = Step1Form.base_fields['previous_scores']
+    created_at = forms.DateTimeField(required=False)
+    predicted_score = forms.FloatField(required=False, min_value=0, max_value=100)
+
+    clean_previous_scores = Step1Form.clean_previous_scores
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, raw row dict) from a CSV (with header) or JSONL stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            row = {'__error__': f"invalid JSON: {e}"}
+        yield number, row if isinstance(row, dict) else {'__error__': "not a JSON object"}
+
+
+def _choice_value(choices, value):
+    """The enum value for a text code ('Yes', 'high', 'visual'); anything else is left to the form."""
+    member = from_code(choices, value)
+    return value if member is None else member.value
+
+
+def form_data(row):
+    """
+    Row values as the form expects them: choices given as text codes turned
+    into their enum values, and the learning styles as a list.
+    """
+    data = {key: value for key, value in row.items() if value not in (None, '')}
+    for field, choices in (('extracurricular', Extracurricular), ('motivation', Motivation)):
+        if field in data:
+            data[field] = _choice_value(choices, data[field])
+    styles = data.get('preferred_learning_style')
+    if isinstance(styles, str):
+        styles = [s for s in re.split(r'[;|,]', styles) if s.strip()]
+    if isinstance(styles, list):
+        data['preferred_learning_style'] = [_choice_value(LearningStyle, style) for style in styles]
+    return data
+
+
+class RowValidator:
+    """
+    Validates rows with one reused ImportRowForm. Building a form per row
+    deep-copies all its fields and widgets, which costs more than the checks
+    themselves; rebinding the data and clearing the errors is enough.
+    """
+
+    def __init__(self):
+        self.form = ImportRowForm({})
+
+    def __call__(self, row):
+        """Return (cleaned data, None) for a good row or (None, error text) for a bad one."""
+        if '__error__' in row:
+            return None, row['__error__']
+        form = self.form
+        form.data = form_data(row)
+        form._errors = None
+        if not form.is_valid():
+            return None, '; '.join(f"{field}: {' '.join(errors)}" for field, errors in form.errors.items())
+        data = form.cleaned_data
+        created_at = data['created_at']
+        if created_at is not None and timezone.is_naive(created_at):
+            data['created_at'] = timezone.make_aware(created_at)
+        return data, None
+
+
+def inputs_of(data):
+    """The wizard inputs of a cleaned row, stored the way SubjectWizard.done() stores them."""
+    return {
+        'hours_studied': data['hours_studied'],
+        'previous_scores': data['previous_scores'],
+        'extracurricular': data['extracurricular'],
+        'sleep_hours': data['sleep_hours'],
+        'question_papers': data['question_papers'],
+        'motivation': data['motivation'],
+        'learning_styles': data['preferred_learning_style'],
+    }
+
+
+class Importer:
+    """
+    Writes validated rows batch by batch. Call :meth:`write` with each batch
+    of cleaned rows and :meth:`finish` once at the end.
+    """
+
+    def __init__(self, score=False):
+        self.score = score
+        self.students = {}
+        self.courses = {}
+        self.touched = set()
+        self.imported = self.scored = self.unscored = 0
+        self.users_created = self.courses_created = 0
+
+    def _resolve_students(self, usernames):
+        missing = {name for name in usernames if name not in self.students}
+        if not missing:
+            return
+        existing = dict(User.objects.filter(username__in=missing).values_list('username', 'id'))
+        new_users = [User(username=name, password=make_password(None)) for name in missing - existing.keys()]
+        User.objects.bulk_create(new_users, ignore_conflicts=True)
+        self.users_created += len(new_users)
+        user_ids = dict(User.objects.filter(username__in=missing).values_list('username', 'id'))
+
+        Student.objects.bulk_create(
+            [Student(user_id=user_id) for user_id in user_ids.values()], ignore_conflicts=True,
+        )
+        student_ids = dict(Student.objects.filter(user_id__in=user_ids.values()).values_list('user_id', 'id'))
+        for name, user_id in user_ids.items():
+            self.students[name] = student_ids[user_id]
+
+    def _resolve_courses(self, rows):
+        missing = {}
+        for data in rows:
+            key = (self.students[data['username']], SubjectEntry.normalize_name(data['subject_name']))
+            if key not in self.courses and key not in missing:
+                missing[key] = data
+        if not missing:
+            return
+
+        def lookup():
+            found = (
+                SubjectEntry.objects
+                .filter(student_id__in={student_id for student_id, _ in missing},
+                        subject_name_normalized__in={name for _, name in missing})
+                .values_list('student_id', 'subject_name_normalized', 'id')
+            )
+            for student_id, name, subject_id in found:
+                if (student_id, name) in missing:
+                    self.courses[(student_id, name)] = subject_id
+                    del missing[(student_id, name)]
+
+        lookup()
+        # bulk_create skips save(), so the normalized name is set here
+        SubjectEntry.objects.bulk_create([
+            SubjectEntry(
+                student_id=student_id, subject_name=data['subject_name'],
+                subject_name_normalized=name, **inputs_of(data),
+            )
+            for (student_id, name), data in missing.items()
+        ], ignore_conflicts=True)
+        self.courses_created += len(missing)
+        lookup()
+
+    def _score(self, entries):
+        unscored = [entry for entry in entries if entry.predicted_score is None]
+        if not self.score or not unscored:
+            self.unscored += len(unscored)
+            return
+        payloads = [entry.prediction_payload() for entry in unscored]
+        try:
+            scores = fastapi_client.predict_batch(payloads)
+            if len(scores) != len(payloads):
+                raise ValueError(f"got {len(scores)} scores for {len(payloads)} rows")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning("Batch scoring failed, importing %s rows unscored: %s", len(unscored), e)
+            self.unscored += len(unscored)
+            return
+        for entry, payload, score in zip(unscored, payloads, scores):
+            if score is None:
+                self.unscored += 1
+                continue
+            entry.predicted_score = score
+            prediction_cache.put(payload, {'predicted_score': score})
+            self.scored += 1
+
+    def write(self, rows):
+        """Import one batch of cleaned rows in a single transaction."""
+        with transaction.atomic():
+            self._resolve_students({data['username'] for data in rows})
+            self._resolve_courses(rows)
+            entries = []
+            for data in rows:
+                subject_id = self.courses[(self.students[data['username']], SubjectEntry.normalize_name(data['subject_name']))]
+                entries.append(CourseSpecificEntry(
+                    subject_id=subject_id, predicted_score=data['predicted_score'], **inputs_of(data),
+                ))
+                self.touched.add(subject_id)
+            self._score(entries)
+            CourseSpecificEntry.objects.bulk_create(entries)
+
+            # created_at is auto_now_add, which bulk_create overwrites with
+            # now(); put the historical dates back in one prepared statement
+            dated = [
+                (connection.ops.adapt_datetimefield_value(data['created_at']), entry.id)
+                for data, entry in zip(rows, entries) if data['created_at'] is not None
+            ]
+            if dated:
+                with connection.cursor() as cursor:
+                    cursor.executemany(
+                        f'UPDATE {CourseSpecificEntry._meta.db_table} SET created_at = %s WHERE id = %s', dated,
+                    )
+        self.imported += len(entries)
+
+    def finish(self, chunk_size=500):
+        """
+        Bring the touched courses up to date: their latest inputs and score,
+        and their CourseStats rebuilt from all their entries. Returns how many
+        courses were refreshed.
+        """
+        prediction_records.refresh_courses(self.touched, chunk_size=chunk_size)
+        subject_ids = sorted(self.touched)
+        for start in range(0, len(subject_ids), chunk_size):
+            course_stats.rebuild(subject_ids[start:start + chunk_size])
+        return len(subject_ids)
@@ -0,0 +1,78 @@
+"""
+Per-student cache of the rendered sidebar course list.
+
+Each student has a version number in the cache; the rendered fragment is
+stored under that version, so bumping it (from the signals in
+polls/signals.py, whenever a course is created, renamed, deleted or gets a
+new score) makes the next page render fresh without deleting anything.
+The fragment is cached with a placeholder where the delete forms' CSRF
+token goes and the requester's own token is filled in on the way out.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Student, SubjectEntry
+
+CACHE_ALIAS = 'default'
+TEMPLATE = 'sidebar_component.html'
+_CSRF_PLACEHOLDER = '__sidebar_csrf_token__'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(student_id):
+    return f'sidebar:version:{student_id}'
+
+
+def version(student_id):
+    cache = _cache()
+    current = cache.get(_version_key(student_id))
+    if current is None:
+        # Start from the clock so a version lost to eviction is never reused
+        cache.add(_version_key(student_id), time.time_ns(), None)
+        current = cache.get(_version_key(student_id))
+    return current
+
+
+def bump(student_id):
+    """Invalidate the student's cached sidebar."""
+    try:
+        _cache().incr(_version_key(student_id))
+    except ValueError:
+        _cache().set(_version_key(student_id), time.time_ns(), None)
+
+
+def courses(student_id):
+    """Only the columns the sidebar shows: id, name and the latest score."""
+    return (
+        SubjectEntry.objects
+        .filter(student_id=student_id)
+        .select_related('stats')
+        .only('id', 'subject_name', 'stats__last_score', 'stats__scored_count')
+        .order_by('id')
+    )
+
+
+def render(request):
+    """The sidebar HTML for the requesting student."""
+    try:
+        student = request.user.student
+    except (AttributeError, Student.DoesNotExist):
+        return render_to_string(TEMPLATE, {'courses': []}, request=request)
+
+    key = f'sidebar:html:{student.id}:{version(student.id)}'
+    html = _cache().get(key)
+    if html is None:
+        html = render_to_string(TEMPLATE, {
+            'courses': courses(student.id),
+            'csrf_token': _CSRF_PLACEHOLDER,
+        })
+        _cache().set(key, html, getattr(settings, 'SIDEBAR_CACHE_TTL', 60 * 60))
+    return mark_safe(html.replace(_CSRF_PLACEHOLDER, get_token(request)))
@@ -0,0 +1,40 @@
+"""
+Signal handlers that keep the cached sidebar (polls/sidebar_cache.py) fresh.
+Versions are bumped after the surrounding transaction commits, so a page
+rendered in between cannot cache the old course list under the new version.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import sidebar_cache
+from .models import CourseStats, SubjectEntry
+
+
+def _bump_on_commit(student_id):
+    if student_id is not None:
+        transaction.on_commit(lambda: sidebar_cache.bump(student_id))
+
+
+@receiver(post_save, sender=SubjectEntry)
+def subject_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Any full save may have renamed the course
+    if created or update_fields is None or 'subject_name' in update_fields:
+        _bump_on_commit(instance.student_id)
+
+
+@receiver(post_delete, sender=SubjectEntry)
+def subject_deleted(sender, instance, **kwargs):
+    _bump_on_commit(instance.student_id)
+
+
+@receiver(post_save, sender=CourseStats)
+def stats_saved(sender, instance, **kwargs):
+    # The sidebar shows each course's latest score
+    student_id = (
+        SubjectEntry.objects
+        .filter(id=instance.subject_id)
+        .values_list('student_id', flat=True)
+        .first()
+    )
+    _bump_on_commit(student_id)
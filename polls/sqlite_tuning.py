@@ -0,0 +1,51 @@
+"""
+Opt-in SQLite tuning (settings.SQLITE_TUNING).
+
+:func:`apply_pragmas` runs on Django's ``connection_created`` signal and sets
+``settings.SQLITE_PRAGMAS`` on each new SQLite connection. WAL, the journal
+mode, is stored in the database file, the rest only last for the
+connection, which is why they are applied every time. :func:`checkpoint`
+and :func:`optimize` back ``manage.py sqlite_maintenance``.
+"""
+import logging
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+
+def enabled():
+    return getattr(settings, 'SQLITE_TUNING', False)
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not enabled():
+        return
+    with connection.cursor() as cursor:
+        # busy_timeout goes first so switching to WAL waits for other connections
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def checkpoint(mode='PASSIVE', using='default'):
+    """Run a WAL checkpoint; returns (busy, wal_frames, checkpointed_frames)."""
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f"Unknown checkpoint mode {mode!r}")
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'PRAGMA wal_checkpoint({mode})')
+        return tuple(cursor.fetchone())
+
+
+def optimize(using='default'):
+    """Let SQLite refresh the planner statistics it thinks are stale."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('PRAGMA optimize')
+
+
+def journal_mode(using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        return cursor.fetchone()[0]
@@ -3,9 +3,25 @@ document.addEventListener('DOMContentLoaded', function() {
     const ctx = document.getElementById('performanceChart');
     if (!ctx) return;
     
-    // Get data from data attributes
-    const chartData = JSON.parse(ctx.getAttribute('data-chart'));
-    
+    // Fetch the series; the browser revalidates it with its ETag on repeat visits
+    fetch(ctx.getAttribute('data-chart-url'), {
+        credentials: 'same-origin',
+        headers: { 'Accept': 'application/json' }
+    })
+        .then(function(response) {
+            if (!response.ok) throw new Error('HTTP ' + response.status);
+            return response.json();
+        })
+        .then(function(chartData) {
+            drawChart(ctx, chartData);
+        })
+        .catch(function(error) {
+            console.error('Failed to load chart data:', error);
+            ctx.parentElement.innerHTML = '<p class="no-chart-data">Could not load the chart. Please refresh the page.</p>';
+        });
+});
+
+function drawChart(ctx, chartData) {
     // Only create chart if we have data
     if (chartData.labels.length > 0) {
         const performanceChart = new Chart(ctx, {
@@ -69,4 +85,4 @@ document.addEventListener('DOMContentLoaded', function() {
         // Show a message if no data is available
         ctx.parentElement.innerHTML = '<p class="no-chart-data">No historical data available for chart</p>';
     }
-});
\ No newline at end of file
+}
@@ -5,6 +5,12 @@ class FormValidator {
     }
 
     detectMode() {
+        // The single-page form states its mode
+        const modeForm = document.querySelector('form[data-mode]');
+        if (modeForm && modeForm.dataset.mode) {
+            return modeForm.dataset.mode;
+        }
+
         // Check if subject name field is read-only (indicates new_prediction mode)
         const subjectNameInput = document.querySelector('input[name="0-subject_name"]');
         if (subjectNameInput && subjectNameInput.readOnly) {
@@ -46,6 +52,79 @@ class FormValidator {
         // if (form) {
         //     form.addEventListener('submit', (e) => this.handleFormSubmission(e));
         // }
+
+        // Single-page mode (WIZARD_SINGLE_PAGE): every step is in one form
+        const singlePageForm = document.querySelector('form[data-single-page]');
+        if (singlePageForm) {
+            this.setupSteps(singlePageForm);
+        }
+    }
+
+    setupSteps(form) {
+        this.form = form;
+        this.steps = Array.from(form.querySelectorAll('.form-step'));
+        this.prevButton = form.querySelector('[data-action="prev"]');
+        this.nextButton = form.querySelector('[data-action="next"]');
+        this.finishButton = form.querySelector('button[type="submit"]');
+
+        // Hidden steps must not block submission; the rules below (and the
+        // server) check them instead
+        form.noValidate = true;
+
+        this.prevButton.addEventListener('click', () => this.showStep(this.current - 1));
+        this.nextButton.addEventListener('click', () => {
+            if (this.validateStep(this.steps[this.current])) {
+                this.showStep(this.current + 1);
+            }
+        });
+        form.addEventListener('submit', (e) => {
+            const invalid = this.steps.findIndex((step) => !this.validateStep(step));
+            if (invalid !== -1) {
+                e.preventDefault();
+                this.showStep(invalid);
+            }
+        });
+
+        // After a failed submission, open the first step the server rejected
+        const rejected = this.steps.findIndex((step) => step.querySelector('.errorlist'));
+        this.showStep(rejected === -1 ? 0 : rejected);
+    }
+
+    showStep(index) {
+        this.current = index;
+        this.steps.forEach((step, i) => { step.hidden = i !== index; });
+        const last = index === this.steps.length - 1;
+        this.prevButton.hidden = index === 0;
+        this.nextButton.hidden = last;
+        this.finishButton.hidden = !last;
+    }
+
+    validateStep(step) {
+        // The same rules as Step1Form-Step5Form; the server checks them again
+        let valid = true;
+        step.querySelectorAll('input, select').forEach((input) => {
+            const name = input.name.replace(/^\d+-/, '');
+            const rule = this.rules()[name];
+            if (rule && !rule(input)) {
+                valid = false;
+            }
+        });
+        return valid;
+    }
+
+    rules() {
+        return {
+            subject_name: (input) => this.validateSubjectName(input),
+            previous_scores: (input) => this.validatePreviousScores(input),
+            hours_studied: (input) => this.validateNumber(input, (n) => n >= 0, 'Hours studied must be positive.'),
+            sleep_hours: (input) => this.validateNumber(input, (n) => n > 0 && n < 24,
+                "Let's be serious here. We have just 24 hours in a day."),
+            question_papers: (input) => this.validateNumber(input, (n) => Number.isInteger(n) && n >= 0,
+                'Number of question papers must be non-negative.'),
+            extracurricular: (input) => this.validateRequired(input),
+            motivation: (input) => this.validateRequired(input),
+            preferred_learning_style: (input) => this.validateLearningStyles(input),
+        };
     }
 
     validateSubjectName(input) {
@@ -87,7 +166,95 @@ class FormValidator {
         return true;
     }
 
-    // ... keep the rest of your methods but REMOVE handleFormSubmission ...
+    validatePreviousScores(input) {
+        return this.validateNumber(input, (n) => n >= 0 && n <= 100, 'Previous scores must be between 0 and 100.');
+    }
+
+    validateNumber(input, check, message) {
+        this.clearFieldErrors(input);
+        const value = input.value.trim();
+        if (!value) {
+            this.showFieldError(input, 'This field is required.');
+            return false;
+        }
+        if (!check(Number(value))) {
+            this.showFieldError(input, message);
+            return false;
+        }
+        this.showFieldSuccess(input);
+        return true;
+    }
+
+    validateRequired(input) {
+        this.clearFieldErrors(input);
+        if (!input.value) {
+            this.showFieldError(input, 'This field is required.');
+            return false;
+        }
+        this.showFieldSuccess(input);
+        return true;
+    }
+
+    validateLearningStyles(input) {
+        // One call per checkbox; judge the group once, at its first box
+        const boxes = Array.from(this.form.querySelectorAll(`input[name="${input.name}"]`));
+        if (boxes[0] !== input) {
+            return !boxes[0].classList.contains('error');
+        }
+        // Django wraps the checkboxes in a <div id="id_4-preferred_learning_style">
+        const group = input.closest('div[id]') || input.closest('.form-field');
+        this.clearFieldErrors(group);
+        const checked = boxes.filter((box) => box.checked).length;
+        if (checked < 1 || checked > 3) {
+            this.showFieldError(group, checked < 1
+                ? 'Please select at least 1 learning style.'
+                : 'Please select at most 3 learning styles.');
+            input.classList.add('error');
+            return false;
+        }
+        input.classList.remove('error');
+        return true;
+    }
+
+    getExistingSubjects() {
+        const data = document.getElementById('existing-subjects-data');
+        if (!data) {
+            return [];
+        }
+        try {
+            return JSON.parse(data.textContent).map((name) => name.trim().toLowerCase());
+        } catch (e) {
+            return [];
+        }
+    }
+
+    showFieldError(input, message) {
+        input.classList.remove('success');
+        input.classList.add('error');
+        const list = document.createElement('ul');
+        list.className = 'errorlist client-error';
+        const item = document.createElement('li');
+        item.textContent = message;
+        list.appendChild(item);
+        input.insertAdjacentElement('afterend', list);
+    }
+
+    showFieldSuccess(input) {
+        input.classList.remove('error');
+        input.classList.add('success');
+    }
+
+    clearFieldErrors(input) {
+        input.classList.remove('error', 'success');
+        const next = input.nextElementSibling;
+        if (next && next.classList.contains('client-error')) {
+            next.remove();
+        }
+    }
+
+    clearValidationState(input) {
+        this.clearFieldErrors(input);
+    }
 }
 
 // Initialize the form validator
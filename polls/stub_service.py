@@ -0,0 +1,155 @@
+"""
+Local stand-in for the FastAPI model service, for load tests and benchmarks.
+
+Serves the endpoints the app calls (/predict, /predict/batch,
+/chatbot-advice, /chatbot-advice/stream, /api/study-plan) with configurable
+latency distributions and error rates. Scores come from a fixed linear
+formula of the features, so identical payloads always get identical answers.
+Run it with ``python manage.py run_fastapi_stub``.
+"""
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Latency:
+    """
+    Draws response delays in seconds.
+
+    ``kind`` is one of ``fixed`` (always ``mean``), ``uniform`` (0 to
+    2 x ``mean``), ``exponential`` or ``lognormal``. The lognormal spread is
+    set by ``sigma``, which gives the long tail real model servers have.
+    """
+
+    def __init__(self, kind='fixed', mean=0.05, sigma=0.5):
+        self.kind = kind
+        self.mean = mean
+        self.sigma = sigma
+
+    def sample(self):
+        if self.mean <= 0:
+            return 0.0
+        if self.kind == 'uniform':
+            return random.uniform(0, 2 * self.mean)
+        if self.kind == 'exponential':
+            return random.expovariate(1 / self.mean)
+        if self.kind == 'lognormal':
+            # Choose mu so the distribution's mean equals self.mean
+            mu = math.log(self.mean) - self.sigma ** 2 / 2
+            return random.lognormvariate(mu, self.sigma)
+        return self.mean
+
+
+def predicted_score(payload):
+    """Deterministic stand-in for the real model."""
+    styles = str(payload.get('preferred_learning_style') or '')
+    score = (
+        0.55 * float(payload.get('previous_scores') or 0)
+        + 1.2 * float(payload.get('hours_studied') or 0)
+        + 0.8 * float(payload.get('question_papers') or 0)
+        + 1.5 * min(float(payload.get('sleep_hours') or 0), 9)
+        + (2.0 if str(payload.get('extracurricular', '')).lower() == 'yes' else 0.0)
+        + {'low': -3.0, 'high': 3.0}.get(str(payload.get('motivation', '')).lower(), 0.0)
+        + 0.5 * len([s for s in styles.split(',') if s.strip()])
+    )
+    return round(max(0.0, min(100.0, score)), 2)
+
+
+def study_guide(payload):
+    subject = payload.get('subject') or 'your course'
+    return (
+        f"<h5>Study guide for {subject}</h5>"
+        f"<p>Aim for {max(5, round(float(payload.get('subject_weekly_study_hours') or 0)) + 2)} hours a week, "
+        f"work through one past paper every few days and review your mistakes.</p>"
+    )
+
+
+def make_handler(latency, error_rate=0.0, hang_rate=0.0, hang_seconds=60.0, stream_chunks=8):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return self._send_json(422, {'detail': 'Invalid JSON'})
+
+            roll = random.random()
+            if roll < hang_rate:
+                time.sleep(hang_seconds)
+            elif roll < hang_rate + error_rate:
+                return self._send_json(503, {'detail': 'Stub: injected failure'})
+
+            delay = latency.sample()
+            if self.path == '/chatbot-advice/stream':
+                return self._stream(payload, delay)
+            time.sleep(delay)
+
+            if self.path == '/predict':
+                return self._send_json(200, {'predicted_score': predicted_score(payload)})
+            if self.path == '/predict/batch':
+                instances = payload.get('instances', [])
+                return self._send_json(200, {'predictions': [predicted_score(p) for p in instances]})
+            if self.path == '/chatbot-advice':
+                return self._send_json(200, {'study_guide': study_guide(payload)})
+            if self.path == '/api/study-plan':
+                return self._send_json(200, {
+                    'study_plan': f"Study {payload.get('subjects', 'your subjects')} "
+                                  f"for {payload.get('hours_per_week', 10)} hours a week.",
+                    'prediction': predicted_score({
+                        'hours_studied': payload.get('hours_studied'),
+                        'previous_scores': payload.get('previous_grades'),
+                        'sleep_hours': payload.get('sleep_hours'),
+                        'question_papers': payload.get('question_papers_solved'),
+                        'motivation': payload.get('motivation_level'),
+                    }),
+                })
+            return self._send_json(404, {'detail': 'Not Found'})
+
+        def _stream(self, payload, delay):
+            """SSE stream; the total delay is spread across the chunks."""
+            text = study_guide(payload)
+            size = max(1, len(text) // stream_chunks)
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in chunks + [None]:
+                time.sleep(delay / (len(chunks) + 1))
+                data = 'data: [DONE]\n\n' if chunk is None else f"data: {json.dumps({'chunk': chunk})}\n\n"
+                data = data.encode()
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+
+    return StubHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open many connections at once; the default backlog of 5 refuses them
+    request_queue_size = 1024
+
+
+def start(host='127.0.0.1', port=0, **handler_options):
+    """Start a stub server in a background thread; returns (server, base_url)."""
+    latency = handler_options.pop('latency', None) or Latency()
+    server = StubServer((host, port), make_handler(latency, **handler_options))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,11 @@
+from django import template
+
+from polls import sidebar_cache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def sidebar(context):
+    """Render the current student's sidebar from the per-student cache."""
+    return sidebar_cache.render(context['request'])
@@ -1,3 +1,849 @@
-from django.test import TestCase
+import contextlib
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import circuit_breaker, fastapi_client
+
+
+@override_settings(FASTAPI_BACKOFF_FACTOR=0, FASTAPI_MAX_RETRIES=2)
+class PostJsonRetryTests(SimpleTestCase):
+    def setUp(self):
+        circuit_breaker._breakers.clear()
+        self.session = mock.Mock()
+        self.session.post.side_effect = requests.exceptions.ReadTimeout("slow")
+        patcher = mock.patch.object(fastapi_client, 'get_session', return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_predict_retries_read_timeouts(self):
+        with self.assertRaises(requests.exceptions.ReadTimeout), self.assertLogs('polls.fastapi_client', 'WARNING'):
+            fastapi_client.predict({'hours_studied': 1})
+        self.assertEqual(self.session.post.call_count, 3)
+
+    def test_guidance_and_study_plan_are_not_retried(self):
+        for call in (fastapi_client.chatbot_advice, fastapi_client.study_plan):
+            self.session.post.reset_mock()
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                call({'subject': 'Maths'})
+            self.assertEqual(self.session.post.call_count, 1)
+
+
+def make_course(username='student', subject_name='Maths', **inputs):
+    from django.contrib.auth.models import User
+
+    from . import prediction_records
+    from .models import Student, SubjectEntry
+
+    user = User.objects.create_user(username, password='pw')
+    student = Student.objects.create(user=user)
+    subject = SubjectEntry(student=student, subject_name=subject_name)
+    values = {
+        'hours_studied': 10, 'previous_scores': 65, 'extracurricular': 1, 'sleep_hours': 7,
+        'question_papers': 3, 'motivation': 2, 'learning_styles': 5,
+    }
+    values.update(inputs)
+    entry = prediction_records.record_submission(subject, values)
+    return user, subject, entry
+
+
+class DegradedScoreTests(TestCase):
+    def test_fallback_scores_are_flagged_and_rescoring_clears_the_flag(self):
+        from . import prediction_records
+        from .models import CourseSpecificEntry
+
+        _, subject, entry = make_course()
+        prediction_records.record_score(entry, 71.5, subject=subject, degraded=True)
+        stored = CourseSpecificEntry.objects.get(id=entry.id)
+        self.assertEqual(stored.predicted_score, 71.5)
+        self.assertTrue(stored.score_degraded)
+
+        prediction_records.record_scores([(stored, 73.0)])
+        stored.refresh_from_db()
+        self.assertEqual(stored.predicted_score, 73.0)
+        self.assertFalse(stored.score_degraded)
+
+
+WIZARD_STEPS = [
+    {'0-subject_name': 'Physics', '0-previous_scores': 65},
+    {'1-hours_studied': 10},
+    {'2-extracurricular': 1},
+    {'3-sleep_hours': 7},
+    {'4-question_papers': 3, '4-motivation': 2, '4-preferred_learning_style': [1, 4]},
+]
+
+
+@override_settings(PREDICTION_MODE='sync', PREDICTION_BACKEND='remote', WIZARD_STORAGE='session')
+class PredictionUnavailableTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        from .models import Student
+
+        self.user = User.objects.create_user('wizard', password='pw')
+        Student.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def complete_wizard(self):
+        # The wizard views print their debug lines
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.client.get('/new-course/')
+            for number, step in enumerate(WIZARD_STEPS):
+                data = dict(step, **{'subject_wizard-current_step': str(number)})
+                response = self.client.post('/create-subject/', data)
+        self.assertEqual(response.status_code, 302)
+        return response
+
+    def test_sync_mode_shows_an_error_instead_of_queueing(self):
+        from django.contrib.messages import get_messages
+
+        from .circuit_breaker import CircuitOpenError
+        from .deadline import DeadlineExceeded
+        from .models import CourseSpecificEntry, PredictionJob
+
+        errors = [
+            requests.exceptions.ReadTimeout("slow"),
+            DeadlineExceeded("out of time"),
+            CircuitOpenError("open"),
+        ]
+        for error in errors:
+            CourseSpecificEntry.objects.all().delete()
+            with self.subTest(error=type(error).__name__), \
+                    mock.patch('polls.predictions.get_prediction', side_effect=error):
+                response = self.complete_wizard()
+                self.assertFalse(PredictionJob.objects.exists())
+                self.assertIsNone(CourseSpecificEntry.objects.get().predicted_score)
+                levels = [m.level_tag for m in get_messages(response.wsgi_request)]
+                self.assertIn('error', levels)
+            self.user.student.subject_entries.all().delete()
+
+    @override_settings(PREDICTION_MODE='async')
+    def test_async_mode_queues_the_entry(self):
+        from django.contrib.messages.storage.cookie import CookieStorage
+        from django.test import RequestFactory
+
+        from .models import PredictionJob
+        from .views import handle_prediction_error
+
+        _, _, entry = make_course(username='queued')
+        request = RequestFactory().post('/create-subject/')
+        request._messages = CookieStorage(request)
+        with contextlib.redirect_stdout(io.StringIO()):
+            handle_prediction_error(request, entry, requests.exceptions.ReadTimeout("slow"))
+        self.assertTrue(PredictionJob.objects.filter(entry=entry).exists())
+
+    @override_settings(PREDICTION_BACKEND='fallback')
+    def test_fallback_backend_serves_a_flagged_local_estimate(self):
+        from . import local_predictor
+        from .models import CourseSpecificEntry
+
+        with mock.patch('polls.prediction_cache.cached_predict', side_effect=requests.exceptions.ReadTimeout("slow")), \
+                mock.patch.object(local_predictor, 'predict', return_value=70.0), \
+                self.assertLogs('polls.predictions', 'WARNING'):
+            self.complete_wizard()
+        entry = CourseSpecificEntry.objects.get()
+        self.assertEqual(entry.predicted_score, 70.0)
+        self.assertTrue(entry.score_degraded)
+
+
+class SubjectNameNormalizationTests(TestCase):
+    def setUp(self):
+        from .models import SubjectEntry
+
+        _, self.first, _ = make_course(subject_name='Maths')
+        # A legacy case-duplicate, as migration 0007 left it
+        self.duplicate = SubjectEntry.objects.create(student=self.first.student, subject_name='maths-tmp')
+        SubjectEntry.objects.filter(id=self.duplicate.id).update(
+            subject_name='maths', subject_name_normalized=f'maths#{self.duplicate.id}',
+        )
+
+    def test_full_save_keeps_a_legacy_duplicate_suffix(self):
+        from .models import SubjectEntry
+
+        course = SubjectEntry.objects.get(id=self.duplicate.id)
+        course.study_guide = "Revise every day"
+        course.save()
+        course.refresh_from_db()
+        self.assertEqual(course.subject_name_normalized, f'maths#{self.duplicate.id}')
+
+    def test_renaming_recomputes_the_normalized_name(self):
+        from .models import SubjectEntry
+
+        course = SubjectEntry.objects.get(id=self.duplicate.id)
+        course.subject_name = ' Statistics '
+        course.save(update_fields=['subject_name'])
+        course.refresh_from_db()
+        self.assertEqual(course.subject_name_normalized, 'statistics')
+
+    def test_renaming_onto_another_course_still_collides(self):
+        from django.db import IntegrityError, transaction
+
+        from .models import SubjectEntry
+
+        course = SubjectEntry.objects.get(id=self.duplicate.id)
+        course.subject_name = 'MATHS'
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            course.save()
+
+
+class CourseStatsWriteTests(TestCase):
+    def test_missing_stats_row_is_created_and_origin_filled(self):
+        from . import course_stats
+        from .models import CourseStats
+
+        _, subject, entry = make_course()
+        CourseStats.objects.filter(subject=subject).delete()
+        course_stats.record_entry(entry)
+        stats = CourseStats.objects.get(subject=subject)
+        self.assertEqual((stats.entry_count, stats.origin), (1, entry.created_at))
+
+        CourseStats.objects.filter(subject=subject).update(origin=None)
+        course_stats.record_score(entry, None, 80.0)
+        stats.refresh_from_db()
+        self.assertEqual((stats.origin, stats.scored_count, stats.score_sum), (entry.created_at, 1, 80.0))
+
+
+class RecordScoreTests(TestCase):
+    def test_score_changed_after_the_read_is_replaced_once(self):
+        from . import prediction_records, write_queue
+        from .models import CourseSpecificEntry, CourseStats
+
+        _, subject, entry = make_course()
+        prediction_records.record_score(entry, 60.0)
+        run = write_queue.run
+
+        def rescored_meanwhile(fn):
+            # Another writer commits 75 between record_score's read and its transaction
+            CourseSpecificEntry.objects.filter(id=entry.id).update(predicted_score=75.0)
+            CourseStats.objects.filter(subject=subject).update(score_sum=75.0, score_min=75.0, score_max=75.0)
+            return run(fn)
+
+        with mock.patch.object(write_queue, 'run', rescored_meanwhile):
+            prediction_records.record_score(entry, 80.0, subject=subject)
+
+        stats = CourseStats.objects.get(subject=subject)
+        self.assertEqual(CourseSpecificEntry.objects.get(id=entry.id).predicted_score, 80.0)
+        self.assertEqual((stats.scored_count, stats.score_sum, stats.score_max), (1, 80.0, 80.0))
+        self.assertEqual(subject.predicted_score, 80.0)
+
+
+def add_history(subject, count, start, step=timedelta(days=3)):
+    """Add ``count`` scored entries to ``subject``, ``step`` apart from ``start``; returns them oldest first."""
+    from .models import CourseSpecificEntry
+
+    entries = []
+    for i in range(count):
+        entry = CourseSpecificEntry.objects.create(
+            subject=subject, hours_studied=i % 12, previous_scores=60, extracurricular=i % 2,
+            motivation=i % 3, learning_styles=1 << (i % 5), predicted_score=40 + i % 50,
+        )
+        entry.created_at = start + step * i
+        CourseSpecificEntry.objects.filter(id=entry.id).update(created_at=entry.created_at)
+        entries.append(entry)
+    return entries
+
+
+def walk_pages(queryset, page_size, archives=None):
+    """Ids of every entry reached by following the 'older' cursors from the newest page."""
+    from . import history
+
+    ids, after = [], None
+    while True:
+        page = history.keyset_page(queryset, after=after, page_size=page_size, archives=archives)
+        ids += [entry.id for entry in page]
+        if not page.older:
+            return ids, page
+        after = page.older
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user, self.subject, first = make_course()
+        self.entries = [first] + add_history(self.subject, 24, timezone.now() - timedelta(days=80))
+        # Two entries sharing a timestamp must still be ordered (and paged) by id
+        self.entries[5].created_at = self.entries[6].created_at
+        type(first).objects.filter(id=self.entries[5].id).update(created_at=self.entries[5].created_at)
+
+    def expected_ids(self):
+        return [entry.id for entry in sorted(self.entries, key=lambda e: (e.created_at, e.id), reverse=True)]
+
+    def test_following_cursors_visits_every_entry_once_newest_first(self):
+        ids, _ = walk_pages(self.subject.entries.all(), page_size=7)
+        self.assertEqual(ids, self.expected_ids())
+
+    def test_before_cursor_returns_the_newer_page(self):
+        from . import history
+
+        first = history.keyset_page(self.subject.entries.all(), page_size=7)
+        second = history.keyset_page(self.subject.entries.all(), after=first.older, page_size=7)
+        back = history.keyset_page(self.subject.entries.all(), before=second.newer, page_size=7)
+        self.assertEqual([e.id for e in back], [e.id for e in first])
+        self.assertIsNone(back.newer)
+
+    def test_malformed_cursor_gives_the_first_page(self):
+        from . import history
+
+        page = history.keyset_page(self.subject.entries.all(), after='not-a-cursor', page_size=7)
+        self.assertEqual([e.id for e in page], self.expected_ids()[:7])
+
+
+class ChartETagTests(TestCase):
+    def setUp(self):
+        self.user, self.subject, self.entry = make_course()
+        add_history(self.subject, 5, timezone.now() - timedelta(days=20))
+        self.client.force_login(self.user)
+        self.url = f'/course/{self.subject.id}/history/chart-data/'
+
+    def test_unchanged_series_revalidates_with_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_new_score_changes_the_etag(self):
+        from . import prediction_records
+
+        etag = self.client.get(self.url)['ETag']
+        prediction_records.record_score(self.entry, 99.0)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_archiving_changes_the_etag(self):
+        from . import history_archive
+
+        add_history(self.subject, 6, timezone.now() - timedelta(days=500))
+        etag = self.client.get(self.url)['ETag']
+        history_archive.archive(timezone.now() - timedelta(days=365))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_other_students_get_no_etag_and_a_404(self):
+        other, _, _ = make_course(username='other')
+        self.client.force_login(other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class HistoryArchiveTests(TestCase):
+    def setUp(self):
+        from . import history_archive
+
+        self.user, self.subject, first = make_course()
+        self.old = add_history(self.subject, 30, timezone.now() - timedelta(days=500), step=timedelta(days=4))
+        self.recent = add_history(self.subject, 10, timezone.now() - timedelta(days=40))
+        self.entries = [first] + self.old + self.recent
+        self.courses, self.moved = history_archive.archive(timezone.now() - timedelta(days=365))
+
+    def test_archived_entries_come_back_unchanged(self):
+        from . import history_archive
+        from .models import CourseSpecificEntry, EntryArchive
+
+        self.assertEqual((self.courses, self.moved), (1, 30))
+        self.assertFalse(CourseSpecificEntry.objects.filter(id__in=[e.id for e in self.old]).exists())
+        restored = {e.id: e for archive in EntryArchive.objects.all() for e in history_archive.unpack(archive)}
+        for entry in self.old:
+            for column in history_archive.COLUMNS:
+                self.assertEqual(getattr(restored[entry.id], column), getattr(entry, column), column)
+
+    def test_monthly_totals_match_the_entries(self):
+        from . import history_archive
+        from .models import EntryArchive
+
+        for archive in EntryArchive.objects.all():
+            month = [e for e in self.old if history_archive.month_of(e.created_at) == archive.month]
+            scores = [e.predicted_score for e in month]
+            self.assertEqual((archive.entry_count, archive.scored_count), (len(month), len(scores)))
+            self.assertEqual((archive.score_sum, archive.score_min, archive.score_max),
+                             (sum(scores), min(scores), max(scores)))
+
+    def test_paging_merges_archived_months_only_when_reached(self):
+        from . import history, history_archive
+
+        archives = history.ArchivedMonths(self.subject, 'all')
+        with mock.patch.object(history_archive, 'unpack', wraps=history_archive.unpack) as unpack:
+            first = history.keyset_page(self.subject.entries.all(), page_size=5, archives=archives)
+            self.assertEqual(unpack.call_count, 0)
+            ids, _ = walk_pages(self.subject.entries.all(), page_size=5, archives=archives)
+        expected = sorted(self.entries, key=lambda e: (e.created_at, e.id), reverse=True)
+        self.assertEqual([e.id for e in first], [e.id for e in expected[:5]])
+        self.assertEqual(ids, [e.id for e in expected])
+
+    def test_chart_uses_monthly_totals_for_archived_months(self):
+        from . import history, history_archive
+        from .models import EntryArchive
+
+        with mock.patch.object(history_archive, 'unpack') as unpack:
+            series = history.chart_series(self.subject, 'all')
+        unpack.assert_not_called()
+        months = EntryArchive.objects.count()
+        # Plus the recent scored entries (the course's first entry has no score)
+        self.assertEqual(len(series['scores']), months + len(self.recent))
+        self.assertEqual(series['hours'][:months], [None] * months)
+        first_month = EntryArchive.objects.order_by('month').first()
+        self.assertAlmostEqual(series['scores'][0], first_month.score_sum / first_month.scored_count)
+
+    def test_paging_back_through_archived_months(self):
+        from . import history
+
+        archives = history.ArchivedMonths(self.subject, 'all')
+        queryset = self.subject.entries.all()
+        _, page = walk_pages(queryset, page_size=6, archives=archives)
+        ids = [entry.id for entry in page]
+        while page.newer:
+            page = history.keyset_page(queryset, before=page.newer, page_size=6, archives=archives)
+            ids = [entry.id for entry in page] + ids
+        expected = sorted(self.entries, key=lambda e: (e.created_at, e.id), reverse=True)
+        self.assertEqual(ids, [e.id for e in expected])
+
+    def test_bounded_range_unpacks_at_most_the_straddling_month(self):
+        from . import history, history_archive
+
+        with mock.patch.object(history_archive, 'unpack', wraps=history_archive.unpack) as unpack:
+            series = history.chart_series(self.subject, '1y')
+        self.assertLessEqual(unpack.call_count, 1)
+        since = history.range_start('1y')
+        in_range = [e for e in self.old + self.recent if e.created_at >= since]
+        self.assertLessEqual(len(series['scores']), len(in_range) + 1)
+
+
+class EncodedChoicesMigrationTests(TransactionTestCase):
+    """Migration 0010 on the free-text values found in existing databases."""
+
+    before = [('polls', '0009_entryarchive')]
+    after = [('polls', '0010_encoded_choices')]
+
+    def setUp(self):
+        from django.db import connection
+        from django.db.migrations.executor import MigrationExecutor
+
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.before)
+        self.executor.loader.build_graph()
+        self.addCleanup(self.migrate_to_latest)
+
+    def migrate_to_latest(self):
+        from django.db import connection
+        from django.db.migrations.executor import MigrationExecutor
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_known_variants_are_mapped_and_unknown_ones_reported(self):
+        import json
+        import zlib
+
+        from django.contrib.auth.models import User
+
+        apps = self.executor.loader.project_state(self.before).apps
+        Student = apps.get_model('polls', 'Student')
+        SubjectEntry = apps.get_model('polls', 'SubjectEntry')
+        EntryArchive = apps.get_model('polls', 'EntryArchive')
+        student = Student.objects.create(user_id=User.objects.create_user('legacy').id)
+        rows = {
+            # name: (extracurricular, motivation, preferred_learning_style)
+            'a': ('Yes', 'okay', 'Audio-Visual'),
+            'b': ('No', 'very high', 'Read and write'),
+            'c': ('yes', 'LOW', 'visual, kinesthetic, social'),
+            'd': ('Yes', 'high', 'reading'),
+            'e': ('No', 'whatever', 'revelation'),
+        }
+        for name, (extracurricular, motivation, styles) in rows.items():
+            SubjectEntry.objects.create(
+                student=student, subject_name=name, subject_name_normalized=name,
+                extracurricular=extracurricular, motivation=motivation, preferred_learning_style=styles,
+            )
+        archived = [[1, '2024-01-05T00:00:00+00:00', 5, 60, 'Yes', 7, 2, 'very high', 'Audio-Visual', 70, None]]
+        EntryArchive.objects.create(
+            subject=SubjectEntry.objects.get(subject_name='a'), month='2024-01-01',
+            first_created_at='2024-01-05T00:00:00Z', last_created_at='2024-01-05T00:00:00Z',
+            rows=zlib.compress(json.dumps(archived).encode()),
+        )
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.executor.migrate(self.after)
+
+        apps = self.executor.loader.project_state(self.after).apps
+        encoded = {
+            name: (extracurricular, motivation, styles)
+            for name, extracurricular, motivation, styles in apps.get_model('polls', 'SubjectEntry').objects
+            .values_list('subject_name', 'extracurricular', 'motivation', 'learning_styles')
+        }
+        self.assertEqual(encoded, {
+            'a': (1, 1, 1 | 2),
+            'b': (0, 2, 8),
+            'c': (1, 0, 1 | 4 | 16),
+            'd': (1, 2, 8),
+            'e': (0, 1, 0),
+        })
+        archive = apps.get_model('polls', 'EntryArchive').objects.get()
+        self.assertEqual(json.loads(zlib.decompress(archive.rows))[0][4:9], [1, 7, 2, 2, 3])
+        report = output.getvalue()
+        self.assertIn("'whatever'", report)
+        self.assertIn("'revelation'", report)
+        self.assertNotIn("'okay'", report)
+
+
+class PredictionCacheStatsTests(TestCase):
+    def setUp(self):
+        from . import prediction_cache
+
+        prediction_cache.reset_stats()
+        self.addCleanup(prediction_cache.reset_stats)
+
+    def test_staff_page_reports_this_process_counters(self):
+        from django.contrib.auth.models import User
+
+        from . import prediction_cache
+
+        payload = {'hours_studied': 3, 'motivation': 'high'}
+        prediction_cache.get(payload)
+        prediction_cache.put(payload, {'predicted_score': 60})
+        prediction_cache.get(payload)
+
+        url = '/staff/prediction-cache-stats/'
+        self.client.force_login(User.objects.create_user('student', password='pw'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user('staff', password='pw', is_staff=True))
+        stats = self.client.get(url).json()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (1, 1, 0.5))
+        self.assertTrue(stats['process_local'])
+
+    def test_command_refuses_a_process_local_cache(self):
+        from django.core.management import CommandError, call_command
+
+        with self.assertRaisesMessage(CommandError, 'process-local'):
+            call_command('prediction_cache_stats')
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'predictions': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'test_prediction_cache'},
+    })
+    def test_command_reads_a_shared_cache(self):
+        from django.core.management import call_command
+
+        from . import prediction_cache
+
+        call_command('createcachetable', verbosity=0)
+        prediction_cache.get({'hours_studied': 1})
+        out = io.StringIO()
+        call_command('prediction_cache_stats', stdout=out)
+        self.assertIn('0 hits, 1 misses', out.getvalue())
+
+
+class RescoreResumeTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+
+        _, self.subject, first = make_course(hours_studied=11)
+        self.entries = [first] + add_history(self.subject, 5, timezone.now() - timedelta(days=10))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = Path(directory.name) / 'checkpoint.json'
+
+    def rescore(self, predict, *args):
+        from django.core.management import call_command
+
+        with mock.patch.object(fastapi_client, 'predict', side_effect=predict):
+            call_command('rescore', '--mode', 'fanout', '--batch-size', '2', '--workers', '1',
+                         '--checkpoint', str(self.checkpoint), *args, stdout=io.StringIO())
+
+    def test_resume_retries_failed_rows_and_the_batch_cut_off_by_the_breaker(self):
+        import json
+
+        from django.core.management import CommandError
+
+        from .circuit_breaker import CircuitOpenError
+        from .models import CourseSpecificEntry
+
+        flaky, unreached = self.entries[2], self.entries[4]
+
+        def predict(payload):
+            if payload['hours_studied'] == flaky.hours_studied:
+                raise requests.exceptions.ConnectionError("reset")
+            if payload['hours_studied'] == unreached.hours_studied:
+                raise CircuitOpenError("open")
+            return {'predicted_score': 90 + payload['hours_studied']}
+
+        with self.assertRaisesMessage(CommandError, 'Prediction service unavailable'):
+            self.rescore(predict)
+        state = json.loads(self.checkpoint.read_text())
+        self.assertEqual(state['last_id'], self.entries[3].id)
+        self.assertEqual(state['failed_ids'], [flaky.id])
+
+        self.rescore(lambda payload: {'predicted_score': 90 + payload['hours_studied']}, '--resume')
+        scores = dict(CourseSpecificEntry.objects.values_list('id', 'predicted_score'))
+        self.assertEqual(scores, {entry.id: 90 + entry.hours_studied for entry in self.entries})
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_stops_after_too_many_failures(self):
+        import json
+
+        from django.core.management import CommandError
+
+        def predict(payload):
+            raise requests.exceptions.ConnectionError("reset")
+
+        with self.assertRaisesMessage(CommandError, '2 entries failed'):
+            self.rescore(predict, '--max-failures', '2')
+        state = json.loads(self.checkpoint.read_text())
+        self.assertEqual(state['failed_ids'], [self.entries[0].id, self.entries[1].id])
+
+
+class WriteQueueTests(TestCase):
+    def test_failing_write_does_not_roll_back_its_neighbours(self):
+        from concurrent.futures import Future
+
+        from django.contrib.auth.models import User
+
+        from . import write_queue
+
+        def create(name, fail=False):
+            def write():
+                User.objects.create_user(name)
+                if fail:
+                    raise ValueError(name)
+                return name
+            return write
+
+        batch = [(create('first'), Future()), (create('broken', fail=True), Future()), (create('last'), Future())]
+        write_queue._run_batch(batch)
+
+        self.assertEqual(batch[0][1].result(), 'first')
+        self.assertRaisesMessage(ValueError, 'broken', batch[1][1].result)
+        self.assertEqual(batch[2][1].result(), 'last')
+        self.assertEqual(sorted(User.objects.values_list('username', flat=True)), ['first', 'last'])
+
+    @override_settings(SQLITE_WRITE_BATCHING=True)
+    def test_run_inside_atomic_runs_inline(self):
+        import threading
+
+        from django.db import transaction
+
+        from . import write_queue
+
+        with transaction.atomic(), mock.patch.object(write_queue, 'submit') as submit:
+            thread = write_queue.run(threading.get_ident)
+        submit.assert_not_called()
+        self.assertEqual(thread, threading.get_ident())
+
+
+@override_settings(SQLITE_WRITE_BATCHING=True)
+class WriteQueueThreadTests(TransactionTestCase):
+    def test_writer_thread_returns_results_and_raises_errors(self):
+        import threading
+
+        from django.contrib.auth.models import User
+
+        from . import write_queue
+
+        def write():
+            User.objects.create_user('queued')
+            return threading.get_ident()
+
+        def fail():
+            User.objects.create_user('rolled-back')
+            raise ValueError("nope")
+
+        self.assertNotEqual(write_queue.run(write), threading.get_ident())
+        with self.assertRaisesMessage(ValueError, 'nope'):
+            write_queue.run(fail)
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['queued'])
+
+
+class ImportRecordsTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def import_records(self, path, *args):
+        from django.core.management import call_command
+
+        out = io.StringIO()
+        call_command('import_records', str(path), *args, stdout=out)
+        return out.getvalue()
+
+    def test_exported_history_imports_back_unchanged(self):
+        from django.contrib.auth.models import User
+        from django.core.management import call_command
+
+        from .models import CourseSpecificEntry, CourseStats, SubjectEntry
+
+        _, subject, first = make_course()
+        add_history(subject, 4, timezone.now() - timedelta(days=30))
+        columns = ('created_at', 'hours_studied', 'previous_scores', 'extracurricular', 'sleep_hours',
+                   'question_papers', 'motivation', 'learning_styles', 'predicted_score')
+        before = list(CourseSpecificEntry.objects.order_by('created_at').values_list(*columns))
+        exported = self.directory / 'history.csv'
+        call_command('export_history', str(exported), stderr=io.StringIO())
+
+        User.objects.all().delete()
+        self.import_records(exported, '--batch-size', '2')
+
+        course = SubjectEntry.objects.get(student__user__username='student', subject_name='Maths')
+        after = list(course.entries.order_by('created_at').values_list(*columns))
+        self.assertEqual(after, before)
+        stats = CourseStats.objects.get(subject=course)
+        self.assertEqual((stats.entry_count, stats.last_created_at), (5, before[-1][0]))
+
+    def test_bad_rows_are_rejected_and_good_ones_written_in_batches(self):
+        import csv
+
+        from . import record_import
+        from .models import CourseStats
+
+        _, subject, _ = make_course()
+        add_history(subject, 2, timezone.now() - timedelta(days=30))
+        source = self.directory / 'records.csv'
+        header = ['username', 'subject_name', 'created_at', 'hours_studied', 'previous_scores',
+                  'extracurricular', 'sleep_hours', 'question_papers', 'motivation',
+                  'preferred_learning_style', 'predicted_score']
+        rows = [
+            ['student', 'maths', '2024-01-05T10:00:00', 4, 70, 'Yes', 7, 2, 'high', 'visual;social', 72],
+            ['student', 'Maths', '2024-01-06T10:00:00', '', 70, 'No', 7, 2, 'low', 'visual', 60],
+            ['student', 'Maths', '2024-01-07T10:00:00', 5, 70, 'No', 7, 2, 'keen', 'visual', 61],
+            ['newcomer', 'Art', '2024-02-01T09:00:00', 3, 55, 'No', 8, 1, 'medium', 'kinesthetic', 58],
+            ['newcomer', 'Art', '2024-03-01T09:00:00', 6, 55, 'No', 8, 1, 'medium', 'kinesthetic', 64],
+        ]
+        with open(source, 'w', newline='') as f:
+            csv.writer(f).writerows([header] + rows)
+        rejects = self.directory / 'rejects.csv'
+
+        write = record_import.Importer.write
+        with mock.patch.object(record_import.Importer, 'write', autospec=True, side_effect=write) as spy:
+            output = self.import_records(source, '--batch-size', '2', '--rejects', str(rejects))
+
+        self.assertEqual([len(call.args[1]) for call in spy.call_args_list], [2, 1])
+        self.assertIn('Imported 3 of 5 rows (2 rejected)', output)
+        with open(rejects, newline='') as f:
+            rejected = list(csv.reader(f))
+        self.assertEqual([row[:1] for row in rejected], [['line'], ['3'], ['4']])
+        self.assertTrue(rejected[1][1].startswith('hours_studied:'))
+        self.assertTrue(rejected[2][1].startswith('motivation:'))
+
+        stats = {stats.subject.subject_name: stats for stats in CourseStats.objects.select_related('subject')}
+        self.assertEqual(stats['Maths'].entry_count, 4)
+        self.assertEqual((stats['Art'].entry_count, stats['Art'].last_score), (2, 64))
+        self.assertEqual(stats['Art'].subject.predicted_score, 64)
+
+
+class HistoryExportTests(TestCase):
+    def setUp(self):
+        from . import history_archive
+
+        self.user, self.subject, _ = make_course()
+        self.old = add_history(self.subject, 30, timezone.now() - timedelta(days=500), step=timedelta(days=4))
+        add_history(self.subject, 5, timezone.now() - timedelta(days=40))
+        history_archive.archive(timezone.now() - timedelta(days=365))
+
+    def test_live_rows_resume_after_the_last_id(self):
+        from . import history_export
+
+        rows = list(history_export.rows(chunk_size=2))
+        self.assertEqual([mark for mark, _ in rows], sorted(row[0] for _, row in rows))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(list(history_export.rows(after=rows[2][0])), rows[3:])
+
+    def test_archive_rows_resume_from_their_archive_id(self):
+        from . import history_export
+
+        rows = list(history_export.rows('archive'))
+        self.assertEqual(sorted(row[0] for _, row in rows), [entry.id for entry in self.old])
+        self.assertTrue(all(row[-1] == mark for mark, row in rows))
+
+        # Cut off in the middle of an archive's rows
+        cut = next(i for i in range(1, len(rows)) if rows[i][0] == rows[i - 1][0])
+        received = rows[:cut]
+        resumed = list(history_export.rows('archive', after=received[-1][1][-1] - 1))
+        self.assertEqual({row[0] for _, row in received + resumed}, {entry.id for entry in self.old})
+
+    def test_archive_export_has_an_archive_id_column(self):
+        import csv
+        import json
+
+        from . import history_export
+
+        self.client.force_login(self.user)
+        response = self.client.get('/history/export/', {'source': 'archive'})
+        lines = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(tuple(lines[0]), history_export.ARCHIVE_COLUMNS)
+        self.assertEqual(len(lines), 31)
+        self.assertIn(lines[1][7], ('Yes', 'No'))
+
+        response = self.client.get('/history/export/', {'source': 'archive', 'format': 'ndjson'})
+        record = json.loads(b''.join(response.streaming_content).splitlines()[0])
+        self.assertIn('archive_id', record)
+
+        response = self.client.get('/history/export/')
+        header = b''.join(response.streaming_content).decode().splitlines()[0]
+        self.assertEqual(header, ','.join(history_export.COLUMNS))
+
+
+@override_settings(PREDICTION_MODE='sync', PREDICTION_BACKEND='remote')
+class SinglePageWizardTests(TestCase):
+    def setUp(self):
+        import types
+
+        from django.contrib.auth.models import User
+        from django.urls import include, path
+
+        from .forms import Step1Form, Step2Form, Step3Form, Step4Form, Step5Form
+        from .models import Student
+        from .views import SinglePageSubjectWizard
+
+        # polls.urls picks the wizard from WIZARD_SINGLE_PAGE when it is imported
+        wizard = SinglePageSubjectWizard.as_view([Step1Form, Step2Form, Step3Form, Step4Form, Step5Form])
+        urlconf = types.ModuleType('single_page_urls')
+        urlconf.urlpatterns = [
+            path('create-subject/', wizard, name='create_subject_entry'),
+            path('', include('polls.urls')),
+        ]
+        settings_override = override_settings(ROOT_URLCONF=urlconf)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('wizard', password='pw')
+        Student.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.data = {key: value for step in WIZARD_STEPS for key, value in step.items()}
+
+    def submit(self, data):
+        with contextlib.redirect_stdout(io.StringIO()):
+            page = self.client.get('/new-course/', follow=True)
+            response = self.client.post('/create-subject/', data)
+        self.assertContains(page, 'data-mode="not_editing"')
+        return response
+
+    def test_one_post_creates_and_scores_the_course(self):
+        from .models import SubjectEntry
+
+        with mock.patch('polls.predictions.get_prediction', return_value={'predicted_score': 77.0}):
+            response = self.submit(self.data)
+        course = SubjectEntry.objects.get(student__user=self.user)
+        self.assertRedirects(response, f'/course/{course.id}/', fetch_redirect_response=False)
+        self.assertEqual((course.subject_name, course.predicted_score), ('Physics', 77.0))
+        self.assertEqual(course.entries.get().learning_styles, 1 | 4)
+
+    def test_an_invalid_step_shows_its_errors_and_keeps_the_other_steps(self):
+        from .models import SubjectEntry
+
+        with mock.patch('polls.predictions.get_prediction') as get_prediction:
+            response = self.submit(dict(self.data, **{'3-sleep_hours': -2}))
+        get_prediction.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(SubjectEntry.objects.exists())
+        self.assertTrue(response.context['steps'][3]['form'].errors)
+        self.assertFalse(any(step['form'].errors for i, step in enumerate(response.context['steps']) if i != 3))
+        self.assertContains(response, 'value="Physics"')
@@ -1,10 +1,21 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from .views import SubjectWizard
 from .forms import Step1Form, Step2Form, Step3Form, Step4Form, Step5Form
-from .views import SubjectWizard, subject_results_view
+from .views import SubjectWizard, SinglePageSubjectWizard, subject_results_view
 from .views import delete_course
 
+# The step-by-step wizard, or all steps on one page posted once (WIZARD_SINGLE_PAGE)
+if getattr(settings, 'WIZARD_SINGLE_PAGE', False):
+    subject_wizard = views.async_single_page_wizard if settings.ASYNC_MODEL_VIEWS else SinglePageSubjectWizard.as_view(
+        [Step1Form, Step2Form, Step3Form, Step4Form, Step5Form]
+    )
+else:
+    subject_wizard = views.async_subject_wizard if settings.ASYNC_MODEL_VIEWS else SubjectWizard.as_view(
+        [Step1Form, Step2Form, Step3Form, Step4Form, Step5Form]
+    )
+
 
 urlpatterns = [
     path("", views.sparkles_preview, name='home'),
@@ -14,9 +25,7 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('signup/', views.signup_view, name='signup'),
 
-    path('create-subject/', SubjectWizard.as_view(
-        [Step1Form, Step2Form, Step3Form, Step4Form, Step5Form]
-    ), name='create_subject_entry'),
+    path('create-subject/', subject_wizard, name='create_subject_entry'),
     
     path('new-course/', views.new_course, name='new_course'),   
     path('results/<int:subject_id>/', subject_results_view, name='subject_results'),
@@ -25,10 +34,14 @@ urlpatterns = [
     path('hero/', views.hero_view, name='hero'),
 
     path('course/<int:course_id>/', views.subject_dashboard, name='subject_dashboard'),
+    path('course/<int:course_id>/prediction-status/', views.prediction_status, name='prediction_status'),
 
     # path('charts/', views.my_charts_view, name='my_charts'),
     
-    path('guidance/<int:course_id>/', views.get_guidance_view, name='get_guidance'),
+    path('guidance/<int:course_id>/',
+         views.aget_guidance_view if settings.ASYNC_MODEL_VIEWS else views.get_guidance_view,
+         name='get_guidance'),
+    path('guidance/<int:course_id>/stream/', views.stream_guidance_view, name='stream_guidance'),
     
     path("student_dashboard/", views.student_dashboard_view, name="student_dashboard"),
     
@@ -37,5 +50,13 @@ urlpatterns = [
     path('course/new-prediction/<int:course_id>/', views.new_prediction, name='new_prediction'),
 
     path('course/<int:course_id>/history/', views.course_history_dashboard, name='course_history'),
+    path('course/<int:course_id>/history/chart-data/', views.course_chart_data, name='course_chart_data'),
+
+    # Streaming CSV/NDJSON history exports: the student's own, and everyone's for staff
+    path('history/export/', views.export_history, name='export_history'),
+    path('history/export/all/', views.export_all_history, name='export_all_history'),
+
+    # Prediction cache counters, read inside the server process (staff only)
+    path('staff/prediction-cache-stats/', views.prediction_cache_stats, name='prediction_cache_stats'),
 ]
 
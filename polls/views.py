@@ -1,12 +1,18 @@
-from django.http import Http404
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 import requests
 import json
+import os
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.contrib.auth.models import User
-from .models import Student, SubjectEntry, CourseSpecificEntry
+from .models import Student, SubjectEntry, CourseStats
+from .models import Extracurricular, LearningStyle, Motivation, choice_code, learning_style_codes
 from django.core.cache import cache
+from django.db import IntegrityError
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import login
 from django.contrib.auth.forms import UserCreationForm
@@ -14,17 +20,27 @@ from django.shortcuts import get_object_or_404
 from .forms import StudyPlanQuestionnaireForm
 from .models import StudyPlanQuestionnaire
 
-from django.views.decorators.http import require_POST
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_POST
 from .forms import Step1Form, Step2Form, Step3Form, Step4Form, Step5Form
+from django.views import View
 from formtools.wizard.views import SessionWizardView
 from .forms import Step1Form, Step2Form, Step3Form, Step4Form, Step5Form
+from . import fastapi_client
+from . import guidance_cache
+from . import history
+from . import history_export
+from . import prediction_cache
+from . import prediction_jobs
+from . import prediction_records
+from . import predictions
+from .circuit_breaker import CircuitOpenError
 
 
 
 
 
-FASTAPI_URL = 'http://127.0.0.1:8000'
-
 
 def home(request):
     return render(request, 'base.html')  
@@ -70,12 +86,72 @@ def signup_view(request):
 
     return render(request, 'registration/signup.html', {'form': form})
 
-FASTAPI_PREDICTION_URL = 'http://127.0.0.1:8000/predict'
+def apply_prediction_result(request, subject, entry, prediction_result):
+    """Store a successful prediction on the entry and its course and tell the student."""
+    print("DEBUG: Received response from FastAPI:", prediction_result)
+    predicted_score = prediction_result.get("predicted_score")
+
+    # Debugging log
+    if predicted_score is None:
+        print("Warning: Predicted score is None. API response:", prediction_result)
+        messages.warning(request, "Prediction completed but no score was returned.")
+        return
+
+    # Update the entry, and the course's score when this is its latest entry
+    prediction_records.record_score(
+        entry, predicted_score, subject=subject, degraded=bool(prediction_result.get("degraded")),
+    )
+
+    # Add success message
+    if prediction_result.get("degraded"):
+        messages.warning(request, f"Our prediction service is busy, so this is an estimate: {predicted_score}")
+    else:
+        messages.success(request, f"Prediction successful! Estimated score: {predicted_score}")
+
+
+def handle_prediction_error(request, entry, e):
+    """Tell the student why there is no score (or queue the entry for later)."""
+    # A timeout is a ReadTimeout/ConnectTimeout on the last attempt or our own
+    # DeadlineExceeded; either way the predictor is down or too slow right now
+    unavailable = isinstance(e, (CircuitOpenError, requests.exceptions.Timeout))
+    if unavailable and prediction_jobs.async_enabled():
+        # Don't wait for it: queue the entry so the worker scores it once it recovers
+        print(f"Prediction API unavailable, queueing entry {entry.id}: {e}")
+        prediction_jobs.enqueue(entry)
+        messages.info(request, "Our prediction service is busy. Your score will appear here shortly.")
+    elif isinstance(e, requests.exceptions.RequestException):
+        # Handle API connection errors
+        print(f"Error connecting to prediction API: {e}")
+        messages.error(request, "Failed to get prediction from our system. Please try again later.")
+    elif isinstance(e, json.JSONDecodeError):
+        # Handle JSON parsing errors
+        print(f"Error parsing prediction response: {e}")
+        messages.error(request, "Error processing prediction result.")
+    else:
+        # Handle any other unexpected errors
+        print(f"Unexpected error during prediction: {e}")
+        messages.error(request, "An unexpected error occurred during prediction.")
+
+
+WIZARD_STORAGES = {
+    'session': 'formtools.wizard.storage.session.SessionStorage',
+    'cookie': 'formtools.wizard.storage.cookie.CookieStorage',
+}
+
 
 class SubjectWizard(SessionWizardView):
     form_list = [Step1Form, Step2Form, Step3Form, Step4Form, Step5Form]
     template_name = "multi_form.html"
 
+    # Set by AsyncSubjectWizard: done() only saves, the caller scores the entry
+    defer_prediction = False
+
+    @property
+    def storage_name(self):
+        # settings.WIZARD_STORAGE; with "cookie" the step data travels in a
+        # signed cookie and the steps leave the session untouched
+        return WIZARD_STORAGES[getattr(settings, 'WIZARD_STORAGE', 'session')]
+
     def get_form_kwargs(self, step=None):
         kwargs = super().get_form_kwargs(step)
         
@@ -144,15 +220,10 @@ class SubjectWizard(SessionWizardView):
                         'sleep_hours': course.sleep_hours,
                     })
                 elif step == '4':  # Step5Form
-                    # Convert comma-separated learning styles back to list
-                    learning_styles = []
-                    if course.preferred_learning_style:
-                        learning_styles = [style.strip() for style in course.preferred_learning_style.split(',')]
-                    
                     initial.update({
                         'question_papers': course.question_papers,
                         'motivation': course.motivation,
-                        'preferred_learning_style': learning_styles,
+                        'preferred_learning_style': LearningStyle.split(course.learning_styles),
                     })
                     
             except SubjectEntry.DoesNotExist:
@@ -192,40 +263,39 @@ class SubjectWizard(SessionWizardView):
         print(f"DEBUG get_context_data - new_prediction_course_id: {new_prediction_course_id}")
         
         # Add mode-specific context
-        if new_prediction_course_id:
-            context['wizard_title'] = 'New Prediction'
-            context['wizard_subtitle'] = 'Create a new performance prediction for your course'
-            print("DEBUG get_context_data: Set wizard_title to 'New Prediction'")
-        else:
-            context['wizard_title'] = 'Add New Course'
-            context['wizard_subtitle'] = 'Add a new subject to track your performance'
-            print("DEBUG get_context_data: Set wizard_title to 'Add New Course'")
-        
+        context.update(self.get_mode_context(new_prediction_course_id))
         print(f"DEBUG get_context_data: Final wizard_title = '{context['wizard_title']}'")
         
         # Add step-specific context
-        if self.steps.current == '0':
-            if new_prediction_course_id:
-                context['step_title'] = 'Course Information'
-                context['step_description'] = 'Confirm the course and enter your latest scores'
-            else:
-                context['step_title'] = 'Subject Information'
-                context['step_description'] = 'Enter the subject name and your previous scores'
-        elif self.steps.current == '1':
-            context['step_title'] = 'Study Hours'
-            context['step_description'] = 'How many hours do you study per week?'
-        elif self.steps.current == '2':
-            context['step_title'] = 'Extracurricular Activities'
-            context['step_description'] = 'Do you participate in extracurricular activities?'
-        elif self.steps.current == '3':
-            context['step_title'] = 'Sleep Pattern'
-            context['step_description'] = 'How many hours do you sleep on average?'
-        elif self.steps.current == '4':
-            context['step_title'] = 'Study Preparation'
-            context['step_description'] = 'Additional information about your study habits'
-            
+        context['step_title'], context['step_description'] = self.get_step_heading(
+            self.steps.current, new_prediction_course_id,
+        )
         return context
 
+    def get_mode_context(self, new_prediction_course_id):
+        if new_prediction_course_id:
+            return {
+                'wizard_title': 'New Prediction',
+                'wizard_subtitle': 'Create a new performance prediction for your course',
+            }
+        return {
+            'wizard_title': 'Add New Course',
+            'wizard_subtitle': 'Add a new subject to track your performance',
+        }
+
+    def get_step_heading(self, step, new_prediction_course_id):
+        """(title, description) shown above a step."""
+        if step == '0':
+            if new_prediction_course_id:
+                return 'Course Information', 'Confirm the course and enter your latest scores'
+            return 'Subject Information', 'Enter the subject name and your previous scores'
+        return {
+            '1': ('Study Hours', 'How many hours do you study per week?'),
+            '2': ('Extracurricular Activities', 'Do you participate in extracurricular activities?'),
+            '3': ('Sleep Pattern', 'How many hours do you sleep on average?'),
+            '4': ('Study Preparation', 'Additional information about your study habits'),
+        }[step]
+
 
     def done(self, form_list, **kwargs):
         data = {}
@@ -235,12 +305,16 @@ class SubjectWizard(SessionWizardView):
         student = self.request.user.student
         subject_name = data.get("subject_name", "Unnamed course")
 
-        # Convert learning style list to comma-separated string
-        learning_styles = data.get("preferred_learning_style", [])
-        if isinstance(learning_styles, list):
-            preferred_learning_style = ", ".join(learning_styles)
-        else:
-            preferred_learning_style = str(learning_styles) if learning_styles else "None"
+        # Step5Form cleans the learning styles into a LearningStyle bitmask
+        inputs = {
+            "hours_studied": data["hours_studied"],
+            "previous_scores": data["previous_scores"],
+            "extracurricular": data["extracurricular"],
+            "sleep_hours": data["sleep_hours"],
+            "question_papers": data["question_papers"],
+            "motivation": data.get("motivation", Motivation.MEDIUM),
+            "learning_styles": data["preferred_learning_style"],
+        }
 
         # Determine the mode and course ID
         new_prediction_course_id = self.request.session.get('new_prediction_course_id')
@@ -250,26 +324,10 @@ class SubjectWizard(SessionWizardView):
             subject = get_object_or_404(SubjectEntry, id=new_prediction_course_id, student=student)
             
             # DON'T update the subject name in new_prediction mode!
-            # The subject name should remain the same, only update other fields
-            subject.hours_studied = data["hours_studied"]
-            subject.previous_scores = data["previous_scores"]
-            subject.extracurricular = data["extracurricular"]
-            subject.sleep_hours = data["sleep_hours"]
-            subject.question_papers = data["question_papers"]
-            subject.motivation = data.get("motivation", "Medium")
-            subject.preferred_learning_style = preferred_learning_style
-            subject.save()
-            
-            # Create a new prediction entry for history tracking
-            entry = CourseSpecificEntry.objects.create(
-                subject=subject,
-                hours_studied=data["hours_studied"],
-                previous_scores=data["previous_scores"],
-                extracurricular=data["extracurricular"],
-                sleep_hours=data["sleep_hours"],
-                question_papers=data["question_papers"],
-                motivation=data.get("motivation", "Medium"),
-                preferred_learning_style=preferred_learning_style,
+            # The subject name should remain the same, only the inputs are
+            # rewritten, together with a new prediction entry for history tracking
+            entry = prediction_records.record_submission(
+                subject, inputs, enqueue=prediction_jobs.async_enabled(),
             )
             
             # Clear the new prediction flag from session
@@ -277,94 +335,54 @@ class SubjectWizard(SessionWizardView):
             redirect_id = subject.id
             
         else:
-            # NOT EDITING MODE: Creating a new course
-            subject = SubjectEntry.objects.create(
-                student=student,
-                subject_name=subject_name,
-                hours_studied=data["hours_studied"],
-                previous_scores=data["previous_scores"],
-                extracurricular=data["extracurricular"],
-                sleep_hours=data["sleep_hours"],
-                question_papers=data["question_papers"],
-                motivation=data.get("motivation", "Medium"),
-                preferred_learning_style=preferred_learning_style,
-            )
-
-            # Also create a prediction entry for consistency
-            entry = CourseSpecificEntry.objects.create(
-                subject=subject,
-                hours_studied=data["hours_studied"],
-                previous_scores=data["previous_scores"],
-                extracurricular=data["extracurricular"],
-                sleep_hours=data["sleep_hours"],
-                question_papers=data["question_papers"],
-                motivation=data.get("motivation", "Medium"),
-                preferred_learning_style=preferred_learning_style,
-            )
+            # NOT EDITING MODE: Creating a new course (and its first prediction entry)
+            subject = SubjectEntry(student=student, subject_name=subject_name)
+            try:
+                entry = prediction_records.record_submission(
+                    subject, inputs, enqueue=prediction_jobs.async_enabled(),
+                )
+            except IntegrityError:
+                # Step 1 checks for duplicates, but two submissions can race past
+                # it; the unique index on the normalized name settles it here.
+                existing = SubjectEntry.objects.filter(
+                    student=student,
+                    subject_name_normalized=SubjectEntry.normalize_name(subject_name),
+                ).first()
+                messages.error(self.request, f"You already have a subject named '{subject_name}'.")
+                if existing is None:
+                    return redirect('new_course')
+                return redirect('subject_dashboard', course_id=existing.id)
         
             redirect_id = subject.id
 
+        # In async mode the worker (manage.py run_prediction_worker) scores the
+        # entry in the background and the dashboard shows it as pending; the
+        # job was queued in the same transaction as the entry.
+        if prediction_jobs.async_enabled():
+            messages.info(self.request, "Your prediction is being calculated. It will appear here shortly.")
+            return redirect('subject_dashboard', course_id=redirect_id)
+
+        response = redirect('subject_dashboard', course_id=redirect_id)
+
+        # The async wizard awaits the prediction itself, off the worker thread
+        if self.defer_prediction:
+            response.pending_prediction = (subject, entry)
+            return response
+
         # Send data to FastAPI for prediction
-        payload = {
-            "hours_studied": data["hours_studied"],
-            "previous_scores": data["previous_scores"],
-            "extracurricular": data["extracurricular"],
-            "sleep_hours": data["sleep_hours"],
-            "question_papers": data["question_papers"],
-            "motivation": data.get("motivation", "Medium"),
-            "preferred_learning_style": preferred_learning_style,
-        }
+        payload = entry.prediction_payload()
         print("DEBUG: Sending payload to FastAPI:", payload)  # Log the payload
         
         try:
-            # Send prediction request to FastAPI
-            response = requests.post(FASTAPI_PREDICTION_URL, json=payload)
-            response.raise_for_status()  # Raise exception for bad status codes
-            
-            # Parse the prediction result
-            prediction_result = response.json()
-            print("DEBUG: Received response from FastAPI:", prediction_result)
-            predicted_score = prediction_result.get("predicted_score")
-            
-            # Debugging log
-            if predicted_score is None:
-                print("Warning: Predicted score is None. API response:", prediction_result)
-
-            # Update the entry with the prediction result
-            if predicted_score is not None:
-                entry.predicted_score = predicted_score
-                entry.save()
-                
-                # Also update the subject's predicted score if this is the latest prediction
-                if new_prediction_course_id:
-                    subject.predicted_score = predicted_score
-                    subject.save()
-
-                # Also update the subject's predicted score (for both new prediction and new course modes)
-                subject.predicted_score = predicted_score
-                subject.save()
-                    
-                # Add success message
-                messages.success(self.request, f"Prediction successful! Estimated score: {predicted_score}")
-            else:
-                messages.warning(self.request, "Prediction completed but no score was returned.")
-                
-        except requests.exceptions.RequestException as e:
-            # Handle API connection errors
-            print(f"Error connecting to prediction API: {e}")
-            messages.error(self.request, "Failed to get prediction from our system. Please try again later.")
-        except json.JSONDecodeError as e:
-            # Handle JSON parsing errors
-            print(f"Error parsing prediction response: {e}")
-            messages.error(self.request, "Error processing prediction result.")
+            # Cached FastAPI score, or the local model depending on PREDICTION_BACKEND
+            prediction_result = predictions.get_prediction(payload)
         except Exception as e:
-            # Handle any other unexpected errors
-            print(f"Unexpected error during prediction: {e}")
-            messages.error(self.request, "An unexpected error occurred during prediction.")
-
+            handle_prediction_error(self.request, entry, e)
+        else:
+            apply_prediction_result(self.request, subject, entry, prediction_result)
 
         # Redirect to the subject dashboard - THIS LINE WAS MISPLACED
-        return redirect('subject_dashboard', course_id=redirect_id)
+        return response
     
     def post(self, request, *args, **kwargs):
             print(f"Current Step: {self.steps.current}")  
@@ -377,6 +395,97 @@ class SubjectWizard(SessionWizardView):
             
             return super().post(request, *args, **kwargs)
 
+class SinglePageSubjectWizard(SubjectWizard):
+    """
+    The same five steps on one page (settings.WIZARD_SINGLE_PAGE). The
+    browser moves between the steps and checks each one with the rules in
+    form-validation.js, then posts everything once. Here the five forms are
+    validated together, with SubjectWizard's kwargs and initial values, and
+    done() saves and scores the submission as usual. Nothing is kept
+    between requests, so a prediction takes one GET and one POST.
+    """
+    template_name = "subject_single_page.html"
+
+    def dispatch(self, request, *args, **kwargs):
+        # Skip WizardView.dispatch: there is no step storage to set up
+        self.prefix = self.get_prefix(request, *args, **kwargs)
+        return View.dispatch(self, request, *args, **kwargs)
+
+    def get_forms(self, data=None):
+        return [self.get_form(step, data=data) for step in self.get_form_list()]
+
+    def get(self, request, *args, **kwargs):
+        return self.render_forms(self.get_forms())
+
+    def post(self, request, *args, **kwargs):
+        forms = self.get_forms(data=request.POST)
+        # A list, not a generator: every form is validated so all errors show
+        if all([form.is_valid() for form in forms]):
+            return self.done(forms)
+        return self.render_forms(forms)
+
+    def render_forms(self, forms):
+        new_prediction_course_id = self.request.session.get('new_prediction_course_id')
+        steps = []
+        for step, form in zip(self.get_form_list(), forms):
+            title, description = self.get_step_heading(step, new_prediction_course_id)
+            steps.append({'form': form, 'title': title, 'description': description})
+        context = self.get_mode_context(new_prediction_course_id)
+        context['steps'] = steps
+        # Read by detectMode() in form-validation.js
+        context['mode'] = 'new_prediction' if new_prediction_course_id else 'not_editing'
+        return render(self.request, self.template_name, context)
+
+
+class AsyncSubjectWizard(SubjectWizard):
+    """SubjectWizard whose done() saves the submission but leaves scoring to the caller."""
+    defer_prediction = True
+
+
+class AsyncSinglePageSubjectWizard(SinglePageSubjectWizard):
+    """SinglePageSubjectWizard whose done() leaves scoring to the caller."""
+    defer_prediction = True
+
+
+_deferred_subject_wizard = AsyncSubjectWizard.as_view(
+    [Step1Form, Step2Form, Step3Form, Step4Form, Step5Form]
+)
+_deferred_single_page_wizard = AsyncSinglePageSubjectWizard.as_view(
+    [Step1Form, Step2Form, Step3Form, Step4Form, Step5Form]
+)
+
+
+async def _score_pending(request, response):
+    """Await the prediction a deferred wizard's done() left on ``response``, if any."""
+    pending = getattr(response, 'pending_prediction', None)
+    if pending:
+        subject, entry = pending
+        try:
+            prediction_result = await predictions.aget_prediction(entry.prediction_payload())
+        except Exception as e:
+            await sync_to_async(handle_prediction_error)(request, entry, e)
+        else:
+            await sync_to_async(apply_prediction_result)(request, subject, entry, prediction_result)
+
+
+async def async_subject_wizard(request, *args, **kwargs):
+    """
+    ASGI version of the wizard. The form steps run in a worker thread as
+    usual; on the final step the prediction is awaited on the event loop so
+    no thread is held while FastAPI works.
+    """
+    response = await sync_to_async(_deferred_subject_wizard)(request, *args, **kwargs)
+    await _score_pending(request, response)
+    return response
+
+
+async def async_single_page_wizard(request, *args, **kwargs):
+    """ASGI version of SinglePageSubjectWizard, scoring like async_subject_wizard."""
+    response = await sync_to_async(_deferred_single_page_wizard)(request, *args, **kwargs)
+    await _score_pending(request, response)
+    return response
+
+
 def subject_dashboard(request, course_id):
     course = get_object_or_404(SubjectEntry, id=course_id)
     
@@ -388,11 +497,21 @@ def subject_dashboard(request, course_id):
     
     return render(request, 'dashboard.html', {
         'course': course,
-        'courses': SubjectEntry.objects.filter(student=student),
+        'prediction_pending': prediction_jobs.is_pending(course),
         'current_page': 'dashboard'
     })
 
 
+@login_required
+def prediction_status(request, course_id):
+    """Polled by the dashboard while a background prediction is pending."""
+    course = get_object_or_404(SubjectEntry, id=course_id, student=request.user.student)
+    return JsonResponse({
+        'pending': prediction_jobs.is_pending(course),
+        'predicted_score': course.predicted_score,
+    })
+
+
 @login_required
 def subject_results_view(request, subject_id):
     subject_entry = get_object_or_404(SubjectEntry, id=subject_id, student=request.user.student)
@@ -441,7 +560,8 @@ def multi_step_form(request):
                     extracurricular=request.session['extracurricular'],
                     sleep_hours=request.session['sleep_hours'],
                     question_papers=form.cleaned_data['question_papers'],
-                    preferred_learning_style=form.cleaned_data['preferred_learning_style']
+                    motivation=form.cleaned_data['motivation'],
+                    learning_styles=form.cleaned_data['preferred_learning_style']
                 )
 
 
@@ -469,18 +589,15 @@ def multi_step_form(request):
 
 
 def send_to_fastapi(subject_entry):
-    import requests
     data = {
         "hours_studied": subject_entry.hours_studied,
         "previous_scores": subject_entry.previous_scores,
-        "extracurricular": subject_entry.extracurricular,
+        "extracurricular": Extracurricular(subject_entry.extracurricular).label,
         "sleep_hours": subject_entry.sleep_hours,
         "question_papers": subject_entry.question_papers,
     }
     try:
-        response = requests.post(FASTAPI_URL, json=data)
-        response.raise_for_status()  # Raise an error for bad responses
-        return response.json()  # Return the JSON response if needed
+        return fastapi_client.predict(data)  # Return the JSON response if needed
     except requests.exceptions.RequestException as e:
         print("Error sending data to FastAPI:", e)
         return None  # Return None or handle the error as needed
@@ -494,12 +611,19 @@ def hero_view(request):
     student = request.user.student
     latest_score = SubjectEntry.objects.filter(student=student).last()
     recent_feedback = "Try practicing 1 more paper this week!"
-    courses = SubjectEntry.objects.filter(student__user=request.user)
+    # The most recently scored course, straight from the per-course stats rows
+    latest_stats = (
+        CourseStats.objects
+        .filter(subject__student=student, last_score__isnull=False)
+        .select_related('subject')
+        .order_by('-last_created_at')
+        .first()
+    )
 
     return render(request, 'hero.html', {
         'latest_score': latest_score,
+        'latest_stats': latest_stats,
         'recent_feedback': recent_feedback,
-        'courses': courses,
         'current_page': 'hero'
     })
 
@@ -583,6 +707,81 @@ def student_dashboard_view(request):
 #     return redirect("subject_dashboard", course_id = course.id)  
 
 
+def guidance_payload(course, user):
+    """Payload for the /chatbot-advice guidance service."""
+    return {
+        "subject": str(course.subject_name),
+        "user_id": str(user.id),
+        "predicted_score": course.predicted_score,
+        "subject_weekly_study_hours": course.hours_studied,
+        "motivation_level": choice_code(Motivation(course.motivation)),
+        "preferred_learning_style": learning_style_codes(course.learning_styles),
+    }
+
+
+def _sse(data, event=None):
+    """Format one server-sent event."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+@require_POST
+@login_required
+def stream_guidance_view(request, course_id):
+    """
+    Stream the study guide to the browser as server-sent events while the
+    guidance service generates it. The full text is saved to the course once
+    the stream completes.
+    """
+    course = get_object_or_404(SubjectEntry, id=course_id, student=request.user.student)
+    payload = guidance_payload(course, request.user)
+
+    def events():
+        cached = guidance_cache.get(payload)
+        if cached is not None:
+            guidance_text = cached["study_guide"]
+            SubjectEntry.objects.filter(id=course.id).update(study_guide=guidance_text)
+            yield _sse({"chunk": guidance_text})
+            yield _sse({"length": len(guidance_text)}, event="done")
+            return
+
+        parts = []
+        try:
+            try:
+                for chunk in fastapi_client.stream_post(fastapi_client.CHATBOT_ADVICE_STREAM_PATH, payload):
+                    parts.append(chunk)
+                    yield _sse({"chunk": chunk})
+            except requests.exceptions.HTTPError as e:
+                # Service without a streaming endpoint: send the whole guide at once
+                if parts or e.response is None or e.response.status_code != 404:
+                    raise
+                chunk = fastapi_client.chatbot_advice(payload).get("study_guide") or ""
+                parts.append(chunk)
+                yield _sse({"chunk": chunk})
+        except CircuitOpenError:
+            yield _sse({"error": "The guidance service is temporarily unavailable. Please try again in a minute."}, event="error")
+            return
+        except requests.exceptions.RequestException as e:
+            yield _sse({"error": f"Failed to connect to guidance service: {e}"}, event="error")
+            return
+
+        guidance_text = "".join(parts)
+        if not guidance_text:
+            yield _sse({"error": "Empty response from guidance service."}, event="error")
+            return
+
+        # Only the guide changed, so only write that column
+        SubjectEntry.objects.filter(id=course.id).update(study_guide=guidance_text)
+        guidance_cache.put(payload, {"study_guide": guidance_text})
+        yield _sse({"length": len(guidance_text)}, event="done")
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @login_required
 def get_guidance_view(request, course_id):
     course = get_object_or_404(SubjectEntry, id=course_id)
@@ -604,23 +803,13 @@ def get_guidance_view(request, course_id):
             })
 
         # Prepare payload for FastAPI (corrected fields)
-        payload = {
-            "subject": str(course.subject_name),
-            "user_id": str(request.user.id),  
-            "predicted_score": course.predicted_score,
-            "subject_weekly_study_hours": course.hours_studied,
-            "motivation_level": str(course.motivation),
-            "preferred_learning_style": str(course.preferred_learning_style),
-        }
+        payload = guidance_payload(course, request.user)
 
         print("Sending to FastAPI:", json.dumps(payload, indent=2))
 
         try:
-            # Send to FastAPI (adjust URL if needed)
-            FASTAPI_URL = "http://127.0.0.1:8000/chatbot-advice"  
-            response = requests.post(FASTAPI_URL, json=payload, timeout=20)  
-            response.raise_for_status()  
-            result = response.json()
+            # Cached guidance for an equivalent profile, or one shared upstream call
+            result = guidance_cache.get_guidance(payload)
             print("This is your result")
             print(result)
 
@@ -630,24 +819,27 @@ def get_guidance_view(request, course_id):
                 return render(request, "dashboard.html", {
                     "error": "Empty response from guidance service.",
                     "course": course,
-                    "courses": SubjectEntry.objects.filter(student=request.user.student),
                 })
 
             # Save guidance to the course
             course.study_guide = guidance_text
-            course.save()
+            course.save(update_fields=['study_guide', 'updated_at'])
 
             return render(request, "dashboard.html", {
                 "course": course,
                 "guidance": guidance_text,
-                "courses": SubjectEntry.objects.filter(student=request.user.student),
+            })
+
+        except CircuitOpenError:
+            return render(request, "dashboard.html", {
+                "error": "The guidance service is temporarily unavailable. Please try again in a minute.",
+                "course": course,
             })
 
         except requests.exceptions.RequestException as e:
             return render(request, "dashboard.html", {
                 "error": f"Failed to connect to guidance service: {str(e)}",
                 "course": course,
-                "courses": SubjectEntry.objects.filter(student=request.user.student),
             })
 
     # If not POST, redirect to dashboard
@@ -655,6 +847,45 @@ def get_guidance_view(request, course_id):
 
 
 
+@login_required
+async def aget_guidance_view(request, course_id):
+    """ASGI version of get_guidance_view; the guidance call is awaited, not blocking a thread."""
+    try:
+        course = await SubjectEntry.objects.aget(id=course_id)
+    except SubjectEntry.DoesNotExist:
+        raise Http404("No SubjectEntry matches the given query.")
+
+    if request.method != "POST":
+        return redirect("subject_dashboard", course_id=course.id)
+
+    user = await request.auser()
+    student = await Student.objects.filter(user=user).afirst()
+    if not student:
+        return await sync_to_async(render)(request, "dashboard.html", {
+            "error": "Student profile not found.",
+            "course": course,
+        })
+
+    context = {"course": course}
+
+    try:
+        result = await guidance_cache.aget_guidance(guidance_payload(course, user))
+    except CircuitOpenError:
+        context["error"] = "The guidance service is temporarily unavailable. Please try again in a minute."
+    except requests.exceptions.RequestException as e:
+        context["error"] = f"Failed to connect to guidance service: {str(e)}"
+    else:
+        guidance_text = result.get("study_guide")
+        if guidance_text:
+            course.study_guide = guidance_text
+            await course.asave(update_fields=['study_guide', 'updated_at'])
+            context["guidance"] = guidance_text
+        else:
+            context["error"] = "Empty response from guidance service."
+
+    return await sync_to_async(render)(request, "dashboard.html", context)
+
+
 @require_POST
 @login_required
 def delete_course(request, course_id):
@@ -692,9 +923,7 @@ def questionnaire_view(request):
             
             # Send to FastAPI
             try:
-                response = requests.post(f"{FASTAPI_URL}/api/study-plan", json=data)
-                response.raise_for_status()
-                result = response.json()
+                result = fastapi_client.study_plan(data)
                 return render(request, 'templates/study_plan.html', {
                     'study_plan': result['study_plan'],
                     'prediction': result.get('prediction')
@@ -738,12 +967,13 @@ def new_prediction(request, course_id):
     print(f"DEBUG new_prediction: Function called with course_id={course_id}")
     print(f"DEBUG new_prediction: Session before changes: {dict(request.session)}")
     
-    # Store the course ID in session to indicate we're making a new prediction
+    # Store the course ID in session to indicate we're making a new prediction.
+    # SessionMiddleware saves the session only when it changed, so asking
+    # for the same course again costs no session write.
     print(f"DEBUG new_prediction: Setting new_prediction_course_id to {course_id}")
-    request.session['new_prediction_course_id'] = course_id
+    if request.session.get('new_prediction_course_id') != course_id:
+        request.session['new_prediction_course_id'] = course_id
     
-    # Force session save
-    request.session.save()
     print(f"DEBUG new_prediction: Session after changes: {dict(request.session)}")
     
     print("DEBUG new_prediction: Redirecting to wizard")
@@ -758,13 +988,10 @@ def new_course(request):
     print(f"DEBUG new_course: Session before changes: {dict(request.session)}")
     
     # Clear any existing mode flags
+    # (SessionMiddleware saves the session if this changed it)
     if 'new_prediction_course_id' in request.session:
         print("DEBUG new_course: Clearing new_prediction_course_id from session")
         del request.session['new_prediction_course_id']
-    
-    # Force session save
-    request.session.save()
-
 
     print(f"DEBUG new_course: Session after changes: {dict(request.session)}")
     
@@ -778,25 +1005,105 @@ def new_course(request):
 def course_history_dashboard(request, course_id):
     course = get_object_or_404(SubjectEntry, id=course_id, student=request.user.student)
     
-    # Get all prediction entries for this course, ordered by most recent
-    prediction_entries = course.entries.all().order_by('-created_at')
-    
-    # Prepare data for charts with proper fallbacks
-    dates = [entry.created_at.strftime('%Y-%m-%d') for entry in prediction_entries]
-    scores = [float(entry.predicted_score) if entry.predicted_score else 0 for entry in prediction_entries]
-    hours_studied = [float(entry.hours_studied) for entry in prediction_entries]
-    
-    # Convert to JSON strings for the template
-    dates_json = json.dumps(dates)
-    scores_json = json.dumps(scores)
-    hours_json = json.dumps(hours_studied)
+    range_key = history.selected_range(request.GET.get('range'))
+    entries = history.entries_in_range(course, range_key)
+
+    # One page of the table, newest first, paged by (created_at, id).
+    # The chart fetches its series from course_chart_data.
+    # Long ranges merge in the course's archived months as paging reaches them.
+    page = history.keyset_page(
+        entries, after=request.GET.get('after'), before=request.GET.get('before'),
+        archives=history.ArchivedMonths(course, range_key),
+    )
+
+    try:
+        stats = course.stats
+    except CourseStats.DoesNotExist:
+        stats = None
 
     return render(request, 'course_history_dashboard.html', {
         'course': course,
-        'prediction_entries': prediction_entries,
-        'dates': dates_json,
-        'scores': scores_json,
-        'hours_studied': hours_json,
-        'courses': SubjectEntry.objects.filter(student=request.user.student),
+        'stats': stats,
+        'prediction_entries': page,
+        'page': page,
+        'range': range_key,
+        'ranges': history.RANGES,
         'current_page': 'history'
-    })
\ No newline at end of file
+    })
+
+def _chart_etag(request, course_id):
+    return history.chart_etag(course_id, request.user, history.selected_range(request.GET.get('range')))
+
+
+@login_required
+@condition(etag_func=_chart_etag)
+@gzip_page
+def course_chart_data(request, course_id):
+    """
+    Chart series for the history page as compact JSON. Browsers revalidate
+    with If-None-Match and get a 304 until the course's data changes.
+    """
+    course = get_object_or_404(SubjectEntry, id=course_id, student=request.user.student)
+    series = history.chart_series(course, history.selected_range(request.GET.get('range')))
+    response = JsonResponse(series, json_dumps_params={'separators': (',', ':')})
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def _export_response(request, filename, student=None):
+    """
+    Stream prediction history as CSV or NDJSON. Query parameters: format
+    (csv|ndjson), source (live|archive), course, after (resume watermark)
+    and gzip=1 to compress on the fly.
+    """
+    fmt = request.GET.get('format', 'csv')
+    source = request.GET.get('source', 'live')
+    if fmt not in history_export.FORMATS or source not in history_export.SOURCES:
+        return HttpResponseBadRequest("Unknown format or source.")
+    try:
+        after = int(request.GET.get('after') or 0)
+        course_id = int(request.GET['course']) if request.GET.get('course') else None
+    except ValueError:
+        return HttpResponseBadRequest("after and course must be integers.")
+
+    rows = history_export.rows(source, student=student, course_id=course_id, after=after)
+    chunks = history_export.batched(history_export.render(rows, fmt, history_export.columns(source)))
+    content_type = history_export.FORMATS[fmt]
+    filename = f"{filename}.{fmt}"
+    if request.GET.get('gzip') == '1':
+        chunks = history_export.gzipped(chunks)
+        content_type, filename = 'application/gzip', f"{filename}.gz"
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    # Stop nginx from buffering the export
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+def export_history(request):
+    """The logged-in student's own prediction history."""
+    student = get_object_or_404(Student, user=request.user)
+    return _export_response(request, f"prediction-history-{request.user.username}", student=student)
+
+
+@staff_member_required
+def prediction_cache_stats(request):
+    """
+    The prediction cache's hit/miss counters, read inside the server. With a
+    process-local cache they cover only the worker process that answers.
+    """
+    stats = prediction_cache.stats()
+    stats['pid'] = os.getpid()
+    response = JsonResponse(stats)
+    patch_cache_control(response, private=True, no_store=True)
+    return response
+
+
+@staff_member_required
+def export_all_history(request):
+    """Every student's prediction history, for reporting and model retraining."""
+    return _export_response(request, "prediction-history")
@@ -0,0 +1,115 @@
+"""
+Optional single-writer queue for SQLite (settings.SQLITE_WRITE_BATCHING).
+
+SQLite lets one connection write at a time and every commit pays for the
+lock hand-off and a sync. With batching on, request threads pass their write
+functions to :func:`run`, one writer thread per process collects whatever
+arrives within ``SQLITE_WRITE_BATCH_WINDOW`` seconds and runs it all in one
+transaction, each function in its own savepoint so a failing write does not
+undo its neighbours. Callers block until that transaction commits and get
+their function's return value or exception back. With batching off,
+:func:`run` calls the function in a transaction of its own.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def enabled():
+    return getattr(settings, 'SQLITE_WRITE_BATCHING', False)
+
+
+def _reset_after_fork():
+    # The writer thread does not survive fork(); the child starts its own
+    global _queue
+    _queue = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                pending = queue.SimpleQueue()
+                threading.Thread(target=_writer_loop, args=(pending,), name='sqlite-writer', daemon=True).start()
+                _queue = pending
+    return _queue
+
+
+def _writer_loop(pending):
+    window = getattr(settings, 'SQLITE_WRITE_BATCH_WINDOW', 0.002)
+    max_batch = getattr(settings, 'SQLITE_WRITE_BATCH_MAX', 200)
+    while True:
+        batch = [pending.get()]
+        deadline = time.monotonic() + window
+        while len(batch) < max_batch:
+            wait = deadline - time.monotonic()
+            if wait <= 0:
+                break
+            try:
+                batch.append(pending.get(timeout=wait))
+            except queue.Empty:
+                break
+        _run_batch(batch)
+
+
+def _run_batch(batch):
+    outcomes = []
+    try:
+        with transaction.atomic():
+            for fn, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with transaction.atomic():
+                        outcomes.append((future, fn(), None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+    except Exception as e:
+        # The commit itself failed, so none of the batch was written
+        logger.warning("Write batch of %s failed: %s", len(batch), e)
+        connection.close()
+        for _, future in batch:
+            if future.running():
+                future.set_exception(e)
+        return
+
+    for future, result, error in outcomes:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+def submit(fn):
+    """Queue ``fn`` for the writer thread; returns a Future of its result."""
+    future = Future()
+    _get_queue().put((fn, future))
+    return future
+
+
+def run(fn):
+    """
+    Run ``fn()`` in a write transaction and return its result: batched on the
+    writer thread when enabled, otherwise right here. Callers already inside
+    a transaction always run inline, since the writer thread would wait for
+    the lock they hold.
+    """
+    if not enabled() or connection.in_atomic_block:
+        with transaction.atomic():
+            return fn()
+    return submit(fn).result(timeout=getattr(settings, 'SQLITE_WRITE_TIMEOUT', 30))